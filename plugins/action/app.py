@@ -0,0 +1,100 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from typing import Any, Dict, List, Mapping, Optional
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import compose_digest
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.compose_diff import (
+    build_diff,
+    changed_services,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    APP_QUERY_FIELDS,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.plugin_utils.snapshot import (
+    SnapshotAction,
+)
+
+_OPTIONS = {"name", "compose_config", "state", "wait", "wait_timeout", "diff_mode"}
+
+
+def _noop_result(
+    args: Mapping[str, Any], apps: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Mirror the module's unchanged results; anything else goes to the module."""
+    name = args.get("name")
+    state = args.get("state") or "present"
+    if not isinstance(name, str) or not set(args) <= _OPTIONS:
+        return None
+    application = next((app for app in apps if app.get("name") == name), None)
+
+    if state == "absent":
+        if application is not None:
+            return None
+        return dict(
+            changed=False,
+            state="absent",
+            message="Application '{}' is already absent".format(name),
+        )
+
+    compose_config = args.get("compose_config")
+    if (
+        state != "present"
+        or not isinstance(compose_config, dict)
+        or not application
+        or not application.get("custom_app")
+        or application.get("compose_digest") != compose_digest(compose_config)
+    ):
+        return None
+    diff, changes = build_diff(compose_config, compose_config, args.get("diff_mode") or "full")
+    result = dict(
+        changed=False,
+        message="Application {} is up to date".format(name),
+        diff=diff,
+        changed_services=changed_services(compose_config, compose_config),
+        application={key: application[key] for key in APP_QUERY_FIELDS if key in application},
+        state="present",
+    )
+    if changes is not None:
+        result["compose_changes"] = changes
+    return result
+
+
+def _patched_apps(
+    args: Mapping[str, Any], apps: List[Dict[str, Any]], module_result: Mapping[str, Any]
+) -> Optional[List[Dict[str, Any]]]:
+    """Apply a changed module run to the snapshot; ``None`` when its outcome is unknown."""
+    name = args.get("name")
+    state = module_result.get("state")
+    job = module_result.get("job")
+    if not isinstance(name, str) or (isinstance(job, dict) and job.get("state") == "RUNNING"):
+        # A job still running may yet fail.
+        return None
+    others = [app for app in apps if app.get("name") != name]
+    if state == "absent":
+        return others
+    if state == "restarted":
+        # The compose file is unchanged; the snapshot does not track run state.
+        return apps
+    compose_config = args.get("compose_config")
+    if state != "present" or not isinstance(compose_config, dict):
+        return None
+    current = next((app for app in apps if app.get("name") == name), None)
+    application = module_result.get("application")
+    record = dict(current or {})
+    if isinstance(application, dict):
+        record.update(application)
+    record.update(name=name, custom_app=True, compose_digest=compose_digest(compose_config))
+    return others + [record]
+
+
+class ActionModule(SnapshotAction):
+    collection = "apps"
+    info_module = "mareckii.truenas_scale.app_info"
+    info_args = {"compose_digest": True}
+
+    def noop_result(self, args, records):
+        return _noop_result(args, records)
+
+    def patched_records(self, args, records, module_result):
+        return _patched_apps(args, records, module_result)
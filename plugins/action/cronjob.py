@@ -0,0 +1,109 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from typing import Any, Dict, List, Mapping, Optional
+
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.cronjobs import (
+    CRON_FIELDS,
+    CronJobSpec,
+    apply_stagger,
+    index_jobs,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    CRONJOB_QUERY_FIELDS,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.plugin_utils.snapshot import (
+    SnapshotAction,
+)
+
+_OPTIONS = {"name", "command", "user", "enabled", "schedule", "stagger", "state"}
+_STAGGER_OPTIONS = {"window", "key"}
+
+
+def _spec(args: Mapping[str, Any]) -> Optional[CronJobSpec]:
+    schedule = args.get("schedule")
+    if schedule is not None:
+        if not isinstance(schedule, dict) or not set(schedule) <= set(CRON_FIELDS):
+            return None
+    if not isinstance(args.get("command"), str) or not isinstance(args.get("user", "root"), str):
+        return None
+    try:
+        enabled = boolean(args.get("enabled", True), strict=True)
+    except TypeError:
+        return None
+    return CronJobSpec.from_module_params(dict(args, enabled=enabled))
+
+
+def _noop_result(
+    args: Mapping[str, Any], jobs: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Mirror the module's unchanged results; anything else goes to the module."""
+    name = args.get("name")
+    state = args.get("state") or "present"
+    if not isinstance(name, str) or not set(args) <= _OPTIONS:
+        return None
+    job = index_jobs(jobs).get(name)
+
+    if state == "absent":
+        if job is not None:
+            return None
+        return dict(
+            changed=False,
+            state="absent",
+            message="Cron job '{}' is already absent".format(name),
+            cronjob=None,
+        )
+
+    if state != "present" or _spec(args) is None:
+        return None
+    stagger = args.get("stagger")
+    summary = None
+    if stagger is not None:
+        if not isinstance(stagger, dict) or not set(stagger) <= _STAGGER_OPTIONS:
+            return None
+        if not all(isinstance(value, str) for value in stagger.values() if value is not None):
+            return None
+        try:
+            args, summary = apply_stagger(args, jobs)
+        except (TypeError, ValueError):
+            return None
+    spec = _spec(args)
+    if spec is None or not spec.matches(job):
+        return None
+    result = dict(
+        changed=False,
+        state="present",
+        message="Cron job '{}' is up to date".format(name),
+        cronjob={key: job[key] for key in CRONJOB_QUERY_FIELDS if key in job},
+        diff=spec.diff(job),
+    )
+    if summary is not None:
+        result["stagger"] = summary
+    return result
+
+
+def _patched_jobs(
+    args: Mapping[str, Any], jobs: List[Dict[str, Any]], module_result: Mapping[str, Any]
+) -> Optional[List[Dict[str, Any]]]:
+    """Apply a changed module run to the snapshot; ``None`` when its record is missing."""
+    job = module_result.get("cronjob")
+    if not isinstance(job, dict) or job.get("id") is None:
+        return None
+    others = [other for other in jobs if other.get("id") != job["id"]]
+    if module_result.get("state") == "absent":
+        return others
+    if module_result.get("state") != "present" or job.get("description") != args.get("name"):
+        return None
+    return others + [job]
+
+
+class ActionModule(SnapshotAction):
+    collection = "cronjobs"
+    info_module = "mareckii.truenas_scale.cronjob_info"
+
+    def noop_result(self, args, records):
+        return _noop_result(args, records)
+
+    def patched_records(self, args, records, module_result):
+        return _patched_jobs(args, records, module_result)
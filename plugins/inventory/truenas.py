@@ -0,0 +1,226 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+name: truenas
+short_description: TrueNAS SCALE applications as inventory hosts
+description:
+  - Connect to the middleware of every listed TrueNAS SCALE node, query its applications and cron jobs once,
+    and add each application as an inventory host.
+  - Nodes are queried in parallel. Results can be cached with any inventory cache plugin.
+  - The configuration file name must end with C(truenas.yml) or C(truenas.yaml).
+author:
+  - Marek Marecki (@mareckii)
+requirements:
+  - truenas_api_client
+extends_documentation_fragment:
+  - constructed
+  - inventory_cache
+options:
+  plugin:
+    description: Marks this file as configuration for this plugin.
+    required: true
+    type: str
+    choices:
+      - mareckii.truenas_scale.truenas
+  nodes:
+    description:
+      - TrueNAS SCALE nodes to query. Each node is also added as an inventory host in the C(truenas_nodes) group.
+      - Per-node C(api_key), C(username), C(password) and C(verify_ssl) override the plugin-wide values.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description: Inventory host name of the node.
+        type: str
+        required: true
+      uri:
+        description: Middleware websocket URI. Defaults to C(wss://<name>/api/current).
+        type: str
+      ansible_host:
+        description: Address Ansible connects to for the node and its applications. Defaults to the URI host.
+        type: str
+      api_key:
+        description: API key for this node.
+        type: str
+      username:
+        description: User name for this node when no API key is used.
+        type: str
+      password:
+        description: Password for C(username).
+        type: str
+      verify_ssl:
+        description: Whether to verify the node's TLS certificate.
+        type: bool
+  api_key:
+    description: API key used for every node without its own credentials.
+    type: str
+    env:
+      - name: TRUENAS_API_KEY
+  username:
+    description: User name used for every node without its own credentials or API key.
+    type: str
+    env:
+      - name: TRUENAS_USERNAME
+  password:
+    description: Password for C(username).
+    type: str
+    env:
+      - name: TRUENAS_PASSWORD
+  verify_ssl:
+    description: Whether to verify TLS certificates of the nodes.
+    type: bool
+    default: true
+  include_cronjobs:
+    description: Also query C(cronjob.query) and expose the result as C(truenas_cronjobs) on each node host.
+    type: bool
+    default: true
+  max_workers:
+    description: Number of nodes queried concurrently.
+    type: int
+    default: 8
+  node_timeout:
+    description:
+      - Seconds a single node may take to connect and answer before it is reported as unreachable.
+      - By default nodes are waited for as long as their calls take.
+    type: float
+  app_hostname:
+    description:
+      - Python format string for application host names. C({node}) and C({app}) are replaced with the node and
+        application name.
+    type: str
+    default: "{node}_{app}"
+"""
+
+EXAMPLES = r"""
+# truenas.yml
+# The API key is read from TRUENAS_API_KEY.
+plugin: mareckii.truenas_scale.truenas
+nodes:
+  - name: nas1.example.com
+  - name: nas2.example.com
+    uri: wss://10.0.0.12/api/current
+    verify_ssl: false
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/ansible/truenas_inventory
+cache_timeout: 600
+keyed_groups:
+  - key: truenas_app.version
+    prefix: version
+"""
+
+from urllib.parse import urlparse
+
+from ansible.errors import AnsibleParserError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import fleet
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+    NAME = "mareckii.truenas_scale.truenas"
+
+    def verify_file(self, path):
+        return super().verify_file(path) and path.endswith(("truenas.yml", "truenas.yaml"))
+
+    def parse(self, inventory, loader, path, cache=True):
+        super().parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        use_cache = self.get_option("cache") and cache
+        update_cache = self.get_option("cache") and not cache
+        results = None
+        if use_cache:
+            try:
+                results = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if results is None:
+            results = self._query_nodes()
+            # Never cache a partial view of the fleet.
+            if any("error" in result for result in results.values()):
+                update_cache = False
+        if update_cache:
+            self._cache[cache_key] = results
+
+        self._populate(results)
+
+    def _nodes(self):
+        defaults = {key: self.get_option(key) for key in fleet.CREDENTIALS}
+        try:
+            return [fleet.Node.from_dict(node, defaults) for node in self.get_option("nodes") or []]
+        except ValueError as exc:
+            raise AnsibleParserError("Invalid 'nodes' entry: {}".format(exc))
+
+    def _query_node(self, client):
+        result = {"apps": client.list_applications()}
+        if self.get_option("include_cronjobs"):
+            result["cronjobs"] = client.list_cronjobs()
+        return result
+
+    def _query_nodes(self):
+        """Query every node once, in parallel; returns ``{node_name: result}``."""
+        outcomes = fleet.run_on_nodes(
+            self._nodes(),
+            self._query_node,
+            max_workers=max(1, self.get_option("max_workers")),
+            timeout=self.get_option("node_timeout"),
+        )
+        return {
+            outcome.node: outcome.result if outcome.ok else {"error": outcome.error}
+            for outcome in outcomes
+        }
+
+    def _populate(self, results):
+        inventory = self.inventory
+        strict = self.get_option("strict")
+        nodes = {node["name"]: node for node in self.get_option("nodes") or []}
+        for group in ("truenas_nodes", "truenas_apps", "truenas_unreachable"):
+            inventory.add_group(group)
+
+        for node_name, result in results.items():
+            node = nodes.get(node_name, {})
+            ansible_host = node.get("ansible_host") or urlparse(
+                node.get("uri") or "wss://{}".format(node_name)
+            ).hostname
+            inventory.add_host(node_name, group="truenas_nodes")
+            inventory.set_variable(node_name, "ansible_host", ansible_host)
+
+            if "error" in result:
+                self.display.warning(
+                    "Unable to query TrueNAS node {}: {}".format(node_name, result["error"])
+                )
+                inventory.add_host(node_name, group="truenas_unreachable")
+                inventory.set_variable(node_name, "truenas_error", result["error"])
+                continue
+
+            if "cronjobs" in result:
+                inventory.set_variable(node_name, "truenas_cronjobs", result["cronjobs"])
+            node_group = inventory.add_group(self._sanitize_group_name("truenas_node_" + node_name))
+
+            for app in result["apps"]:
+                host = self.get_option("app_hostname").format(node=node_name, app=app["name"])
+                state_group = inventory.add_group(
+                    self._sanitize_group_name("truenas_app_state_" + str(app.get("state")).lower())
+                )
+                for group in ("truenas_apps", node_group, state_group):
+                    inventory.add_host(host, group=group)
+                hostvars = {
+                    "ansible_host": ansible_host,
+                    "truenas_node": node_name,
+                    "truenas_app_name": app["name"],
+                    "truenas_app_state": app.get("state"),
+                    "truenas_app": app,
+                }
+                for key, value in hostvars.items():
+                    inventory.set_variable(host, key, value)
+
+                self._set_composite_vars(self.get_option("compose"), hostvars, host, strict=strict)
+                self._add_host_to_composed_groups(
+                    self.get_option("groups"), hostvars, host, strict=strict
+                )
+                self._add_host_to_keyed_groups(
+                    self.get_option("keyed_groups"), hostvars, host, strict=strict
+                )
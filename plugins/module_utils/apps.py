@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cache, tracing, yamlutils
+
+APP_STATES = ("present", "absent", "restarted")
+DEFAULT_APP_CONFIG_ROOT = "/mnt/.ix-apps/app_configs"
+
+
+class ComposeReadError(Exception):
+    """Raised when the deployed compose configuration cannot be loaded."""
+
+
+def user_config_path(application: Mapping[str, Any]) -> Path:
+    app_config_root = os.environ.get("TRUENAS_APP_CONFIG_ROOT", DEFAULT_APP_CONFIG_ROOT)
+    return (
+        Path(app_config_root)
+        / application["name"]
+        / "versions"
+        / str(application["version"])
+        / "user_config.yaml"
+    )
+
+
+def load_current_compose(application: Mapping[str, Any]) -> Dict[str, Any]:
+    user_config = user_config_path(application)
+    try:
+        user_config_text = user_config.read_text()
+    except OSError as exc:
+        raise ComposeReadError("Unable to read {}: {}".format(user_config, exc))
+
+    if not yamlutils.HAS_YAML:
+        raise ComposeReadError(
+            "The PyYAML python package is required to parse compose configuration."
+        )
+
+    try:
+        with tracing.get_tracer().phase("compose_parse"):
+            return yamlutils.safe_load(user_config_text) or {}
+    except yamlutils.YAMLError as exc:
+        raise ComposeReadError("Invalid YAML in {}: {}".format(user_config, exc))
+
+
+def compose_digest(compose: Optional[Mapping[str, Any]]) -> str:
+    """Canonical digest of a compose document (sorted-key JSON, SHA-256)."""
+    payload = json.dumps(compose or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stat_user_config(application: Mapping[str, Any]) -> Tuple[Path, list]:
+    user_config = user_config_path(application)
+    try:
+        info = user_config.stat()
+    except OSError as exc:
+        raise ComposeReadError("Unable to read {}: {}".format(user_config, exc))
+    return user_config, [info.st_ino, info.st_size, info.st_mtime_ns]
+
+
+def _digest_cache_file(application: Mapping[str, Any]) -> str:
+    return cache.cache_path("compose_digests", "{}.json".format(application["name"]))
+
+
+def _load_and_cache_digest(
+    application: Mapping[str, Any], user_config: Path, stamp: list
+) -> Dict[str, Any]:
+    current_compose = load_current_compose(application)
+    cache.write_json(
+        _digest_cache_file(application),
+        {"path": str(user_config), "stamp": stamp, "digest": compose_digest(current_compose)},
+    )
+    return current_compose
+
+
+def compare_compose(
+    application: Mapping[str, Any], compose_config: Optional[Dict[str, Any]]
+) -> Tuple[bool, Dict[str, Any]]:
+    """Compare the deployed compose with ``compose_config``.
+
+    Returns ``(matches, current_compose)``. The digest of the deployed file
+    is cached per app, keyed by its inode, size and mtime, so an unchanged
+    file whose digest equals the desired one skips the YAML parse; in that
+    case ``current_compose`` is ``compose_config`` since both are equal.
+    """
+    user_config, stamp = _stat_user_config(application)
+    entry = cache.read_json(_digest_cache_file(application)) or {}
+    if (
+        entry.get("path") == str(user_config)
+        and entry.get("stamp") == stamp
+        and entry.get("digest") == compose_digest(compose_config)
+    ):
+        return True, compose_config
+
+    current_compose = _load_and_cache_digest(application, user_config, stamp)
+    return current_compose == compose_config, current_compose
+
+
+def deployed_compose_digest(application: Mapping[str, Any]) -> str:
+    """Return :func:`compose_digest` of the deployed compose, reusing the digest cache."""
+    user_config, stamp = _stat_user_config(application)
+    entry = cache.read_json(_digest_cache_file(application)) or {}
+    if entry.get("path") == str(user_config) and entry.get("stamp") == stamp and entry.get("digest"):
+        return entry["digest"]
+    return compose_digest(_load_and_cache_digest(application, user_config, stamp))
+
+
+@dataclass(frozen=True)
+class AppSpec:
+    name: str
+    compose_config: Optional[Dict[str, Any]] = None
+    state: str = "present"
+
+    @classmethod
+    def from_module_params(cls, params: Mapping[str, Any]) -> "AppSpec":
+        return cls(
+            name=params["name"],
+            compose_config=params.get("compose_config"),
+            state=params.get("state") or "present",
+        )
+
+    def diff(self, current_compose: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"before": current_compose, "after": self.compose_config}
@@ -0,0 +1,251 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Opt-in local broker that shares one middleware session between module runs.
+
+The broker owns a single backend connection and serves it over a Unix socket
+(one JSON document per line in each direction) until it has been idle for
+``TRUENAS_CLIENT_BROKER_IDLE`` seconds.
+"""
+
+import errno
+import fcntl
+import json
+import os
+import select
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+DEFAULT_IDLE_TIMEOUT = 300
+SPAWN_TIMEOUT = 10
+
+
+class BrokerError(Exception):
+    """Raised for errors relayed from the backend through the broker."""
+
+    def __init__(self, message: str, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def broker_socket_path() -> Optional[str]:
+    """Return the socket path when the broker is enabled, ``None`` otherwise.
+
+    ``TRUENAS_CLIENT_BROKER`` may be a boolean-like value to use the default
+    per-user socket or an explicit socket path.
+    """
+    value = os.environ.get("TRUENAS_CLIENT_BROKER", "").strip()
+    if not value or value.lower() in ("0", "false", "no", "off"):
+        return None
+    if value.lower() in ("1", "true", "yes", "on"):
+        directory = os.path.join(
+            tempfile.gettempdir(), "truenas_scale_broker_{}".format(os.getuid())
+        )
+        return os.path.join(directory, "broker.sock")
+    return value
+
+
+def idle_timeout() -> float:
+    return float(os.environ.get("TRUENAS_CLIENT_BROKER_IDLE") or DEFAULT_IDLE_TIMEOUT)
+
+
+def _prepare_directory(path: str) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    _check_owner(directory)
+
+
+def _check_owner(path: str) -> None:
+    # The broker hands out an authenticated session, so refuse anything
+    # another user could have planted or can reach.
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError("Refusing to use {}: not private to this user".format(path))
+
+
+class BrokerClient:
+    """Backend proxy with the same ``call``/``close`` surface as ``Client``."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        _check_owner(path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(path)
+        except OSError:
+            self._socket.close()
+            raise
+        self._reader = self._socket.makefile("r", encoding="utf-8")
+
+    def call(self, method: str, *args: Any, **kwargs: Any):
+        # Progress callbacks cannot cross the process boundary.
+        kwargs.pop("callback", None)
+        request = {"method": method, "args": list(args), "kwargs": kwargs}
+        self._socket.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Broker closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise BrokerError(response["error"], response.get("type"))
+        return response.get("result")
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    return isinstance(exc, (OSError, EOFError)) or "closed" in str(exc).lower()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+        try:
+            for line in self.rfile:
+                server.touch()
+                request = json.loads(line)
+                try:
+                    result = server.backend.call(
+                        request["method"], *request.get("args", []), **request.get("kwargs", {})
+                    )
+                    response = {"result": result}
+                except Exception as exc:
+                    response = {"error": str(exc), "type": type(exc).__name__}
+                    if _is_connection_error(exc):
+                        server.stop()
+                self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                server.touch()
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+class _BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, backend, idle: float):
+        self.backend = backend
+        self.idle = idle
+        self.active = 0
+        self.lock = threading.Lock()
+        self.last_activity = time.monotonic()
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def stop(self):
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def watch_idle(self):
+        while True:
+            time.sleep(min(1.0, self.idle))
+            with self.lock:
+                idle_for = time.monotonic() - self.last_activity
+                if self.active == 0 and idle_for >= self.idle:
+                    break
+        self.shutdown()
+
+
+def serve(path: str, backend, idle: float, ready: Optional[Callable[[], None]] = None) -> None:
+    """Serve ``backend`` on ``path`` until idle for ``idle`` seconds."""
+    server = _BrokerServer(path, backend, idle)
+    watcher = threading.Thread(target=server.watch_idle, daemon=True)
+    watcher.start()
+    if ready is not None:
+        ready()
+    try:
+        server.serve_forever(poll_interval=0.2)
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        try:
+            backend.close()
+        except Exception:
+            pass
+
+
+def _spawn(path: str, backend_factory: Callable[[], Any], idle: float) -> None:
+    """Fork a detached broker process and wait until it accepts connections."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd, "rb") as pipe:
+            readable, _, _ = select.select([pipe], [], [], SPAWN_TIMEOUT)
+            status = pipe.read() if readable else b"timed out"
+        if status != b"ok":
+            raise RuntimeError(
+                "Broker failed to start: {}".format(status.decode("utf-8", "replace"))
+            )
+        return
+
+    # First child: detach from the module process and fork the daemon.
+    os.close(read_fd)
+    try:
+        os.setsid()
+        if os.fork():
+            os._exit(0)
+        # Ansible reads the module's stdout until EOF, so the daemon must not
+        # keep any inherited descriptor open.
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.closerange(3, write_fd)
+        os.closerange(write_fd + 1, os.sysconf("SC_OPEN_MAX"))
+        try:
+            backend = backend_factory()
+        except Exception as exc:
+            os.write(write_fd, str(exc).encode("utf-8") or b"error")
+            os._exit(1)
+
+        def ready():
+            os.write(write_fd, b"ok")
+            os.close(write_fd)
+
+        serve(path, backend, idle, ready=ready)
+    finally:
+        os._exit(0)
+
+
+def connect(
+    path: str, backend_factory: Callable[[], Any], idle: Optional[float] = None
+) -> BrokerClient:
+    """Connect to the broker at ``path``, starting one if none is running."""
+    _prepare_directory(path)
+    try:
+        return BrokerClient(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        pass
+
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        # Another module run may have started the broker while we waited.
+        try:
+            return BrokerClient(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        try:
+            os.unlink(path)
+        except OSError as exc:
+            if exc.errno != errno.ENOENT:
+                raise
+        _spawn(path, backend_factory, idle_timeout() if idle is None else idle)
+    return BrokerClient(path, timeout=None)
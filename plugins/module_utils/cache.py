@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DEFAULT_CACHE_DIR = "~/.cache/truenas_scale"
+
+
+def cache_dir() -> str:
+    """Host-local cache directory, overridable with ``TRUENAS_SCALE_CACHE_DIR``."""
+    return os.path.expanduser(os.environ.get("TRUENAS_SCALE_CACHE_DIR") or DEFAULT_CACHE_DIR)
+
+
+def cache_path(*parts: str) -> str:
+    return os.path.join(cache_dir(), *parts)
+
+
+def read_json(path: str) -> Optional[Any]:
+    """Return the cached document, or ``None`` when it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: str, data: Any) -> bool:
+    """Atomically replace ``path``; cache writes never fail the caller."""
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, separators=(",", ":"), default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        return False
+    return True
+
+
+def _invalidation_marker(name: str) -> str:
+    return cache_path("inventory", "{}.invalidated".format(name))
+
+
+class TTLCache:
+    """Host-local cache for one query result, expired by age or invalidation.
+
+    Callers record the time *before* they start fetching and pass it to
+    :meth:`set`, so a fetch that overlaps a mutation is never served once
+    :func:`invalidate` has run for that mutation.
+    """
+
+    def __init__(self, name: str, ttl: float, invalidated_by: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.path = cache_path("inventory", "{}.json".format(name))
+        # Several entries derived from one collection share its invalidation marker.
+        self.invalidated_by = invalidated_by or name
+
+    def get(self) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+        entry = read_json(self.path)
+        if not isinstance(entry, dict) or "fetched_at" not in entry:
+            return None
+        if entry["fetched_at"] + self.ttl < time.time():
+            return None
+        try:
+            if entry["fetched_at"] <= os.stat(_invalidation_marker(self.invalidated_by)).st_mtime:
+                return None
+        except OSError:
+            pass
+        return entry.get("data")
+
+    def set(self, data: Any, fetched_at: float) -> bool:
+        if self.ttl <= 0:
+            return False
+        return write_json(self.path, {"fetched_at": fetched_at, "data": data})
+
+
+def invalidate(name: str) -> None:
+    """Mark every cached result for ``name`` as stale."""
+    marker = _invalidation_marker(name)
+    try:
+        os.makedirs(os.path.dirname(marker), mode=0o700, exist_ok=True)
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+    except OSError:
+        pass
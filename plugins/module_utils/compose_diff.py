@@ -0,0 +1,190 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Path-level delta between two compose documents.
+
+A change is ``{"path": [...], "op": "added" | "removed" | "changed" | "reordered",
+"before": ..., "after": ...}``. Path elements are mapping keys (``str``), list
+positions (``int``), or ``{"name": "web"}`` for list items matched by an
+identity key, so reordering a list of named items is not reported as every
+item changing.
+"""
+
+import json
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+REORDERED = "reordered"
+
+DIFF_MODES = ("full", "minimal")
+
+# Keys that identify an item in a list of mappings (services, networks,
+# long-syntax volumes/configs/secrets), tried in order.
+LIST_IDENTITY_KEYS = ("name", "source", "target")
+
+
+def _identity_key(before: Sequence[Any], after: Sequence[Any]) -> Optional[str]:
+    items = list(before) + list(after)
+    if not items or not all(isinstance(item, Mapping) for item in items):
+        return None
+    for key in LIST_IDENTITY_KEYS:
+        if all(key in item for item in items) and all(
+            len({_hashable(item[key]) for item in side}) == len(side) for side in (before, after)
+        ):
+            return key
+    return None
+
+
+def _hashable(value: Any) -> Any:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _diff(before: Any, after: Any, path: List[Any], changes: List[Dict[str, Any]]) -> None:
+    if before == after:
+        return
+    if isinstance(before, Mapping) and isinstance(after, Mapping):
+        for key, value in before.items():
+            if key not in after:
+                changes.append({"path": path + [key], "op": REMOVED, "before": value})
+        for key, value in after.items():
+            if key not in before:
+                changes.append({"path": path + [key], "op": ADDED, "after": value})
+            else:
+                _diff(before[key], value, path + [key], changes)
+        return
+    if isinstance(before, list) and isinstance(after, list):
+        _diff_lists(before, after, path, changes)
+        return
+    changes.append({"path": path, "op": CHANGED, "before": before, "after": after})
+
+
+def _diff_lists(
+    before: List[Any], after: List[Any], path: List[Any], changes: List[Dict[str, Any]]
+) -> None:
+    key = _identity_key(before, after)
+    if key is not None:
+        before_items = {_hashable(item[key]): item for item in before}
+        after_items = {_hashable(item[key]): item for item in after}
+        for identity, item in before_items.items():
+            if identity not in after_items:
+                changes.append({"path": path + [{key: item[key]}], "op": REMOVED, "before": item})
+        for identity, item in after_items.items():
+            element = path + [{key: item[key]}]
+            if identity not in before_items:
+                changes.append({"path": element, "op": ADDED, "after": item})
+            else:
+                _diff(before_items[identity], item, element, changes)
+        common = [identity for identity in before_items if identity in after_items]
+        if common != [identity for identity in after_items if identity in before_items]:
+            changes.append(
+                {
+                    "path": path,
+                    "op": REORDERED,
+                    "before": [item[key] for item in before],
+                    "after": [item[key] for item in after],
+                }
+            )
+        return
+    if all(isinstance(item, (Mapping, list)) for item in before + after):
+        for index in range(max(len(before), len(after))):
+            if index >= len(after):
+                changes.append({"path": path + [index], "op": REMOVED, "before": before[index]})
+            elif index >= len(before):
+                changes.append({"path": path + [index], "op": ADDED, "after": after[index]})
+            else:
+                _diff(before[index], after[index], path + [index], changes)
+        return
+    # Scalar lists (ports, command, environment) are small and order-sensitive.
+    changes.append({"path": path, "op": CHANGED, "before": before, "after": after})
+
+
+def compose_delta(before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]):
+    """Return the minimal list of changes turning ``before`` into ``after``."""
+    if before is None or after is None:
+        if before == after:
+            return []
+        return [{"path": [], "op": CHANGED, "before": before, "after": after}]
+    changes: List[Dict[str, Any]] = []
+    _diff(before, after, [], changes)
+    return changes
+
+
+def changed_services(
+    before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]
+) -> Dict[str, List[str]]:
+    """Group the top-level compose changes by service.
+
+    ``other`` lists changed top-level keys outside ``services`` (networks,
+    volumes, ``x-`` extensions); those can affect every service.
+    """
+    before_services = (before or {}).get("services") or {}
+    after_services = (after or {}).get("services") or {}
+    result: Dict[str, List[str]] = {
+        "added": [name for name in after_services if name not in before_services],
+        "removed": [name for name in before_services if name not in after_services],
+        "changed": [
+            name
+            for name, service in after_services.items()
+            if name in before_services and before_services[name] != service
+        ],
+        "other": [],
+    }
+    for key in list(before or {}) + [key for key in after or {} if key not in (before or {})]:
+        if key != "services" and (before or {}).get(key) != (after or {}).get(key):
+            result["other"].append(key)
+    return result
+
+
+def affected_services(summary: Mapping[str, List[str]]) -> List[str]:
+    """Names of the services a change summary touches, in report order."""
+    return list(summary["added"]) + list(summary["changed"]) + list(summary["removed"])
+
+
+def format_path(path: Sequence[Any]) -> str:
+    parts = []
+    for element in path:
+        if isinstance(element, int):
+            parts.append("[{}]".format(element))
+        elif isinstance(element, Mapping):
+            parts.append("[{}]".format(",".join("{}={}".format(k, v) for k, v in element.items())))
+        else:
+            parts.append(("." if parts else "") + str(element))
+    return "".join(parts) or "."
+
+
+def _format_value(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def format_delta(changes: Sequence[Mapping[str, Any]]) -> str:
+    """Render changes one per line for Ansible's ``--diff`` output."""
+    lines = []
+    for change in changes:
+        path = format_path(change["path"])
+        op = change["op"]
+        if op == ADDED:
+            lines.append("+ {}: {}".format(path, _format_value(change["after"])))
+        elif op == REMOVED:
+            lines.append("- {}: {}".format(path, _format_value(change["before"])))
+        else:
+            lines.append(
+                "~ {}: {} -> {}".format(
+                    path, _format_value(change["before"]), _format_value(change["after"])
+                )
+            )
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def build_diff(
+    before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]], mode: str = "full"
+) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """Return ``(diff, changes)`` for a module result.
+
+    ``full`` keeps both documents and returns no changes; ``minimal`` renders only
+    the delta as a prepared diff and returns the changes alongside it.
+    """
+    if mode == "minimal":
+        changes = compose_delta(before, after)
+        return {"prepared": format_delta(changes)}, changes
+    return {"before": before, "after": after}, None
@@ -1,10 +1,45 @@
 from __future__ import annotations
 
+import datetime
+import hashlib
+import re
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import Any, Dict, Mapping, Optional
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 CRON_FIELDS = ("minute", "hour", "dom", "month", "dow")
 
+# Inclusive value range of every field; a parsed field is an int with bit
+# ``value`` set for each value it matches.
+FIELD_RANGES = {
+    "minute": (0, 59),
+    "hour": (0, 23),
+    "dom": (1, 31),
+    "month": (1, 12),
+    "dow": (0, 6),
+}
+FIELD_NAMES = {
+    "month": {
+        name: number
+        for number, name in enumerate(
+            ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"),
+            start=1,
+        )
+    },
+    "dow": {
+        name: number
+        for number, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))
+    },
+}
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_STAGGER_WINDOW = "00:00-23:59"
+_WINDOW_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+
+# Parsed schedule: minute, hour, dom, month and dow bitsets, plus whether a day
+# has to match dom *or* dow (both restricted) rather than both.
+ParsedSchedule = Tuple[int, int, int, int, int, bool]
+
 
 def _normalize_cron_value(value: Any) -> str:
     if value is None:
@@ -12,6 +47,73 @@ def _normalize_cron_value(value: Any) -> str:
     return str(value)
 
 
+def _field_value(name: str, token: str) -> int:
+    token = token.strip().lower()
+    value = FIELD_NAMES.get(name, {}).get(token)
+    if value is None:
+        value = int(token)
+    return value
+
+
+def parse_field(name: str, value: Any) -> Optional[int]:
+    """Parse one cron field into a bitset, or ``None`` if it is not valid cron syntax.
+
+    Supports ``*``, numbers, month and weekday names, ranges, lists and steps
+    (``*/15``, ``1-10/2``, ``5/20``), so ``"0,30"`` and ``"*/30"`` parse to
+    the same bitset.
+    """
+    low, high = FIELD_RANGES[name]
+    # Both 0 and 7 are Sunday; 7 only counts as a value, not as a bit.
+    limit = 7 if name == "dow" else high
+    bits = 0
+    try:
+        for part in _normalize_cron_value(value).split(","):
+            base, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if base.strip() == "*":
+                start, end = low, high
+            elif "-" in base:
+                start, end = (_field_value(name, bound) for bound in base.split("-", 1))
+            else:
+                start = _field_value(name, base)
+                end = high if "/" in part else start
+            if step < 1 or not low <= start <= end <= limit:
+                return None
+            for number in range(start, end + 1, step):
+                bits |= 1 << (number % 7 if name == "dow" else number)
+    except ValueError:
+        return None
+    return bits
+
+
+@lru_cache(maxsize=4096)
+def _parse_schedule(
+    minute: str, hour: str, dom: str, month: str, dow: str
+) -> Optional[ParsedSchedule]:
+    values = (minute, hour, dom, month, dow)
+    parsed = [parse_field(name, value) for name, value in zip(CRON_FIELDS, values)]
+    if any(bits is None for bits in parsed):
+        return None
+    # Like cron, a day field is unrestricted only when it starts with "*".
+    day_or = not dom.strip().startswith("*") and not dow.strip().startswith("*")
+    return (parsed[0], parsed[1], parsed[2], parsed[3], parsed[4], day_or)
+
+
+def _bit_positions(bits: int) -> Iterator[int]:
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def _next_bit(bits: int, start: int) -> Optional[int]:
+    """Lowest set position in ``bits`` that is ``>= start``."""
+    remaining = bits >> start
+    if not remaining:
+        return None
+    return start + (remaining & -remaining).bit_length() - 1
+
+
 @dataclass(frozen=True)
 class CronSchedule:
     minute: str = "*"
@@ -34,12 +136,227 @@ class CronSchedule:
     def to_api(self) -> Dict[str, str]:
         return {field: getattr(self, field) for field in CRON_FIELDS}
 
+    @property
+    def parsed(self) -> Optional[ParsedSchedule]:
+        """Bitsets of the schedule, or ``None`` when a field is not valid cron syntax."""
+        return _parse_schedule(self.minute, self.hour, self.dom, self.month, self.dow)
+
     def matches(self, other: Optional[Mapping[str, Any]]) -> bool:
-        other_schedule = {field: "*" for field in CRON_FIELDS}
-        if other:
-            for field in CRON_FIELDS:
-                other_schedule[field] = _normalize_cron_value(other.get(field))
-        return other_schedule == self.to_api()
+        """Whether ``other`` fires at exactly the same times.
+
+        Falls back to comparing the raw strings when either side does not parse.
+        """
+        other_schedule = CronSchedule.from_mapping(other)
+        parsed = self.parsed
+        if parsed is not None and other_schedule.parsed is not None:
+            return parsed == other_schedule.parsed
+        return other_schedule.to_api() == self.to_api()
+
+    def fires_on(self, day: datetime.date) -> bool:
+        parsed = self._require_parsed()
+        _, _, dom, month, dow, day_or = parsed
+        if not month >> day.month & 1:
+            return False
+        dom_match = bool(dom >> day.day & 1)
+        dow_match = bool(dow >> (day.isoweekday() % 7) & 1)
+        return dom_match or dow_match if day_or else dom_match and dow_match
+
+    def next_run(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        """First minute strictly after ``after`` at which the job fires.
+
+        Whole days and months that cannot match are skipped, so this costs at
+        most a few thousand bit tests. Returns ``None`` for schedules that
+        never fire (such as 30 February). The result keeps ``after.tzinfo``;
+        DST transitions are not accounted for.
+        """
+        minutes, hours, _, months, _, _ = self._require_parsed()
+        start = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        day = start.date()
+        # Leap days can be eight years apart (2096 -> 2104).
+        end = day + datetime.timedelta(days=8 * 366)
+        while day < end:
+            if not months >> day.month & 1:
+                day = (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+                continue
+            if self.fires_on(day):
+                today = day == start.date()
+                hour_from, minute_from = (start.hour, start.minute) if today else (0, 0)
+                hour = _next_bit(hours, hour_from)
+                minute = _next_bit(minutes, 0)
+                if hour == hour_from:
+                    first = _next_bit(minutes, minute_from)
+                    if first is None:
+                        hour = _next_bit(hours, hour + 1)
+                    else:
+                        minute = first
+                if hour is not None:
+                    return datetime.datetime.combine(
+                        day, datetime.time(hour, minute), tzinfo=after.tzinfo
+                    )
+            day += datetime.timedelta(days=1)
+        return None
+
+    def _require_parsed(self) -> ParsedSchedule:
+        parsed = self.parsed
+        if parsed is None:
+            raise ValueError("Invalid cron schedule: {}".format(" ".join(self.to_api().values())))
+        return parsed
+
+
+def minute_histogram(
+    schedules: Iterable[CronSchedule], day: Optional[datetime.date] = None
+) -> List[int]:
+    """Number of schedules firing in each minute of the day (index ``hour * 60 + minute``).
+
+    With ``day`` only schedules that fire on that date count; without it every
+    schedule counts as if it fired daily, which shows the worst case. Invalid
+    schedules are skipped. Identical minute/hour patterns are counted once and
+    weighted, so thousands of jobs on a handful of schedules stay cheap.
+    """
+    patterns: Counter = Counter()
+    for schedule in schedules:
+        parsed = schedule.parsed
+        if parsed is None or (day is not None and not schedule.fires_on(day)):
+            continue
+        patterns[parsed[0], parsed[1]] += 1
+
+    counts = [0] * MINUTES_PER_DAY
+    rows: Dict[int, List[int]] = {}
+    for (minutes, hours), weight in patterns.items():
+        positions = rows.setdefault(minutes, list(_bit_positions(minutes)))
+        for hour in _bit_positions(hours):
+            base = hour * 60
+            for minute in positions:
+                counts[base + minute] += weight
+    return counts
+
+
+def busiest_minutes(histogram: Sequence[int], limit: int = 5) -> List[Tuple[int, int]]:
+    """``(minute_of_day, count)`` of the ``limit`` busiest minutes, busiest first."""
+    ranked = sorted(
+        (minute for minute, count in enumerate(histogram) if count),
+        key=lambda minute: (-histogram[minute], minute),
+    )
+    return [(minute, histogram[minute]) for minute in ranked[:limit]]
+
+
+def parse_window(window: str) -> List[int]:
+    """Minutes of the day covered by ``"HH:MM-HH:MM"``, both ends included.
+
+    A window whose end is before its start wraps past midnight, so
+    ``"23:00-01:00"`` covers 121 minutes.
+    """
+    match = _WINDOW_RE.match(window or "")
+    if not match:
+        raise ValueError("Stagger window must look like HH:MM-HH:MM, got {!r}".format(window))
+    start_hour, start_minute, end_hour, end_minute = (int(part) for part in match.groups())
+    if max(start_hour, end_hour) > 23 or max(start_minute, end_minute) > 59:
+        raise ValueError("Stagger window {!r} is not a valid time range".format(window))
+    start = start_hour * 60 + start_minute
+    end = end_hour * 60 + end_minute
+    length = (end - start) % MINUTES_PER_DAY + 1
+    return [(start + offset) % MINUTES_PER_DAY for offset in range(length)]
+
+
+def stagger_slot(key: str, histogram: Sequence[int], window: str = DEFAULT_STAGGER_WINDOW) -> int:
+    """Pick the least loaded minute of ``window`` for the job identified by ``key``.
+
+    Ties are broken by walking the window from a position derived from a hash
+    of ``key``, so the same key and load always give the same minute while
+    different keys spread out over an idle window.
+    """
+    slots = parse_window(window)
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    offset = int.from_bytes(digest[:8], "big") % len(slots)
+    best = min(
+        range(len(slots)),
+        key=lambda index: (histogram[slots[index]], (index - offset) % len(slots)),
+    )
+    return slots[best]
+
+
+def _daily_slot(schedule: CronSchedule) -> Optional[int]:
+    """Minute of the day of a schedule that fires at a single time of day."""
+    parsed = schedule.parsed
+    if parsed is None:
+        return None
+    minutes, hours = parsed[0], parsed[1]
+    if minutes & (minutes - 1) or hours & (hours - 1):
+        return None
+    return (hours.bit_length() - 1) * 60 + minutes.bit_length() - 1
+
+
+def stagger_schedule(
+    schedule: CronSchedule,
+    key: str,
+    jobs: Iterable[Mapping[str, Any]],
+    window: str = DEFAULT_STAGGER_WINDOW,
+    name: Optional[str] = None,
+) -> Tuple[CronSchedule, int]:
+    """Fill in the minute and hour of ``schedule`` from the load of ``jobs``.
+
+    Returns the schedule and the number of other enabled jobs firing in the
+    chosen minute. The job called ``name`` is left out of the load; when it
+    already fires once a day inside ``window`` on the same days, its time is
+    kept so that reruns never move a job because other jobs were added.
+    """
+    slots = parse_window(window)
+    others = []
+    current = None
+    for job in jobs:
+        if name is not None and job.get("description") == name:
+            current = current or job
+        elif job.get("enabled", True):
+            others.append(CronSchedule.from_mapping(job.get("schedule")))
+    histogram = minute_histogram(others)
+
+    slot = None
+    if current is not None:
+        existing = CronSchedule.from_mapping(current.get("schedule"))
+        days = CronSchedule(dom=schedule.dom, month=schedule.month, dow=schedule.dow)
+        same_days = CronSchedule(dom=existing.dom, month=existing.month, dow=existing.dow)
+        kept = _daily_slot(existing)
+        if kept in slots and days.matches(same_days.to_api()):
+            slot = kept
+    if slot is None:
+        slot = stagger_slot(key, histogram, window)
+    hour, minute = divmod(slot, 60)
+    staggered = CronSchedule(
+        minute=str(minute), hour=str(hour), dom=schedule.dom, month=schedule.month, dow=schedule.dow
+    )
+    return staggered, histogram[slot]
+
+
+def apply_stagger(
+    params: Mapping[str, Any], jobs: Iterable[Mapping[str, Any]]
+) -> Tuple[Mapping[str, Any], Optional[Dict[str, Any]]]:
+    """Resolve a ``stagger`` option into a concrete schedule.
+
+    Returns the module parameters with the staggered schedule and a summary
+    for the module result, or the parameters unchanged and ``None`` without
+    ``stagger``. Raises ``ValueError`` for an invalid window or when the
+    schedule also sets a minute or hour.
+    """
+    stagger = params.get("stagger")
+    if not stagger:
+        return params, None
+    schedule = dict(params.get("schedule") or {})
+    if schedule.get("minute") is not None or schedule.get("hour") is not None:
+        raise ValueError("schedule.minute and schedule.hour cannot be combined with stagger")
+    window = stagger.get("window") or DEFAULT_STAGGER_WINDOW
+    staggered, load = stagger_schedule(
+        CronSchedule.from_mapping(schedule),
+        stagger.get("key") or params["name"],
+        jobs,
+        window,
+        name=params["name"],
+    )
+    summary = {
+        "time": "{:02d}:{:02d}".format(int(staggered.hour), int(staggered.minute)),
+        "window": window,
+        "load": load,
+    }
+    return dict(params, schedule=staggered.to_api()), summary
 
 
 @dataclass(frozen=True)
@@ -111,3 +428,60 @@ def extract_relevant_job_state(job: Optional[Mapping[str, Any]]) -> Optional[Dic
         "enabled": bool(job.get("enabled", True)),
         "schedule": schedule,
     }
+
+
+def index_jobs(jobs: Iterable[Mapping[str, Any]]) -> Dict[str, Mapping[str, Any]]:
+    """Index cron jobs by description, keeping the first job for duplicates."""
+    indexed: Dict[str, Mapping[str, Any]] = {}
+    for job in jobs:
+        indexed.setdefault(job.get("description"), job)
+    return indexed
+
+
+@dataclass(frozen=True)
+class CronJobPlan:
+    create: List[CronJobSpec] = field(default_factory=list)
+    update: List[Tuple[Mapping[str, Any], CronJobSpec]] = field(default_factory=list)
+    delete: List[Mapping[str, Any]] = field(default_factory=list)
+    unchanged: List[Tuple[Mapping[str, Any], CronJobSpec]] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.create or self.update or self.delete)
+
+
+def plan_cronjobs(
+    specs: Sequence[CronJobSpec],
+    jobs: Iterable[Mapping[str, Any]],
+    absent: Iterable[str] = (),
+    exclusive: bool = False,
+) -> CronJobPlan:
+    """Compute the minimal set of writes that turns ``jobs`` into ``specs``.
+
+    ``absent`` names jobs that must be removed. With ``exclusive`` every
+    existing job that is not matched to a spec is removed as well, including
+    duplicates of a listed description.
+    """
+    jobs = list(jobs)
+    indexed = index_jobs(jobs)
+    plan = CronJobPlan()
+    kept = set()
+
+    for spec in specs:
+        job = indexed.get(spec.name)
+        if job is None:
+            plan.create.append(spec)
+            continue
+        kept.add(id(job))
+        if spec.matches(job):
+            plan.unchanged.append((job, spec))
+        else:
+            plan.update.append((job, spec))
+
+    absent = set(absent)
+    for job in jobs:
+        if id(job) in kept:
+            continue
+        if exclusive or job.get("description") in absent:
+            plan.delete.append(job)
+    return plan
@@ -0,0 +1,148 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Run the same client operation against many TrueNAS SCALE nodes at once.
+
+Each node gets its own :class:`TruenasClient` on a bounded set of worker
+threads. A node that exceeds its timeout is reported as failed and its slot
+is handed to a fresh worker; the abandoned call finishes (or not) in a daemon
+thread that never delays the exit of the module or plugin.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+
+CREDENTIALS = ("api_key", "username", "password", "verify_ssl")
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class Node:
+    name: str
+    uri: str
+    api_key: Optional[str] = None
+    username: Optional[str] = None
+    password: Optional[str] = None
+    verify_ssl: bool = True
+
+    @classmethod
+    def from_dict(cls, node: Mapping[str, Any], defaults: Optional[Mapping[str, Any]] = None):
+        """Build a node from an options dict; missing credentials come from ``defaults``."""
+        if not isinstance(node, Mapping) or not node.get("name"):
+            raise ValueError("Every node needs a 'name'")
+        settings = {key: (defaults or {}).get(key) for key in CREDENTIALS}
+        settings.update((key, node[key]) for key in CREDENTIALS if node.get(key) is not None)
+        if settings["verify_ssl"] is None:
+            settings["verify_ssl"] = True
+        uri = node.get("uri") or "wss://{}/api/current".format(node["name"])
+        return cls(name=node["name"], uri=uri, **settings)
+
+    def connect(self) -> TruenasClient:
+        return TruenasClient(
+            uri=self.uri,
+            api_key=self.api_key,
+            username=self.username,
+            password=self.password,
+            verify_ssl=self.verify_ssl,
+        )
+
+
+@dataclass
+class NodeResult:
+    node: str
+    ok: bool = False
+    result: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+def run_on_nodes(
+    nodes: Sequence[Node],
+    operation: Callable[[TruenasClient], Any],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    timeout: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> List[NodeResult]:
+    """Connect to every node, run ``operation(client)`` and return results in node order.
+
+    At most ``max_workers`` nodes are in flight. ``timeout`` bounds each node
+    (connect plus operation) from the moment its worker picks it up. Errors
+    never propagate; they are reported in the node's :class:`NodeResult`.
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    names = [node.name for node in nodes]
+    if len(set(names)) != len(names):
+        raise ValueError("Node names must be unique")
+    queue = deque(nodes)
+    results: Dict[str, NodeResult] = {}
+    started: Dict[str, float] = {}
+    condition = threading.Condition()
+
+    def settle(outcome: NodeResult) -> None:
+        # Called with the condition held; the first outcome of a node wins.
+        if outcome.node not in results:
+            results[outcome.node] = outcome
+            condition.notify_all()
+
+    def worker() -> None:
+        while True:
+            with condition:
+                if not queue:
+                    return
+                node = queue.popleft()
+                started[node.name] = clock()
+            outcome = NodeResult(node=node.name)
+            try:
+                with node.connect() as client:
+                    outcome.result = operation(client)
+                outcome.ok = True
+            except Exception as exc:
+                outcome.error = "{}: {}".format(type(exc).__name__, exc)
+            with condition:
+                outcome.seconds = clock() - started[node.name]
+                timed_out = node.name in results
+                settle(outcome)
+                if timed_out:
+                    # A replacement worker already took over this slot.
+                    return
+
+    def spawn() -> None:
+        threading.Thread(target=worker, daemon=True).start()
+
+    with condition:
+        for _ in range(min(max_workers, len(queue))):
+            spawn()
+        while len(results) < len(nodes):
+            wait = None
+            if timeout is not None:
+                now = clock()
+                for name, since in started.items():
+                    if name in results:
+                        continue
+                    remaining = since + timeout - now
+                    if remaining <= 0:
+                        settle(
+                            NodeResult(
+                                node=name,
+                                error="Timed out after {:g}s".format(timeout),
+                                seconds=now - since,
+                            )
+                        )
+                        if queue:
+                            spawn()
+                    else:
+                        wait = remaining if wait is None else min(wait, remaining)
+                if len(results) >= len(nodes):
+                    break
+                if wait is None:
+                    # Nodes still queued start once a worker frees up.
+                    wait = timeout
+            condition.wait(wait)
+    return [results[node.name] for node in nodes]
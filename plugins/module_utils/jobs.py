@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+JOB_FINISHED_STATES = ("SUCCESS", "FAILED", "ABORTED")
+JOB_FIELDS = ["id", "method", "state", "progress", "result", "error"]
+
+# Outcome states that never reach the middleware job table.
+TIMEOUT = "TIMEOUT"
+NOT_STARTED = "NOT_STARTED"
+
+
+@dataclass
+class JobRequest:
+    """A unit of work made of one or more middleware jobs run in order.
+
+    Each step is a callable that submits a job and returns its id without
+    waiting for it, e.g. ``lambda: client.submit_app_job("stop", name)``.
+    """
+
+    key: str
+    steps: Sequence[Callable[[], int]]
+
+
+@dataclass
+class JobOutcome:
+    key: str
+    state: str = NOT_STARTED
+    job_id: Optional[int] = None
+    job_ids: List[int] = field(default_factory=list)
+    progress: Optional[Dict[str, Any]] = None
+    result: Any = None
+    error: Optional[str] = None
+    step: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.state == "SUCCESS"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "state": self.state,
+            "job_id": self.job_id,
+            "job_ids": list(self.job_ids),
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+def _pause(
+    poll_interval: float,
+    deadline: Optional[float],
+    clock: Callable[[], float],
+    sleep: Callable[[float], None],
+) -> bool:
+    """Sleep until the next poll, never past ``deadline``; ``False`` once it has passed."""
+    if deadline is None:
+        sleep(poll_interval)
+        return True
+    remaining = deadline - clock()
+    if remaining > 0:
+        sleep(min(poll_interval, remaining))
+    return clock() < deadline
+
+
+def run_jobs(
+    requests: Iterable[JobRequest],
+    fetch: Callable[[List[int]], Iterable[Mapping[str, Any]]],
+    concurrency: int = 4,
+    timeout: Optional[float] = None,
+    poll_interval: float = 1.0,
+    on_progress: Optional[Callable[[JobOutcome], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> List[JobOutcome]:
+    """Submit jobs without blocking and wait for all of them together.
+
+    At most ``concurrency`` requests have a job in flight at any time. All
+    in-flight jobs are polled with a single ``fetch(job_ids)`` call per round
+    (normally a filtered ``core.get_jobs``). When ``timeout`` expires, jobs
+    still running are reported as ``TIMEOUT`` and requests that were never
+    submitted as ``NOT_STARTED``; the middleware keeps running whatever was
+    already submitted.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    pending = deque()
+    outcomes: List[JobOutcome] = []
+    for request in requests:
+        outcome = JobOutcome(key=request.key)
+        outcomes.append(outcome)
+        pending.append((request, outcome))
+
+    deadline = None if timeout is None else clock() + timeout
+    running: Dict[int, tuple] = {}
+
+    def submit(request: JobRequest, outcome: JobOutcome) -> None:
+        try:
+            job_id = request.steps[outcome.step]()
+        except Exception as exc:
+            outcome.state = "FAILED"
+            outcome.error = str(exc)
+            return
+        outcome.job_id = job_id
+        outcome.job_ids.append(job_id)
+        outcome.state = "RUNNING"
+        running[job_id] = (request, outcome)
+
+    while pending or running:
+        while pending and len(running) < concurrency:
+            submit(*pending.popleft())
+
+        if not running:
+            continue
+
+        for job in fetch(list(running)):
+            entry = running.get(job.get("id"))
+            if entry is None:
+                continue
+            request, outcome = entry
+            progress = job.get("progress")
+            if progress != outcome.progress:
+                outcome.progress = progress
+                if on_progress is not None:
+                    on_progress(outcome)
+            state = job.get("state")
+            if state not in JOB_FINISHED_STATES:
+                continue
+            del running[job["id"]]
+            outcome.result = job.get("result")
+            if state != "SUCCESS":
+                outcome.state = state
+                outcome.error = job.get("error") or "Job {} ended in state {}".format(
+                    job["id"], state
+                )
+            elif outcome.step + 1 < len(request.steps):
+                outcome.step += 1
+                pending.appendleft((request, outcome))
+            else:
+                outcome.state = "SUCCESS"
+
+        if deadline is not None and clock() >= deadline:
+            break
+        # Only wait when no slot was freed for a request that is still queued.
+        if running and (not pending or len(running) >= concurrency):
+            if not _pause(poll_interval, deadline, clock, sleep):
+                # A job seen finished after this point finished too late.
+                break
+
+    for _, outcome in running.values():
+        outcome.state = TIMEOUT
+        outcome.error = "Timed out waiting for job {}".format(outcome.job_id)
+    for _, outcome in pending:
+        if outcome.job_ids:
+            # A multi-step request whose next step was still queued.
+            outcome.state = TIMEOUT
+            outcome.error = "Timed out before step {} was submitted".format(outcome.step + 1)
+        else:
+            outcome.state = NOT_STARTED
+            outcome.error = "Job was not submitted before the timeout expired"
+    return outcomes
+
+
+def poll_jobs(
+    job_ids: Sequence[int],
+    fetch: Callable[[List[int]], Iterable[Mapping[str, Any]]],
+    wait: bool = False,
+    timeout: Optional[float] = None,
+    poll_interval: float = 1.0,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[int, Dict[str, Any]]:
+    """Return the latest record of every job in ``job_ids``, keyed by id.
+
+    Each round is a single ``fetch`` of the jobs that have not finished yet.
+    With ``wait`` the rounds repeat until every job has finished or
+    ``timeout`` expires. Ids the middleware does not know are left out.
+    """
+    deadline = None if timeout is None else clock() + timeout
+    records: Dict[int, Dict[str, Any]] = {}
+    unfinished = list(dict.fromkeys(job_ids))
+    while unfinished:
+        for job in fetch(unfinished):
+            records[job["id"]] = dict(job)
+        unfinished = [
+            job_id
+            for job_id in unfinished
+            if job_id in records and records[job_id].get("state") not in JOB_FINISHED_STATES
+        ]
+        if not wait or not unfinished or not _pause(poll_interval, deadline, clock, sleep):
+            break
+    return records
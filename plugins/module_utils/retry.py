@@ -0,0 +1,256 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Retries with backoff and a circuit breaker around middleware calls.
+
+Only idempotent methods are retried; a failed ``app.update`` or
+``cronjob.create`` might already have been applied. The breaker state is kept
+in the host cache directory, so the task after a run of connection failures
+fails fast instead of waiting for its own timeouts.
+
+Configured from the environment:
+
+``TRUENAS_CLIENT_RETRIES``
+    Attempts per idempotent call (default 3; 1 disables retries).
+``TRUENAS_CLIENT_RETRY_BACKOFF`` / ``TRUENAS_CLIENT_RETRY_MAX_BACKOFF``
+    First and largest delay between attempts, in seconds (0.5 and 8).
+``TRUENAS_CLIENT_RETRY_METHODS``
+    Comma-separated method patterns retried in addition to the defaults.
+``TRUENAS_CLIENT_BREAKER_THRESHOLD``
+    Consecutive transient failures that open the breaker (default 5; 0 disables).
+``TRUENAS_CLIENT_BREAKER_RESET``
+    Seconds an open breaker rejects calls before letting one through (30).
+"""
+
+import errno
+import fnmatch
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Tuple
+from urllib.parse import quote
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cache
+
+# Methods that can be repeated without changing anything on the middleware.
+DEFAULT_RETRY_METHODS = (
+    "*.query",
+    "*.config",
+    "auth.login",
+    "auth.login_with_api_key",
+    "core.get_jobs",
+    "core.get_methods",
+)
+TRANSIENT_ERRNOS = frozenset(
+    (
+        errno.EAGAIN,
+        errno.EBUSY,
+        errno.ECONNABORTED,
+        errno.ECONNREFUSED,
+        errno.ECONNRESET,
+        errno.EPIPE,
+        errno.ETIMEDOUT,
+    )
+)
+# Exception class names raised by truenas_api_client and its websocket stack
+# (or relayed by the broker) for a dropped or unresponsive connection.
+TRANSIENT_ERROR_TYPES = frozenset(
+    (
+        "CallTimeout",
+        "ConnectionClosed",
+        "WebSocketConnectionClosedException",
+        "WebSocketTimeoutException",
+    )
+)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a middleware that recently kept failing."""
+
+
+def _error_type(exc: BaseException) -> str:
+    return getattr(exc, "error_type", None) or type(exc).__name__
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether ``exc`` is a connection or load problem worth retrying."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if _error_type(exc) in TRANSIENT_ERROR_TYPES:
+        return True
+    return getattr(exc, "errno", None) in TRANSIENT_ERRNOS
+
+
+def _needs_reconnect(exc: BaseException) -> bool:
+    return isinstance(exc, ConnectionError) or "Closed" in _error_type(exc)
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else default
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 8.0
+    methods: Tuple[str, ...] = DEFAULT_RETRY_METHODS
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        extra = os.environ.get("TRUENAS_CLIENT_RETRY_METHODS", "")
+        return cls(
+            max_attempts=max(1, int(_env_number("TRUENAS_CLIENT_RETRIES", cls.max_attempts))),
+            backoff=_env_number("TRUENAS_CLIENT_RETRY_BACKOFF", cls.backoff),
+            max_backoff=_env_number("TRUENAS_CLIENT_RETRY_MAX_BACKOFF", cls.max_backoff),
+            methods=DEFAULT_RETRY_METHODS
+            + tuple(pattern.strip() for pattern in extra.split(",") if pattern.strip()),
+        )
+
+    def allows(self, method: str) -> bool:
+        return any(fnmatch.fnmatchcase(method, pattern) for pattern in self.methods)
+
+    def delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter before attempt ``attempt + 1``."""
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker shared by every module run on the host.
+
+    The state file is read once, when the client connects; after that the
+    breaker only writes, and only when the failure count changes.
+    """
+
+    def __init__(self, endpoint: str, threshold: int = 5, reset_timeout: float = 30.0):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.path = cache.cache_path("breaker", "{}.json".format(quote(endpoint, safe="")))
+        state = cache.read_json(self.path) if threshold > 0 else None
+        state = state if isinstance(state, dict) else {}
+        self.failures = int(state.get("failures") or 0)
+        self.opened_at = float(state.get("opened_at") or 0)
+
+    @classmethod
+    def from_env(cls, endpoint: str) -> "CircuitBreaker":
+        return cls(
+            endpoint,
+            threshold=int(_env_number("TRUENAS_CLIENT_BREAKER_THRESHOLD", 5)),
+            reset_timeout=_env_number("TRUENAS_CLIENT_BREAKER_RESET", 30.0),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def check(self) -> None:
+        """Raise :class:`CircuitOpenError` while the breaker is open."""
+        if not self.enabled or self.failures < self.threshold:
+            return
+        remaining = self.opened_at + self.reset_timeout - time.time()
+        if remaining > 0:
+            raise CircuitOpenError(
+                "Middleware at {} failed {} times in a row; "
+                "not calling it for another {:.0f}s".format(self.endpoint, self.failures, remaining)
+            )
+        # Half-open: let this call through; one more failure re-opens the breaker.
+        self.failures = self.threshold - 1
+
+    def record_success(self) -> None:
+        if self.enabled and self.failures:
+            self.failures = 0
+            self.opened_at = 0.0
+            cache.write_json(self.path, {"failures": 0, "opened_at": 0})
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.time()
+        cache.write_json(self.path, {"failures": self.failures, "opened_at": self.opened_at})
+
+
+class RetryingBackend:
+    """Backend proxy that reconnects, retries idempotent calls and trips the breaker."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        policy: RetryPolicy,
+        breaker: CircuitBreaker,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._connect = connect
+        self._policy = policy
+        self._breaker = breaker
+        self._sleep = sleep
+        self._backend = None
+        self._attempt(self._ensure_backend, retry=True)
+
+    def _ensure_backend(self):
+        if self._backend is None:
+            self._backend = self._connect()
+        return self._backend
+
+    def _drop_backend(self) -> None:
+        backend, self._backend = self._backend, None
+        if backend is not None:
+            try:
+                backend.close()
+            except Exception:
+                pass
+
+    def _attempt(self, func: Callable[[], Any], retry: bool):
+        attempt = 0
+        while True:
+            attempt += 1
+            self._breaker.check()
+            try:
+                result = func()
+            except Exception as exc:
+                if not is_transient(exc):
+                    # The middleware answered; it is up even if the call was wrong.
+                    self._breaker.record_success()
+                    raise
+                self._breaker.record_failure()
+                if _needs_reconnect(exc):
+                    self._drop_backend()
+                if not retry or attempt >= self._policy.max_attempts:
+                    raise
+                self._sleep(self._policy.delay(attempt))
+                continue
+            self._breaker.record_success()
+            return result
+
+    def call(self, method: str, *args: Any, **kwargs: Any):
+        return self._attempt(
+            lambda: self._ensure_backend().call(method, *args, **kwargs),
+            retry=self._policy.allows(method),
+        )
+
+    def subscribe(self, name: str, callback: Callable[..., None]):
+        # Not retried: a reconnect drops subscriptions, so callers keep
+        # polling as a safety net instead of relying on events alone.
+        return self._attempt(lambda: self._ensure_backend().subscribe(name, callback), retry=False)
+
+    def unsubscribe(self, ident: Any) -> None:
+        if self._backend is not None:
+            self._backend.unsubscribe(ident)
+
+    def close(self):
+        self._drop_backend()
+
+
+def wrap(connect: Callable[[], Any], endpoint: str = "local"):
+    """Connect through ``connect`` and apply the policy from the environment."""
+    policy = RetryPolicy.from_env()
+    breaker = CircuitBreaker.from_env(endpoint)
+    if policy.max_attempts <= 1 and not breaker.enabled:
+        return connect()
+    return RetryingBackend(connect, policy, breaker)
@@ -0,0 +1,92 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Dependency-ordered rollout of applications in parallel waves.
+
+Every app names the apps it depends on. :func:`plan_waves` layers the graph
+so that each app lands in the wave after its last dependency, and
+:func:`roll_out` runs the waves in order. A stack of N apps therefore takes
+as many rounds as its dependency chain is long instead of N, and an app
+whose dependency failed is skipped instead of being deployed against it.
+"""
+
+import time
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+class DependencyError(ValueError):
+    """Raised for dependencies on unknown apps or dependency cycles."""
+
+
+def plan_waves(dependencies: Mapping[str, Sequence[str]]) -> List[List[str]]:
+    """Group apps into waves; every app comes after all of its dependencies.
+
+    Apps keep their input order inside a wave.
+    """
+    unknown = sorted(
+        {dep for deps in dependencies.values() for dep in deps if dep not in dependencies}
+    )
+    if unknown:
+        raise DependencyError("Unknown dependencies: {}".format(", ".join(unknown)))
+
+    remaining = {name: set(deps) for name, deps in dependencies.items()}
+    done = set()
+    waves = []
+    while remaining:
+        wave = [name for name in dependencies if name in remaining and remaining[name] <= done]
+        if not wave:
+            raise DependencyError(
+                "Dependency cycle between: {}".format(", ".join(_cycle_members(remaining)))
+            )
+        waves.append(wave)
+        done.update(wave)
+        for name in wave:
+            del remaining[name]
+    return waves
+
+
+def _cycle_members(remaining: Mapping[str, set]) -> List[str]:
+    # Drop apps nothing else is waiting for until only the cycles are left.
+    stuck = dict(remaining)
+    while True:
+        needed = {dep for deps in stuck.values() for dep in deps}
+        pruned = {name: deps for name, deps in stuck.items() if name in needed}
+        if len(pruned) == len(stuck):
+            return sorted(pruned)
+        stuck = pruned
+
+
+def roll_out(
+    waves: Sequence[Sequence[str]],
+    dependencies: Mapping[str, Sequence[str]],
+    run_wave: Callable[[List[str], Optional[float]], Mapping[str, str]],
+    timeout: Optional[float] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Run ``waves`` in order; return ``(failed, skipped)`` as ``{name: error}``.
+
+    ``run_wave(names, seconds_left)`` deploys one wave, waits for it to be
+    ready and returns the errors of the apps that failed. ``seconds_left`` is
+    what remains of ``timeout`` (``None`` without a timeout). Apps with a
+    failed or skipped dependency, and waves reached after the timeout, are
+    skipped instead of being passed to ``run_wave``.
+    """
+    deadline = None if timeout is None else clock() + timeout
+    failed: Dict[str, str] = {}
+    skipped: Dict[str, str] = {}
+    for wave in waves:
+        runnable = []
+        for name in wave:
+            blocked = [dep for dep in dependencies.get(name, ()) if dep in failed or dep in skipped]
+            if blocked:
+                skipped[name] = "Skipped because {} failed".format(", ".join(blocked))
+            else:
+                runnable.append(name)
+        if not runnable:
+            continue
+        seconds_left = None if deadline is None else deadline - clock()
+        if seconds_left is not None and seconds_left <= 0:
+            for name in runnable:
+                skipped[name] = "Not started before the timeout expired"
+            continue
+        failed.update(run_wave(runnable, seconds_left))
+    return failed, skipped
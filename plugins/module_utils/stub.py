@@ -0,0 +1,529 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""File-backed emulation of the middleware, selected with ``TRUENAS_CLIENT_BACKEND=stub``.
+
+Kept out of ``truenas_client`` so real module runs never import it.
+"""
+
+import copy
+import errno
+import fnmatch
+import operator
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    stub_state,
+    yamlutils,
+)
+
+
+_FILTER_OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, other: value in other,
+    "nin": lambda value, other: value not in other,
+    "rin": lambda value, other: value is not None and other in value,
+    "rnin": lambda value, other: value is not None and other not in value,
+    "^": lambda value, other: isinstance(value, str) and value.startswith(other),
+    "$": lambda value, other: isinstance(value, str) and value.endswith(other),
+    "~": lambda value, other: isinstance(value, str) and re.match(other, value) is not None,
+}
+
+
+def _get_path(record: Mapping[str, Any], path: str) -> Any:
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _match_filter(record: Mapping[str, Any], query_filter: Sequence[Any]) -> bool:
+    if len(query_filter) == 2 and query_filter[0] == "OR":
+        return any(_match_filters(record, [branch]) for branch in query_filter[1])
+    path, op, other = query_filter
+    if op not in _FILTER_OPERATORS:
+        raise ValueError("Unsupported stub filter operator: {}".format(op))
+    try:
+        return bool(_FILTER_OPERATORS[op](_get_path(record, path), other))
+    except TypeError:
+        return False
+
+
+def _match_filters(record: Mapping[str, Any], filters: Sequence[Any]) -> bool:
+    for query_filter in filters:
+        # ``["OR", [...]]`` branches may hold a single filter or a list of them.
+        if query_filter and not isinstance(query_filter[0], (list, tuple)):
+            if not _match_filter(record, query_filter):
+                return False
+        elif not all(_match_filter(record, item) for item in query_filter):
+            return False
+    return True
+
+
+def _select_fields(record: Mapping[str, Any], select: Sequence[str]) -> Dict[str, Any]:
+    selected: Dict[str, Any] = {}
+    for path in select:
+        if path in record:
+            selected[path] = record[path]
+        elif "." in path:
+            selected[path] = _get_path(record, path)
+    return selected
+
+
+def _filter_records(
+    records: List[Dict[str, Any]],
+    filters: Optional[Sequence[Any]] = None,
+    options: Optional[Mapping[str, Any]] = None,
+):
+    """Emulate the middleware ``*.query`` filter/option semantics on a list."""
+    options = options or {}
+    matched = [dict(record) for record in records if _match_filters(record, filters or [])]
+    for key in reversed(options.get("order_by") or []):
+        reverse = key.startswith("-")
+        field_name = key.lstrip("-")
+        matched.sort(
+            key=lambda record: (
+                _get_path(record, field_name) is None,
+                _get_path(record, field_name),
+            ),
+            reverse=reverse,
+        )
+    offset = options.get("offset") or 0
+    limit = options.get("limit") or None
+    matched = matched[offset:offset + limit if limit else None]
+    if options.get("count"):
+        return len(matched)
+    if options.get("select"):
+        matched = [_select_fields(record, options["select"]) for record in matched]
+    if options.get("get"):
+        if not matched:
+            raise ValueError("MatchNotFound()")
+        return matched[0]
+    return matched
+
+
+# Middleware methods that run as jobs; the stub records them in ``state["jobs"]``.
+_STUB_JOB_METHODS = (
+    "app.create",
+    "app.update",
+    "app.delete",
+    "app.stop",
+    "app.start",
+    "app.redeploy",
+)
+_STUB_METHODS = _STUB_JOB_METHODS + (
+    "app.query",
+    "auth.login",
+    "auth.login_with_api_key",
+    "core.get_jobs",
+    "core.get_methods",
+    "cronjob.query",
+    "cronjob.create",
+    "cronjob.update",
+    "cronjob.delete",
+)
+_STUB_AUTH_METHODS = ("auth.login", "auth.login_with_api_key")
+_STUB_QUERY_METHODS = ("app.query", "cronjob.query")
+_STUB_JOB_HISTORY = 1000
+
+
+def _ready_at() -> float:
+    """When an app entering a transitional state settles, per the latency settings."""
+    job_latency = float(os.environ.get("TRUENAS_STUB_JOB_LATENCY") or 0)
+    app_latency = float(os.environ.get("TRUENAS_STUB_APP_LATENCY") or 0)
+    return time.time() + job_latency + app_latency
+
+
+def _app_view(app: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """The app as ``app.query`` reports it at ``now``.
+
+    ``DEPLOYING`` and ``UPDATING`` apps turn ``RUNNING`` once their
+    ``ready_at`` has passed, or ``CRASHED`` when their name matches a pattern
+    in ``TRUENAS_STUB_CRASH_APPS``.
+    """
+    view = dict(app)
+    ready_at = view.pop("ready_at", 0)
+    if view.get("state") in _STUB_TRANSITIONAL_STATES and (now or time.time()) >= ready_at:
+        crashing = os.environ.get("TRUENAS_STUB_CRASH_APPS", "").split(",")
+        if any(pattern and fnmatch.fnmatchcase(view["name"], pattern) for pattern in crashing):
+            view["state"] = "CRASHED"
+        else:
+            view["state"] = "RUNNING"
+    return view
+
+
+def _app_record(app: Dict[str, Any]) -> Dict[str, Any]:
+    """The app as a job result reports it: in the state the job left it in."""
+    return {key: value for key, value in app.items() if key != "ready_at"}
+
+
+def _app_views(apps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    now = time.time()
+    return [_app_view(app, now) for app in apps]
+
+
+class StubBusyError(Exception):
+    """Injected stand-in for a middleware call rejected while it is overloaded."""
+
+    errno = errno.EBUSY
+
+
+_STUB_FAULTS = {
+    "drop": (ConnectionResetError, "Stub dropped the connection during {}"),
+    "timeout": (TimeoutError, "Stub timed out during {}"),
+    "busy": (StubBusyError, "Stub middleware is busy; {} rejected"),
+}
+# App states that settle on their own once TRUENAS_STUB_APP_LATENCY has passed.
+_STUB_TRANSITIONAL_STATES = ("DEPLOYING", "UPDATING")
+# Seconds between two looks at the store while events are subscribed.
+_STUB_EVENT_INTERVAL = 0.05
+
+# Injected failures already raised in this process, per fault spec.
+_injected: Dict[str, int] = {}
+
+
+def _inject_faults(method: str) -> None:
+    """Apply ``TRUENAS_STUB_LATENCY`` and ``TRUENAS_STUB_FAILURES`` to one call.
+
+    ``TRUENAS_STUB_FAILURES`` is a comma-separated list of
+    ``pattern=count[:kind]`` entries: the first ``count`` calls in this process
+    whose method matches ``pattern`` fail with ``kind`` (``drop``, ``timeout``
+    or ``busy``; default ``drop``). ``connect`` matches opening a client.
+    """
+    latency = os.environ.get("TRUENAS_STUB_LATENCY")
+    if latency:
+        time.sleep(float(latency))
+    for spec in os.environ.get("TRUENAS_STUB_FAILURES", "").split(","):
+        pattern, _, rest = spec.strip().partition("=")
+        if not pattern or not fnmatch.fnmatchcase(method, pattern):
+            continue
+        count, _, kind = rest.partition(":")
+        if _injected.get(spec, 0) < int(count or 0):
+            _injected[spec] = _injected.get(spec, 0) + 1
+            error, message = _STUB_FAULTS[kind or "drop"]
+            raise error(message.format(method))
+
+
+class StubApiClient:
+    """File-backed stub used for ansible-test integration runs."""
+
+    def __init__(self, node: Optional[str] = None):
+        _inject_faults("connect")
+        workspace = os.environ.get("TRUENAS_STUB_WORKSPACE")
+        if node:
+            # Remote connections get one workspace per node so fleets can be emulated.
+            workspace = os.path.join(workspace or "/tmp/truenas_stub_nodes", "nodes", node)
+        if workspace:
+            self._store = stub_state.open_store(workspace)
+        else:
+            state_path = os.environ.get("TRUENAS_STUB_STATE", "/tmp/truenas_stub_state.json")
+            self._store = stub_state.open_store(os.path.dirname(state_path), path=state_path)
+        # The broker shares one backend between handler threads.
+        self._lock = threading.RLock()
+        app_root = Path(
+            os.environ.get("TRUENAS_APP_CONFIG_ROOT", "/mnt/.ix-apps/app_configs")
+        )
+        if node:
+            app_root = app_root / "nodes" / node
+        app_root.mkdir(parents=True, exist_ok=True)
+        self._app_root = app_root
+        self._subscriptions: Dict[str, Any] = {}
+        self._subscription_count = 0
+        self._watcher: Optional[threading.Thread] = None
+
+    def close(self):
+        with self._lock:
+            self._subscriptions.clear()
+        if self._watcher is not None:
+            self._watcher.join()
+        self._store.close()
+
+    def subscribe(self, name: str, callback, payload: Any = None, sync: bool = False) -> str:
+        """Deliver ``app.query`` change events like ``truenas_api_client.Client.subscribe``.
+
+        A watcher thread compares the app views every few milliseconds and
+        calls ``callback(event_type, collection=..., id=..., fields=...)`` for
+        every app that was added, changed (including simulated state
+        transitions) or removed. Disable ``core.subscribe`` through
+        ``TRUENAS_STUB_DISABLED_METHODS`` to emulate a backend without events.
+        """
+        if "core.subscribe" in os.environ.get("TRUENAS_STUB_DISABLED_METHODS", "").split(","):
+            raise NotImplementedError("Stub event subscriptions are disabled")
+        if name != "app.query":
+            raise ValueError("Unsupported stub event: {}".format(name))
+        with self._lock:
+            self._subscription_count += 1
+            ident = "stub-{}".format(self._subscription_count)
+            self._subscriptions[ident] = callback
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(
+                    target=self._watch_apps, args=(self._current_apps(),), daemon=True
+                )
+                self._watcher.start()
+        return ident
+
+    def unsubscribe(self, ident: str) -> None:
+        with self._lock:
+            self._subscriptions.pop(ident, None)
+
+    def _current_apps(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {app["name"]: app for app in _app_views(self._store.load()["apps"])}
+
+    def _watch_apps(self, previous: Dict[str, Dict[str, Any]]) -> None:
+        while True:
+            time.sleep(_STUB_EVENT_INTERVAL)
+            with self._lock:
+                callbacks = list(self._subscriptions.values())
+            if not callbacks:
+                return
+            current = self._current_apps()
+            events = []
+            for name in list(previous) + [name for name in current if name not in previous]:
+                if name not in current:
+                    events.append(("REMOVED", name))
+                elif name not in previous:
+                    events.append(("ADDED", name))
+                elif previous[name] != current[name]:
+                    events.append(("CHANGED", name))
+            previous = current
+            for event_type, name in events:
+                message = {"collection": "app.query", "id": name}
+                if name in current:
+                    message["fields"] = copy.deepcopy(current[name])
+                for callback in callbacks:
+                    callback(event_type, **message)
+
+    def call(self, method: str, *args: Any, **kwargs: Any):
+        _inject_faults(method)
+        if method not in self._get_methods(method.rsplit(".", 1)[0]):
+            raise ValueError("Unsupported stub call: {}".format(method))
+        if method == "core.get_methods":
+            return self._get_methods(args[0] if args else None)
+        if method in _STUB_AUTH_METHODS:
+            return True
+        if method in _STUB_JOB_METHODS:
+            return self._run_job(method, args, wait=bool(kwargs.get("job")))
+        with self._lock:
+            if method == "core.get_jobs":
+                result = _filter_records(self._job_views(self._store.load()), *args)
+            elif method in _STUB_QUERY_METHODS:
+                result = self._dispatch(self._store.load(), method, args)
+            else:
+                with self._store.transaction() as state:
+                    result = self._dispatch(state, method, args)
+            # The store keeps its state in memory between calls; hand out copies
+            # the way the middleware hands out freshly decoded documents.
+            return copy.deepcopy(result)
+
+    def _dispatch(self, state: Dict[str, Any], method: str, args: Sequence[Any]):
+        if method == "app.query":
+            return _filter_records(_app_views(state["apps"]), *args)
+        if method == "app.create":
+            payload = args[0]
+            return self._create_app(state, payload)
+        if method == "app.update":
+            name = args[0]
+            payload = args[1]
+            return self._update_app(state, name, payload)
+        if method == "app.delete":
+            name = args[0]
+            return self._delete_app(state, name)
+        if method == "app.stop":
+            name = args[0]
+            return self._set_state(state, name, "STOPPED")
+        if method in ("app.start", "app.redeploy"):
+            name = args[0]
+            return self._set_state(state, name, "DEPLOYING")
+        if method == "cronjob.query":
+            return _filter_records(state["cronjobs"], *args)
+        if method == "cronjob.create":
+            payload = args[0]
+            return self._create_cronjob(state, payload)
+        if method == "cronjob.update":
+            job_id = args[0]
+            payload = args[1]
+            return self._update_cronjob(state, job_id, payload)
+        if method == "cronjob.delete":
+            job_id = args[0]
+            return self._delete_cronjob(state, job_id)
+        raise ValueError("Unsupported stub call: {}".format(method))
+
+    def _get_methods(self, service: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        # TRUENAS_STUB_DISABLED_METHODS emulates older middleware releases.
+        disabled = os.environ.get("TRUENAS_STUB_DISABLED_METHODS", "").split(",")
+        return {
+            method: {}
+            for method in _STUB_METHODS
+            if method not in disabled and (not service or method.startswith(service + "."))
+        }
+
+    def _run_job(self, method: str, args: Sequence[Any], wait: bool):
+        """Apply a job method and record it; ``TRUENAS_STUB_JOB_LATENCY`` delays completion.
+
+        Like the middleware, ``job=True`` blocks until the job finishes and
+        returns its result, otherwise the job id is returned immediately and
+        ``core.get_jobs`` reports it as running until the latency elapses.
+        """
+        latency = float(os.environ.get("TRUENAS_STUB_JOB_LATENCY") or 0)
+        with self._lock, self._store.transaction() as state:
+            job_id = state["next_job_id"]
+            state["next_job_id"] = job_id + 1
+            started = time.time()
+            job = {
+                "id": job_id,
+                "method": method,
+                "arguments": list(args),
+                "time_started": started,
+                "time_finished": started + latency,
+                "result": None,
+                "error": None,
+            }
+            try:
+                job["result"] = self._dispatch(state, method, args)
+            except ValueError as exc:
+                job["error"] = str(exc)
+            state["jobs"] = (state["jobs"] + [job])[-_STUB_JOB_HISTORY:]
+        job = copy.deepcopy(job)
+
+        if not wait:
+            return job_id
+        if latency:
+            time.sleep(latency)
+        if job["error"]:
+            raise ValueError(job["error"])
+        return job["result"]
+
+    def _job_views(self, state: Dict[str, Any]) -> List[Dict[str, Any]]:
+        now = time.time()
+        views = []
+        for job in state["jobs"]:
+            view = {"id": job["id"], "method": job["method"], "arguments": job["arguments"]}
+            duration = job["time_finished"] - job["time_started"]
+            if now < job["time_finished"]:
+                percent = int(100 * (now - job["time_started"]) / duration)
+                view.update(
+                    state="RUNNING",
+                    progress={"percent": percent, "description": "Running"},
+                    result=None,
+                    error=None,
+                )
+            else:
+                view.update(
+                    state="FAILED" if job["error"] else "SUCCESS",
+                    progress={"percent": 100, "description": "Completed"},
+                    result=job["result"],
+                    error=job["error"],
+                )
+            views.append(view)
+        return views
+
+    def _create_app(self, state: Dict[str, Any], payload: Dict[str, Any]):
+        apps = state["apps"]
+        name = payload["app_name"]
+        if any(app["name"] == name for app in apps):
+            raise ValueError("Application '{}' already exists".format(name))
+        version = payload.get("version") or "1"
+        compose_config = payload.get("custom_compose_config", {})
+        app = {
+            "name": name,
+            "custom_app": payload.get("custom_app", True),
+            "version": version,
+            "state": "DEPLOYING",
+            "ready_at": _ready_at(),
+        }
+        apps.append(app)
+        self._write_user_config(name, version, compose_config)
+        return _app_record(app)
+
+    def _update_app(self, state: Dict[str, Any], name: str, payload: Dict[str, Any]):
+        compose_config = payload.get("custom_compose_config", {})
+        apps = state["apps"]
+        for app in apps:
+            if app["name"] == name:
+                version = app.get("version") or "1"
+                app["state"] = "UPDATING"
+                app["ready_at"] = _ready_at()
+                self._write_user_config(name, version, compose_config)
+                return _app_record(app)
+        raise ValueError("Application '{}' not found".format(name))
+
+    def _delete_app(self, state: Dict[str, Any], name: str):
+        apps = state["apps"]
+        remaining = [app for app in apps if app["name"] != name]
+        state["apps"] = remaining
+        return {"name": name, "state": "DELETING"}
+
+    def _set_state(self, state: Dict[str, Any], name: str, value: str):
+        for app in state["apps"]:
+            if app["name"] == name:
+                app["state"] = value
+                app["ready_at"] = _ready_at()
+                return _app_record(app)
+        raise ValueError("Application '{}' not found".format(name))
+
+    def _write_user_config(self, name: str, version: str, compose: Dict[str, Any]):
+        if not yamlutils.HAS_YAML:
+            raise ModuleNotFoundError("PyYAML is required to serialize compose manifests.")
+        target = self._app_root / name / "versions" / str(version) / "user_config.yaml"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Publish atomically so concurrent readers never parse a partial file.
+        tmp_target = target.with_name(".{}.{}.tmp".format(target.name, os.getpid()))
+        with tmp_target.open("w", encoding="utf-8") as handle:
+            yamlutils.safe_dump(compose or {}, handle)
+        os.replace(str(tmp_target), str(target))
+
+    def _create_cronjob(self, state: Dict[str, Any], payload: Dict[str, Any]):
+        cronjobs = state["cronjobs"]
+        description = payload["description"]
+        if any(job["description"] == description for job in cronjobs):
+            raise ValueError("Cron job '{}' already exists".format(description))
+        job_id = state.get("next_cronjob_id", 1)
+        state["next_cronjob_id"] = job_id + 1
+        job = {
+            "id": job_id,
+            "description": description,
+            "command": payload.get("command"),
+            "user": payload.get("user", "root"),
+            "enabled": payload.get("enabled", True),
+            "schedule": payload.get("schedule") or {},
+        }
+        cronjobs.append(job)
+        return dict(job)
+
+    def _update_cronjob(
+        self, state: Dict[str, Any], job_id: int, payload: Dict[str, Any]
+    ):
+        cronjobs = state["cronjobs"]
+        for job in cronjobs:
+            if job["id"] == job_id:
+                job.update(
+                    {
+                        "description": payload.get("description", job["description"]),
+                        "command": payload.get("command", job["command"]),
+                        "user": payload.get("user", job["user"]),
+                        "enabled": payload.get("enabled", job["enabled"]),
+                        "schedule": payload.get("schedule", job["schedule"]),
+                    }
+                )
+                return dict(job)
+        raise ValueError("Cron job '{}' not found".format(job_id))
+
+    def _delete_cronjob(self, state: Dict[str, Any], job_id: int):
+        cronjobs = state["cronjobs"]
+        existing = [job for job in cronjobs if job["id"] != job_id]
+        if len(existing) == len(cronjobs):
+            raise ValueError("Cron job '{}' not found".format(job_id))
+        state["cronjobs"] = existing
+        return {"id": job_id}
@@ -0,0 +1,204 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Persistence for the file-backed stub backend.
+
+Several module runs (``-f 20``, pytest-xdist) share one stub workspace, so
+every mutation runs under an exclusive lock and is published atomically.
+Each store keeps the last state it loaded in memory and only re-reads it
+when another process has written since.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+STORE_BACKENDS = ("json", "sqlite")
+
+# Record collections and the field that identifies a record in each.
+_COLLECTIONS = {"apps": "name", "cronjobs": "id", "jobs": "id"}
+_COUNTERS = ("next_cronjob_id", "next_job_id")
+
+
+def _with_defaults(state: Dict[str, Any]) -> Dict[str, Any]:
+    for collection in _COLLECTIONS:
+        state.setdefault(collection, [])
+    for counter in _COUNTERS:
+        state.setdefault(counter, 1)
+    return state
+
+
+class JsonStateStore:
+    """Whole-document store compatible with the historical ``state.json``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._state: Optional[Dict[str, Any]] = None
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # Every write replaces the file, so the inode changes along with the mtime.
+        return (info.st_ino, info.st_size, info.st_mtime_ns)
+
+    def load(self) -> Dict[str, Any]:
+        """Return the current state; callers must not mutate it."""
+        stamp = self._current_stamp()
+        if stamp is None:
+            self._stamp, self._state = None, _with_defaults({})
+        elif stamp != self._stamp or self._state is None:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                self._state = _with_defaults(json.load(handle))
+            self._stamp = stamp
+        return self._state
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Yield the state for mutation and publish it when the block succeeds."""
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self.load()
+            try:
+                yield state
+                self._write(state)
+            except BaseException:
+                # The cached copy may be half-mutated; reload it next time.
+                self._stamp = self._state = None
+                raise
+
+    def _write(self, state: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".state-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(state, handle, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._stamp = self._current_stamp()
+
+    def close(self) -> None:
+        return None
+
+
+class SqliteStateStore:
+    """Row-per-record store for scale tests with thousands of apps and cron jobs.
+
+    Commits only touch the records that changed, and the in-memory copy is
+    revalidated with ``PRAGMA data_version`` instead of being re-read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                collection TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                UNIQUE (collection, key)
+            );
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """
+        )
+        self._version: Optional[int] = None
+        self._state: Optional[Dict[str, Any]] = None
+        # Serialised form of every loaded record, used to find changed rows.
+        self._rows: Dict[Tuple[str, str], str] = {}
+
+    def _data_version(self) -> int:
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self) -> Dict[str, Any]:
+        """Return the current state; callers must not mutate it."""
+        version = self._data_version()
+        if self._state is not None and version == self._version:
+            return self._state
+        state: Dict[str, Any] = {collection: [] for collection in _COLLECTIONS}
+        rows = {}
+        for collection, key, data in self._connection.execute(
+            "SELECT collection, key, data FROM records ORDER BY rowid"
+        ):
+            state[collection].append(json.loads(data))
+            rows[(collection, key)] = data
+        for name, value in self._connection.execute("SELECT name, value FROM counters"):
+            state[name] = value
+        self._state, self._rows, self._version = _with_defaults(state), rows, version
+        return self._state
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[Dict[str, Any]]:
+        """Yield the state for mutation and commit the changed rows when the block succeeds."""
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            state = self.load()
+            yield state
+            self._commit_changes(state)
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            self._state = None
+            raise
+        # Our own commits do not bump data_version on this connection.
+        self._version = self._data_version()
+
+    def _commit_changes(self, state: Dict[str, Any]) -> None:
+        rows = {}
+        for collection, key_field in _COLLECTIONS.items():
+            for record in state[collection]:
+                rows[(collection, str(record[key_field]))] = json.dumps(
+                    record, separators=(",", ":"), sort_keys=True
+                )
+        execute = self._connection.execute
+        for (collection, key) in self._rows.keys() - rows.keys():
+            execute("DELETE FROM records WHERE collection = ? AND key = ?", (collection, key))
+        for (collection, key), data in rows.items():
+            previous = self._rows.get((collection, key))
+            if previous is None:
+                execute(
+                    "INSERT INTO records (collection, key, data) VALUES (?, ?, ?)",
+                    (collection, key, data),
+                )
+            elif previous != data:
+                execute(
+                    "UPDATE records SET data = ? WHERE collection = ? AND key = ?",
+                    (data, collection, key),
+                )
+        for name in _COUNTERS:
+            execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, state[name])
+            )
+        self._rows = rows
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def open_store(directory: str, backend: Optional[str] = None, path: Optional[str] = None):
+    """Open the stub state store selected by ``TRUENAS_STUB_STORE`` (``json`` or ``sqlite``).
+
+    ``path`` names a JSON state file; the sqlite store keeps its database
+    next to it with a ``.sqlite`` suffix instead of reading the JSON file.
+    """
+    backend = (backend or os.environ.get("TRUENAS_STUB_STORE") or "json").lower()
+    if backend not in STORE_BACKENDS:
+        raise ValueError("Unsupported stub store: {}".format(backend))
+    if path is None:
+        path = os.path.join(directory, "state.{}".format(backend))
+    elif backend == "sqlite":
+        path = "{}.sqlite".format(os.path.splitext(path)[0])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if backend == "sqlite":
+        return SqliteStateStore(path)
+    return JsonStateStore(path)
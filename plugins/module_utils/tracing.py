@@ -0,0 +1,142 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Opt-in timing of middleware calls and local work.
+
+Set ``TRUENAS_CLIENT_TRACE`` to a true value and modules add a ``_timings``
+summary to their result. ``TRUENAS_CLIENT_TRACE_FILE`` additionally appends
+every event to a JSON-lines file, which is handy across a whole play.
+"""
+
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class Tracer:
+    """Accumulates per-method call statistics and named local phases."""
+
+    def __init__(self, enabled: bool = False, trace_file: Optional[str] = None):
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self._started = time.perf_counter()
+        self._methods: Dict[str, Dict[str, Any]] = {}
+        self._phases: Dict[str, Dict[str, Any]] = {}
+        self._job_wait = 0.0
+
+    def record_call(self, method: str, seconds: float, size: Optional[int], job: bool) -> None:
+        stats = self._methods.setdefault(method, {"count": 0, "seconds": 0.0, "bytes": 0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["bytes"] += size or 0
+        if job:
+            self._job_wait += seconds
+        self._emit({"method": method, "seconds": seconds, "bytes": size, "job": job})
+
+    def record_phase(self, name: str, seconds: float) -> None:
+        stats = self._phases.setdefault(name, {"count": 0, "seconds": 0.0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        if name == "job_wait":
+            self._job_wait += seconds
+        self._emit({"phase": name, "seconds": seconds})
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as ``name``; a no-op when tracing is off."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, Any]:
+        methods = self._methods.values()
+        return {
+            "wall": time.perf_counter() - self._started,
+            "calls": sum(stats["count"] for stats in methods),
+            "call_seconds": sum(stats["seconds"] for stats in methods),
+            "bytes": sum(stats["bytes"] for stats in methods),
+            "job_wait": self._job_wait,
+            "methods": self._methods,
+            "phases": self._phases,
+        }
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if not self.trace_file:
+            return
+        event = dict(event, ts=time.time(), pid=os.getpid())
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(event) + "\n")
+        except OSError:
+            # Tracing must never fail a task.
+            pass
+
+
+class TracingBackend:
+    """Backend proxy that reports every ``call`` to a :class:`Tracer`."""
+
+    def __init__(self, backend, tracer: Tracer):
+        self._backend = backend
+        self._tracer = tracer
+
+    def call(self, method: str, *args: Any, **kwargs: Any):
+        started = time.perf_counter()
+        size = None
+        try:
+            result = self._backend.call(method, *args, **kwargs)
+            size = len(json.dumps(result, default=str))
+            return result
+        finally:
+            self._tracer.record_call(
+                method, time.perf_counter() - started, size, bool(kwargs.get("job"))
+            )
+
+    def subscribe(self, name: str, callback):
+        return self._backend.subscribe(name, callback)
+
+    def unsubscribe(self, ident) -> None:
+        self._backend.unsubscribe(ident)
+
+    def close(self):
+        self._backend.close()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer configured from the environment."""
+    global _tracer
+    enabled = os.environ.get("TRUENAS_CLIENT_TRACE", "").strip().lower() in _TRUE_VALUES
+    trace_file = os.environ.get("TRUENAS_CLIENT_TRACE_FILE") or None
+    if _tracer is None or (_tracer.enabled, _tracer.trace_file) != (enabled, trace_file):
+        _tracer = Tracer(enabled, trace_file)
+    return _tracer
+
+
+def wrap_backend(backend):
+    tracer = get_tracer()
+    return TracingBackend(backend, tracer) if tracer.enabled else backend
+
+
+def attach(module) -> None:
+    """Add the ``_timings`` summary to whatever result ``module`` exits with."""
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return
+    for name in ("exit_json", "fail_json"):
+        original = getattr(module, name)
+
+        def report(*args, _original=original, **kwargs):
+            kwargs["_timings"] = tracer.summary()
+            return _original(*args, **kwargs)
+
+        setattr(module, name, report)
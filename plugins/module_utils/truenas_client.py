@@ -1,38 +1,195 @@
-import json
+import copy
+import fnmatch
 import os
-from pathlib import Path
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
 
 # Copyright: (c) 2024, Marek Marecki (@mareckii)
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
-try:
-    import yaml
-except ImportError:  # pragma: no cover
-    yaml = None
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cache, retry, tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.jobs import (
+    JOB_FIELDS,
+    JobOutcome,
+    JobRequest,
+    poll_jobs,
+    run_jobs,
+)
+
+
+# Fields the modules actually consume from ``app.query`` / ``cronjob.query``.
+# Lookups request only these so the middleware does not serialise the full
+# app metadata (workloads, portals, notes, ...) for every call.
+APP_QUERY_FIELDS = ["id", "name", "state", "version", "custom_app"]
+CRONJOB_QUERY_FIELDS = ["id", "description", "command", "user", "enabled", "schedule"]
+
+# Host-local snapshots: collection -> (query method, index key, selected fields).
+SNAPSHOT_SOURCES = {
+    "apps": ("app.query", "name", APP_QUERY_FIELDS),
+    "cronjobs": ("cronjob.query", "description", CRONJOB_QUERY_FIELDS),
+}
+
+APP_JOB_ACTIONS = ("create", "update", "delete", "stop", "start", "redeploy")
+APP_READY_STATE = "RUNNING"
+# App states that will not turn into the awaited state on their own.
+APP_FAILED_STATES = ("CRASHED", "STOPPED")
+# Longest pause between two looks at awaited apps.
+APP_WAIT_MAX_INTERVAL = 10.0
+# Single-job restart; older middleware releases only offer stop + start.
+APP_RESTART_METHOD = "app.redeploy"
+
+
+def _app_job(action: str, name: str, compose_config: Optional[dict] = None):
+    """Return the middleware method and arguments for an app lifecycle job."""
+    if action == "create":
+        return "app.create", (
+            {
+                "app_name": name,
+                "custom_app": True,
+                "custom_compose_config": compose_config,
+            },
+        )
+    if action == "update":
+        return "app.update", (name, {"custom_compose_config": compose_config})
+    if action in APP_JOB_ACTIONS:
+        return "app.{}".format(action), (name,)
+    raise ValueError("Unsupported application action: {}".format(action))
+
+
+def _pattern_filters(field_name: str, patterns: Optional[Sequence[str]]) -> List[Any]:
+    """Translate shell-style name patterns into a middleware regex filter."""
+    if not patterns:
+        return []
+    branches = [[field_name, "~", fnmatch.translate(pattern)] for pattern in patterns]
+    if len(branches) == 1:
+        return branches
+    return [["OR", branches]]
 
-try:
-    from truenas_api_client import Client
-except ImportError:  # pragma: no cover
-    Client = None
 
+def _match_patterns(value: Any, patterns: Optional[Sequence[str]]) -> bool:
+    return not patterns or any(fnmatch.fnmatchcase(str(value), pattern) for pattern in patterns)
 
-def _build_backend() -> Client:
-    backend = os.environ.get("TRUENAS_CLIENT_BACKEND", "api").lower()
-    if backend == "stub":
-        return _StubApiClient()
-    if Client is None:
+
+def _snapshot_ttl() -> float:
+    """``TRUENAS_CLIENT_SNAPSHOT_TTL`` in seconds; unset or malformed disables the snapshot."""
+    value = os.environ.get("TRUENAS_CLIENT_SNAPSHOT_TTL", "").strip()
+    try:
+        return float(value) if value else 0
+    except ValueError:
+        # Only an optimisation: never let a typo break every module.
+        return 0
+
+
+def _api_client_class():
+    try:
+        from truenas_api_client import Client
+    except ImportError:
         raise ModuleNotFoundError(
             "The 'truenas_api_client' package is required when TRUENAS_CLIENT_BACKEND=api"
         )
-    return Client()
+    return Client
+
+
+def _stub_backend(node: Optional[str] = None):
+    from ansible_collections.mareckii.truenas_scale.plugins.module_utils.stub import (
+        StubApiClient,
+    )
+
+    return StubApiClient(node=node)
+
+
+def _use_stub() -> bool:
+    return os.environ.get("TRUENAS_CLIENT_BACKEND", "api").lower() == "stub"
+
+
+def _build_direct_backend():
+    # Backends are imported on demand: the stub and the API client (with its
+    # websocket stack) are never both needed, and each costs startup time.
+    if _use_stub():
+        return _stub_backend()
+    return _api_client_class()()
+
+
+def _build_backend():
+    if os.environ.get("TRUENAS_CLIENT_BROKER"):
+        from ansible_collections.mareckii.truenas_scale.plugins.module_utils import broker
+
+        socket_path = broker.broker_socket_path()
+        if socket_path:
+            try:
+                return broker.connect(socket_path, _build_direct_backend)
+            except Exception:
+                # The broker is only an optimisation; never fail a task over it.
+                pass
+    return _build_direct_backend()
+
+
+def _build_remote_backend(
+    uri: str,
+    api_key: Optional[str] = None,
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    verify_ssl: bool = True,
+):
+    """Connect and authenticate to the middleware of another node (``wss://host/api/current``)."""
+    if not api_key and not username:
+        raise ValueError("An API key or a username is required to connect to {}".format(uri))
+    if _use_stub():
+        backend = _stub_backend(node=urlparse(uri).hostname or uri)
+    else:
+        backend = _api_client_class()(uri, verify_ssl=verify_ssl)
+    try:
+        if api_key:
+            logged_in = backend.call("auth.login_with_api_key", api_key)
+        else:
+            logged_in = backend.call("auth.login", username, password)
+        if not logged_in:
+            raise PermissionError("Authentication to {} failed".format(uri))
+    except BaseException:
+        backend.close()
+        raise
+    return backend
 
 
 class TruenasClient:
-    _client: Client = None
-
-    def __init__(self):
-        self._client = _build_backend()
+    """Middleware client; local by default, or remote when ``uri`` is given.
+
+    With a ``snapshot_ttl`` (or ``TRUENAS_CLIENT_SNAPSHOT_TTL``) the name
+    lookups of local clients are answered from a host-local index of the
+    whole collection. The first lookup fetches it with one query, later
+    lookups in this and the following module runs read it, and every
+    mutation made through this collection invalidates it.
+    """
+
+    _client = None
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        api_key: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        verify_ssl: bool = True,
+        snapshot_ttl: Optional[float] = None,
+    ):
+        if uri:
+            backend = retry.wrap(
+                lambda: _build_remote_backend(uri, api_key, username, password, verify_ssl), uri
+            )
+        else:
+            backend = retry.wrap(_build_backend)
+        self._client = tracing.wrap_backend(backend)
+        self._methods: Dict[str, set] = {}
+        # Snapshots live in the cache of the host the client runs on, so they
+        # only describe the local middleware.
+        if uri:
+            snapshot_ttl = 0
+        elif snapshot_ttl is None:
+            snapshot_ttl = _snapshot_ttl()
+        self._snapshot_ttl = snapshot_ttl
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
 
     def __enter__(self):
         return self
@@ -43,235 +200,336 @@ class TruenasClient:
     def close(self):
         self._client.close()
 
+    def _snapshot(self, collection: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"records": [...], "index": {key: position}}``, or ``None`` without snapshots."""
+        if self._snapshot_ttl <= 0:
+            return None
+        if collection not in self._snapshots:
+            method, key, fields = SNAPSHOT_SOURCES[collection]
+            snapshot = cache.TTLCache(
+                "{}.index".format(collection), self._snapshot_ttl, invalidated_by=collection
+            )
+            data = snapshot.get()
+            if data is None:
+                fetched_at = time.time()
+                records = self._client.call(method, [], {"select": fields})
+                index: Dict[str, int] = {}
+                for position, record in enumerate(records):
+                    if isinstance(record.get(key), str):
+                        index.setdefault(record[key], position)
+                data = {"records": records, "index": index}
+                snapshot.set(data, fetched_at)
+            self._snapshots[collection] = data
+        return self._snapshots[collection]
+
+    def _snapshot_lookup(self, collection: str, name: str):
+        snapshot = self._snapshot(collection)
+        position = snapshot["index"].get(name)
+        return None if position is None else copy.deepcopy(snapshot["records"][position])
+
+    def _invalidate(self, collection: str) -> None:
+        self._snapshots.pop(collection, None)
+        cache.invalidate(collection)
+
     def find_application(self, name: str):
-        apps = self._client.call("app.query")
-        filtered = list(filter(lambda app: app.get("name") == name, apps))
-        if len(filtered) == 1:
-            return filtered[0]
+        if self._snapshot_ttl > 0:
+            return self._snapshot_lookup("apps", name)
+        apps = self._client.call(
+            "app.query",
+            [["name", "=", name]],
+            {"select": APP_QUERY_FIELDS},
+        )
+        if len(apps) == 1:
+            return apps[0]
         else:
             return None
 
+    def list_applications(self, names: Optional[Sequence[str]] = None):
+        snapshot = self._snapshot("apps")
+        if snapshot is not None:
+            wanted = None if names is None else set(names)
+            return [
+                dict(record)
+                for record in snapshot["records"]
+                if wanted is None or record.get("name") in wanted
+            ]
+        filters = [["name", "in", list(names)]] if names is not None else []
+        return self._client.call("app.query", filters, {"select": APP_QUERY_FIELDS})
+
+    def _query_inventory(
+        self,
+        collection: str,
+        method: str,
+        key: str,
+        patterns: Optional[Sequence[str]] = None,
+        cache_ttl: float = 0,
+    ):
+        """Return ``(records, cached)`` for a whole collection, optionally cached on the host.
+
+        Without a cache the name patterns are sent to the middleware as a
+        regex filter. With a cache the full collection is stored and the
+        patterns are applied locally so every filter shares one entry.
+        """
+        inventory_cache = cache.TTLCache(collection, cache_ttl)
+        records = inventory_cache.get()
+        if records is not None:
+            return [record for record in records if _match_patterns(record.get(key), patterns)], True
+
+        if cache_ttl <= 0:
+            return self._client.call(method, _pattern_filters(key, patterns)), False
+
+        fetched_at = time.time()
+        records = self._client.call(method)
+        inventory_cache.set(records, fetched_at)
+        return [record for record in records if _match_patterns(record.get(key), patterns)], False
+
+    def query_apps(self, patterns: Optional[Sequence[str]] = None, cache_ttl: float = 0):
+        return self._query_inventory("apps", "app.query", "name", patterns, cache_ttl)
+
+    def query_cronjobs(self, patterns: Optional[Sequence[str]] = None, cache_ttl: float = 0):
+        return self._query_inventory("cronjobs", "cronjob.query", "description", patterns, cache_ttl)
+
+    def _call_app_job(self, action: str, name: str, compose_config: Optional[dict] = None):
+        method, args = _app_job(action, name, compose_config)
+        try:
+            return self._client.call(method, *args, job=True)
+        finally:
+            self._invalidate("apps")
+
     def create_app(self, name: str, compose_config: dict):
-        app = self._client.call(
-            "app.create",
-            {
-                "app_name": name,
-                "custom_app": True,
-                "custom_compose_config": compose_config,
-            },
-            job=True,
-        )
-        return app
+        return self._call_app_job("create", name, compose_config)
 
     def update_app(self, name: str, compose_config: dict):
-        app = self._client.call(
-            "app.update",
-            name,
-            {
-                "custom_compose_config": compose_config,
-            },
-            job=True,
-        )
-        return app
+        return self._call_app_job("update", name, compose_config)
 
     def delete_app(self, name: str):
-        app = self._client.call("app.delete", name, job=True)
-        return app
+        return self._call_app_job("delete", name)
 
     def stop_app(self, name: str):
-        app = self._client.call("app.stop", name, job=True)
-        return app
+        return self._call_app_job("stop", name)
 
     def start_app(self, name: str):
-        app = self._client.call("app.start", name, job=True)
-        return app
+        return self._call_app_job("start", name)
+
+    def supports_method(self, method: str) -> bool:
+        """Whether the middleware exposes ``method``; looked up once per service."""
+        service = method.rsplit(".", 1)[0]
+        if service not in self._methods:
+            self._methods[service] = set(self._client.call("core.get_methods", service))
+        return method in self._methods[service]
+
+    def restart_app(self, name: str, wait: bool = True, timeout: Optional[float] = None):
+        """Restart an app with one ``app.redeploy`` job, or stop + start on older releases."""
+        return self.run_app_job("restart", name, wait=wait, timeout=timeout)
+
+    def run_app_job(
+        self,
+        action: str,
+        name: str,
+        compose_config: Optional[dict] = None,
+        wait: bool = True,
+        timeout: Optional[float] = None,
+    ) -> JobOutcome:
+        """Run an app lifecycle job (or a restart) and return its :class:`JobOutcome`.
+
+        With ``wait=False`` the final job is left running and its id is
+        returned in a ``RUNNING`` outcome; earlier steps of a stop + start
+        restart are still awaited because start must not overlap stop.
+        """
+        request = self.app_job_request(action, name, compose_config)
+        if wait:
+            return self.run_jobs([request], concurrency=1, timeout=timeout)[0]
+
+        *blocking, last = request.steps
+        job_ids = []
+        if blocking:
+            outcome = self.run_jobs(
+                [JobRequest(key=name, steps=blocking)], concurrency=1, timeout=timeout
+            )[0]
+            if not outcome.ok:
+                return outcome
+            job_ids = outcome.job_ids
+        job_id = last()
+        return JobOutcome(key=name, state="RUNNING", job_id=job_id, job_ids=job_ids + [job_id])
+
+    def submit_app_job(self, action: str, name: str, compose_config: Optional[dict] = None) -> int:
+        """Start an app lifecycle job and return its id without waiting for it."""
+        method, args = _app_job(action, name, compose_config)
+        try:
+            return self._client.call(method, *args)
+        finally:
+            self._invalidate("apps")
+
+    def app_job_request(
+        self, action: str, name: str, compose_config: Optional[dict] = None
+    ) -> JobRequest:
+        """Build a :class:`JobRequest` for ``run_jobs``; ``restart`` may take two jobs."""
+        actions = (action,)
+        if action == "restart":
+            if self.supports_method(APP_RESTART_METHOD):
+                actions = ("redeploy",)
+            else:
+                actions = ("stop", "start")
+        steps = [
+            lambda step=step: self.submit_app_job(step, name, compose_config) for step in actions
+        ]
+        return JobRequest(key=name, steps=steps)
+
+    def get_jobs(self, job_ids: Sequence[int]):
+        return self._client.call(
+            "core.get_jobs", [["id", "in", list(job_ids)]], {"select": JOB_FIELDS}
+        )
 
-    def find_cronjob(self, name: str):
-        jobs = self._client.call("cronjob.query")
-        for job in jobs:
-            if job.get("description") == name:
-                return job
-        return None
+    def run_jobs(
+        self,
+        requests: Sequence[JobRequest],
+        concurrency: int = 4,
+        timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+        on_progress=None,
+    ):
+        """Run several middleware jobs concurrently; see :func:`jobs.run_jobs`."""
+        with tracing.get_tracer().phase("job_wait"):
+            return run_jobs(
+                requests,
+                self.get_jobs,
+                concurrency=concurrency,
+                timeout=timeout,
+                poll_interval=poll_interval,
+                on_progress=on_progress,
+            )
 
-    def create_cronjob(self, payload: Dict[str, Any]):
-        return self._client.call("cronjob.create", payload)
+    def poll_jobs(
+        self,
+        job_ids: Sequence[int],
+        wait: bool = False,
+        timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+    ):
+        """Return ``{job_id: record}`` for already submitted jobs; see :func:`jobs.poll_jobs`."""
+        with tracing.get_tracer().phase("job_wait"):
+            return poll_jobs(
+                job_ids, self.get_jobs, wait=wait, timeout=timeout, poll_interval=poll_interval
+            )
 
-    def update_cronjob(self, job_id: int, payload: Dict[str, Any]):
-        return self._client.call("cronjob.update", job_id, payload)
+    def app_states(self, names: Sequence[str]) -> Dict[str, Any]:
+        """Current ``state`` of the named apps, always straight from the middleware."""
+        apps = self._client.call(
+            "app.query", [["name", "in", list(names)]], {"select": ["name", "state"]}
+        )
+        return {app["name"]: app.get("state") for app in apps}
 
-    def delete_cronjob(self, job_id: int):
-        return self._client.call("cronjob.delete", job_id)
+    def _subscribe(self, event: str, callback) -> Optional[Callable[[], None]]:
+        """Subscribe to a middleware event; return the matching unsubscribe, or ``None``.
 
+        ``None`` means the backend cannot deliver events (the broker, for
+        example) and the caller has to poll.
+        """
+        try:
+            ident = self._client.subscribe(event, callback)
+        except (AttributeError, NotImplementedError):
+            return None
 
-class _StubApiClient:
-    """File-backed stub used for ansible-test integration runs."""
+        def unsubscribe():
+            try:
+                self._client.unsubscribe(ident)
+            except Exception:
+                pass
+
+        return unsubscribe
+
+    def wait_for_apps(
+        self,
+        names: Sequence[str],
+        state: str = APP_READY_STATE,
+        timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+        max_poll_interval: float = APP_WAIT_MAX_INTERVAL,
+    ) -> Dict[str, Any]:
+        """Wait until every app in ``names`` reports ``state``; return ``{name: last state}``.
+
+        Each look is one ``app.query`` filtered to the apps still awaited.
+        When the backend delivers ``app.query`` change events the apps are
+        looked at again only after one of them changed, or every
+        ``max_poll_interval`` seconds in case an event was lost. Otherwise the
+        delay between polls starts at ``poll_interval`` and doubles up to
+        ``max_poll_interval``. Apps that crash, stop or disappear (state
+        ``None``) stop being awaited.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        states: Dict[str, Any] = {}
+        waiting = list(dict.fromkeys(names))
+        changed = threading.Event()
+
+        def on_event(event_type, **message):
+            fields = message.get("fields") or {}
+            if message.get("id") in waiting or fields.get("name") in waiting:
+                changed.set()
+
+        delay = poll_interval
+        with tracing.get_tracer().phase("app_wait"):
+            unsubscribe = self._subscribe("app.query", on_event)
+            try:
+                while waiting:
+                    # Cleared before the query so a change during it is not missed.
+                    changed.clear()
+                    current = self.app_states(waiting)
+                    for name in waiting:
+                        states[name] = current.get(name)
+                    waiting = [
+                        name
+                        for name in waiting
+                        if states[name] is not None
+                        and states[name] != state
+                        and states[name] not in APP_FAILED_STATES
+                    ]
+                    if not waiting:
+                        break
+                    pause = max_poll_interval if unsubscribe else delay
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        pause = min(pause, remaining)
+                    if unsubscribe:
+                        changed.wait(pause)
+                    else:
+                        time.sleep(pause)
+                        delay = min(delay * 2, max_poll_interval)
+            finally:
+                if unsubscribe:
+                    unsubscribe()
+        return states
 
-    def __init__(self):
-        workspace = os.environ.get("TRUENAS_STUB_WORKSPACE")
-        if workspace:
-            workspace_path = Path(workspace)
-            workspace_path.mkdir(parents=True, exist_ok=True)
-            state_path = workspace_path / "state.json"
-        else:
-            state_path = Path(
-                os.environ.get("TRUENAS_STUB_STATE", "/tmp/truenas_stub_state.json")
-            )
-        state_path.parent.mkdir(parents=True, exist_ok=True)
-        self._state_path = state_path
-        app_root = Path(
-            os.environ.get("TRUENAS_APP_CONFIG_ROOT", "/mnt/.ix-apps/app_configs")
+    def find_cronjob(self, name: str):
+        if self._snapshot_ttl > 0:
+            return self._snapshot_lookup("cronjobs", name)
+        jobs = self._client.call(
+            "cronjob.query",
+            [["description", "=", name]],
+            {"select": CRONJOB_QUERY_FIELDS, "limit": 1},
         )
-        app_root.mkdir(parents=True, exist_ok=True)
-        self._app_root = app_root
-
-    def close(self):
+        if jobs:
+            return jobs[0]
         return None
 
-    def call(self, method: str, *args: Any, **kwargs: Any):
-        state = self._load_state()
-        if method == "app.query":
-            return [dict(app) for app in state["apps"]]
-        if method == "app.create":
-            payload = args[0]
-            return self._create_app(state, payload)
-        if method == "app.update":
-            name = args[0]
-            payload = args[1]
-            return self._update_app(state, name, payload)
-        if method == "app.delete":
-            name = args[0]
-            return self._delete_app(state, name)
-        if method == "app.stop":
-            name = args[0]
-            return self._set_state(state, name, "STOPPED")
-        if method == "app.start":
-            name = args[0]
-            return self._set_state(state, name, "DEPLOYING")
-        if method == "cronjob.query":
-            return [dict(job) for job in state["cronjobs"]]
-        if method == "cronjob.create":
-            payload = args[0]
-            return self._create_cronjob(state, payload)
-        if method == "cronjob.update":
-            job_id = args[0]
-            payload = args[1]
-            return self._update_cronjob(state, job_id, payload)
-        if method == "cronjob.delete":
-            job_id = args[0]
-            return self._delete_cronjob(state, job_id)
-        raise ValueError("Unsupported stub call: {}".format(method))
-
-    def _create_app(self, state: Dict[str, Any], payload: Dict[str, Any]):
-        apps = state["apps"]
-        name = payload["app_name"]
-        if any(app["name"] == name for app in apps):
-            raise ValueError("Application '{}' already exists".format(name))
-        version = payload.get("version") or "1"
-        compose_config = payload.get("custom_compose_config", {})
-        app = {
-            "name": name,
-            "custom_app": payload.get("custom_app", True),
-            "version": version,
-            "state": "DEPLOYING",
-        }
-        apps.append(app)
-        self._write_state(state)
-        self._write_user_config(name, version, compose_config)
-        return dict(app)
-
-    def _update_app(self, state: Dict[str, Any], name: str, payload: Dict[str, Any]):
-        compose_config = payload.get("custom_compose_config", {})
-        apps = state["apps"]
-        for app in apps:
-            if app["name"] == name:
-                version = app.get("version") or "1"
-                app["state"] = "UPDATING"
-                self._write_state(state)
-                self._write_user_config(name, version, compose_config)
-                return dict(app)
-        raise ValueError("Application '{}' not found".format(name))
-
-    def _delete_app(self, state: Dict[str, Any], name: str):
-        apps = state["apps"]
-        remaining = [app for app in apps if app["name"] != name]
-        state["apps"] = remaining
-        self._write_state(state)
-        return {"name": name, "state": "DELETING"}
-
-    def _set_state(self, state: Dict[str, Any], name: str, value: str):
-        for app in state["apps"]:
-            if app["name"] == name:
-                app["state"] = value
-                self._write_state(state)
-                return dict(app)
-        raise ValueError("Application '{}' not found".format(name))
-
-    def _write_user_config(self, name: str, version: str, compose: Dict[str, Any]):
-        if yaml is None:
-            raise ModuleNotFoundError("PyYAML is required to serialize compose manifests.")
-        target = self._app_root / name / "versions" / str(version) / "user_config.yaml"
-        target.parent.mkdir(parents=True, exist_ok=True)
-        with target.open("w", encoding="utf-8") as handle:
-            yaml.safe_dump(compose or {}, handle)
-
-    def _load_state(self) -> Dict[str, Any]:
-        if self._state_path.exists():
-            with self._state_path.open("r", encoding="utf-8") as handle:
-                state = json.load(handle)
-        else:
-            state = {}
-        state.setdefault("apps", [])
-        state.setdefault("cronjobs", [])
-        state.setdefault("next_cronjob_id", 1)
-        return state
-
-    def _write_state(self, state: Dict[str, Any]):
-        with self._state_path.open("w", encoding="utf-8") as handle:
-            json.dump(state, handle)
-
-    def _create_cronjob(self, state: Dict[str, Any], payload: Dict[str, Any]):
-        cronjobs = state["cronjobs"]
-        description = payload["description"]
-        if any(job["description"] == description for job in cronjobs):
-            raise ValueError("Cron job '{}' already exists".format(description))
-        job_id = state.get("next_cronjob_id", 1)
-        state["next_cronjob_id"] = job_id + 1
-        job = {
-            "id": job_id,
-            "description": description,
-            "command": payload.get("command"),
-            "user": payload.get("user", "root"),
-            "enabled": payload.get("enabled", True),
-            "schedule": payload.get("schedule") or {},
-        }
-        cronjobs.append(job)
-        self._write_state(state)
-        return dict(job)
-
-    def _update_cronjob(
-        self, state: Dict[str, Any], job_id: int, payload: Dict[str, Any]
-    ):
-        cronjobs = state["cronjobs"]
-        for job in cronjobs:
-            if job["id"] == job_id:
-                job.update(
-                    {
-                        "description": payload.get("description", job["description"]),
-                        "command": payload.get("command", job["command"]),
-                        "user": payload.get("user", job["user"]),
-                        "enabled": payload.get("enabled", job["enabled"]),
-                        "schedule": payload.get("schedule", job["schedule"]),
-                    }
-                )
-                self._write_state(state)
-                return dict(job)
-        raise ValueError("Cron job '{}' not found".format(job_id))
-
-    def _delete_cronjob(self, state: Dict[str, Any], job_id: int):
-        cronjobs = state["cronjobs"]
-        existing = [job for job in cronjobs if job["id"] != job_id]
-        if len(existing) == len(cronjobs):
-            raise ValueError("Cron job '{}' not found".format(job_id))
-        state["cronjobs"] = existing
-        self._write_state(state)
-        return {"id": job_id}
+    def list_cronjobs(self):
+        snapshot = self._snapshot("cronjobs")
+        if snapshot is not None:
+            return copy.deepcopy(snapshot["records"])
+        return self._client.call("cronjob.query", [], {"select": CRONJOB_QUERY_FIELDS})
+
+    def _call_cronjob_mutation(self, method: str, *args: Any):
+        try:
+            return self._client.call(method, *args)
+        finally:
+            self._invalidate("cronjobs")
+
+    def create_cronjob(self, payload: Dict[str, Any]):
+        return self._call_cronjob_mutation("cronjob.create", payload)
+
+    def update_cronjob(self, job_id: int, payload: Dict[str, Any]):
+        return self._call_cronjob_mutation("cronjob.update", job_id, payload)
+
+    def delete_cronjob(self, job_id: int):
+        return self._call_cronjob_mutation("cronjob.delete", job_id)
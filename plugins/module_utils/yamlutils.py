@@ -0,0 +1,59 @@
+from typing import Any, Optional
+
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+# PyYAML is imported on first use: most module runs (absent, restarted,
+# unchanged digests, cron jobs) never touch YAML, and importing it is a
+# noticeable part of module startup on low-power NAS CPUs. The public names
+# below are resolved through the module ``__getattr__``.
+_LAZY_NAMES = ("HAS_YAML", "HAS_LIBYAML", "SafeLoader", "SafeDumper", "YAMLError")
+yaml = None
+
+
+def _import_yaml() -> None:
+    global yaml, HAS_YAML, HAS_LIBYAML, SafeLoader, SafeDumper, YAMLError
+    try:
+        import yaml as _yaml
+    except ImportError:  # pragma: no cover - import guard for sanity tests
+        _yaml = None
+
+    yaml = _yaml
+    HAS_YAML = yaml is not None
+    # libyaml bindings parse and emit the same documents as the pure-Python
+    # safe loader/dumper, several times faster on large compose files.
+    HAS_LIBYAML = HAS_YAML and hasattr(yaml, "CSafeLoader") and hasattr(yaml, "CSafeDumper")
+
+    if HAS_YAML:
+        SafeLoader = yaml.CSafeLoader if HAS_LIBYAML else yaml.SafeLoader
+        SafeDumper = yaml.CSafeDumper if HAS_LIBYAML else yaml.SafeDumper
+        YAMLError = yaml.YAMLError
+    else:  # pragma: no cover
+        SafeLoader = SafeDumper = None
+        YAMLError = Exception
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_NAMES:
+        _import_yaml()
+        return globals()[name]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def _require_yaml() -> None:
+    if yaml is None:
+        _import_yaml()
+    if yaml is None:
+        raise ModuleNotFoundError("The PyYAML python package is required to handle compose files.")
+
+
+def safe_load(stream: Any) -> Any:
+    """Drop-in for ``yaml.safe_load`` that prefers the libyaml loader."""
+    _require_yaml()
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def safe_dump(data: Any, stream: Optional[Any] = None, **kwargs: Any) -> Any:
+    """Drop-in for ``yaml.safe_dump`` that prefers the libyaml dumper."""
+    _require_yaml()
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
@@ -31,6 +31,48 @@ options:
       - absent
       - restarted
     default: present
+  wait:
+    description:
+      - Whether to wait for the create, update, removal or restart job to finish.
+      - When C(false) the module returns as soon as the job is running and reports its id in C(job).
+        Collect it later with M(mareckii.truenas_scale.job_status).
+    type: bool
+    default: true
+  wait_timeout:
+    description:
+      - Maximum number of seconds to wait for the job when C(wait=true).
+      - The module fails if the job has not finished in time; the middleware keeps running the job.
+      - By default the module waits until the job finishes.
+    type: int
+  wait_for_state:
+    description:
+      - After the application was created, updated, restarted or found up to date, wait until it reports
+        this state. This replaces C(until) loops that re-run the module to poll C(app.query).
+      - The module subscribes to C(app.query) change events and only looks at the application again when it
+        changes. When events are not available (for example through the connection broker) it polls, starting
+        every second and backing off to every 10 seconds.
+      - The module fails if the application crashes or stops, or has not reached the state within
+        C(wait_for_state_timeout). Requires C(wait=true); ignored with C(state=absent) and in check mode.
+    type: str
+    choices:
+      - RUNNING
+  wait_for_state_timeout:
+    description:
+      - Maximum number of seconds to wait for C(wait_for_state).
+    type: int
+    default: 300
+  diff_mode:
+    description:
+      - How the compose diff is reported when C(state=present).
+      - C(full) returns the whole current and desired compose configuration as C(before) and C(after).
+      - C(minimal) returns only the changed paths, rendered one per line for C(--diff), and the same
+        changes as C(compose_changes). Lists of services, networks and volumes are matched by C(name),
+        C(source) or C(target) so reordering them is not reported as every item changing.
+    type: str
+    choices:
+      - full
+      - minimal
+    default: full
 author:
   - Marecki (@mareckii)
 extends_documentation_fragment:
@@ -64,6 +106,42 @@ EXAMPLES = r"""
     name: redis
     state: restarted
 
+- name: Deploy and return only once the application is running
+  mareckii.truenas_scale.app:
+    name: redis
+    compose_config:
+      services:
+        redis:
+          image: redis:alpine
+    wait_for_state: RUNNING
+    wait_for_state_timeout: 600
+
+- name: Report only what changed in a large compose file
+  mareckii.truenas_scale.app:
+    name: media
+    compose_config: "{{ lookup('file', 'media-compose.yml') | from_yaml }}"
+    diff_mode: minimal
+
+- name: Kick off a restart without waiting for the app to come back
+  mareckii.truenas_scale.app:
+    name: redis
+    state: restarted
+    wait: false
+
+- name: Start deploying several applications without waiting for the image pulls
+  mareckii.truenas_scale.app:
+    name: "{{ item.name }}"
+    compose_config: "{{ item.compose }}"
+    wait: false
+  loop: "{{ stack }}"
+  register: deploys
+
+- name: Wait for all deployments with one job query per poll
+  mareckii.truenas_scale.job_status:
+    job_ids: "{{ deploys.results | selectattr('job', 'defined') | map(attribute='job.job_id') | list }}"
+    wait: true
+    wait_timeout: 900
+
 # Equivalent ad-hoc invocation
 # ansible -i inventory.local.yml truenas_test \
 #   -m mareckii.truenas_scale.app \
@@ -79,44 +157,161 @@ diff:
   description:
     - Structured diff containing the current on-device compose configuration and the desired configuration.
     - The C(before) value is parsed from C(user_config.yaml); the C(after) value is the provided compose_config.
+    - A digest of the deployed C(user_config.yaml) is cached under C(~/.cache/truenas_scale) (override with
+      C(TRUENAS_SCALE_CACHE_DIR)), keyed by the file's inode, size and mtime. When the file is unchanged and
+      its digest equals the digest of compose_config, the YAML parse is skipped and C(before) equals C(after).
+    - With C(diff_mode=minimal) only C(prepared) is returned, holding one line per changed path.
   returned: when state=present
   type: dict
+changed_services:
+  description:
+    - Compose changes grouped by service, so the services the middleware redeploys are visible.
+    - C(added), C(removed) and C(changed) list service names. C(other) lists changed top-level keys outside
+      C(services), such as C(networks) or C(volumes), which can affect every service.
+    - The middleware only accepts the complete compose configuration, so an update always sends every service.
+  returned: when state=present
+  type: dict
+  sample:
+    added: []
+    removed: []
+    changed:
+      - web
+    other: []
+compose_changes:
+  description:
+    - Path-level changes from the deployed compose configuration to the desired one.
+    - Each entry has C(path), C(op) (C(added), C(removed), C(changed) or C(reordered)) and the C(before)
+      and/or C(after) value.
+    - C(path) elements are mapping keys, list positions, or a one-key mapping from the identity key to
+      the value of a matched list item.
+  returned: when state=present and diff_mode=minimal
+  type: list
+  elements: dict
 state:
   description: Final state that was ensured.
   returned: always
   type: str
+job:
+  description:
+    - Outcome of the middleware job with C(state), C(job_id), C(job_ids), C(progress), C(result) and C(error).
+    - C(state) is C(RUNNING) when C(wait=false).
+    - Restarts use a single C(app.redeploy) job when the middleware offers it, otherwise a stop and a start job.
+  returned: when state=restarted, or when a job ran with wait=false or wait_timeout
+  type: dict
+app_state:
+  description:
+    - State the application reported when the module stopped waiting for C(wait_for_state).
+  returned: when wait_for_state is set and state is not absent
+  type: str
+  sample: RUNNING
 application:
-  description: The metadata returned by the TrueNAS API for the matching application.
+  description:
+    - The metadata returned by the TrueNAS API for the matching application.
+    - Only the fields the module consumes (C(id), C(name), C(state), C(version), C(custom_app)) are requested.
   returned: when the application already exists
   type: dict
 """
 
-import os
-from pathlib import Path
-
-try:
-    import yaml
-except ImportError:  # pragma: no cover - import guard for sanity tests
-    yaml = None
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import (
+    ComposeReadError,
+    compare_compose,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.compose_diff import (
+    DIFF_MODES,
+    affected_services,
+    build_diff,
+    changed_services,
+)
 from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    APP_FAILED_STATES,
     TruenasClient,
 )
 
 
+def _run_job(module, client, action, name, compose_config=None, blocking=None):
+    """Run an app job the way ``wait`` and ``wait_timeout`` ask for.
+
+    Returns ``(result, job)``. A plain blocking wait uses ``blocking`` (a
+    ``job=True`` call) and returns no job; otherwise the job is submitted and
+    polled, or left running, and its outcome is returned as ``job``.
+    """
+    if blocking is not None and module.params['wait'] and module.params['wait_timeout'] is None:
+        return blocking(), None
+    outcome = client.run_app_job(
+        action,
+        name,
+        compose_config,
+        wait=module.params['wait'],
+        timeout=module.params['wait_timeout'],
+    )
+    if outcome.state not in ('SUCCESS', 'RUNNING'):
+        module.fail_json(
+            msg="Failed to {} application '{}': {}".format(action, name, outcome.error),
+            job=outcome.to_dict(),
+        )
+    return outcome.result, outcome.to_dict()
+
+
+def _await_state(module, client, name, result):
+    """Wait for ``wait_for_state`` and record it in ``result``; fail if it is not reached."""
+    target = module.params['wait_for_state']
+    if not target or module.check_mode:
+        return result
+    timeout = module.params['wait_for_state_timeout']
+    app_state = client.wait_for_apps([name], state=target, timeout=timeout).get(name)
+    result['app_state'] = app_state
+    if app_state != target:
+        if app_state is None or app_state in APP_FAILED_STATES:
+            msg = "Application '{}' is {} instead of {}".format(
+                name, app_state or 'missing', target
+            )
+        else:
+            msg = "Application '{}' is still {} after {}s waiting for {}".format(
+                name, app_state, timeout, target
+            )
+        module.fail_json(msg=msg, **result)
+    return result
+
+
+def _running(message, job):
+    """Reword a past-tense message for a job that is still running."""
+    if job and job['state'] == 'RUNNING':
+        return "{} (job {} is running)".format(message, job['job_id'])
+    return message
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
             name=dict(type='str', required=True),
             compose_config=dict(type='dict', required=False),
             state=dict(default='present', choices=['present', 'absent', 'restarted'], type='str'),
+            wait=dict(type='bool', default=True),
+            wait_timeout=dict(type='int'),
+            wait_for_state=dict(type='str', choices=['RUNNING']),
+            wait_for_state_timeout=dict(type='int', default=300),
+            diff_mode=dict(type='str', default='full', choices=list(DIFF_MODES)),
         ),
         required_if=[('state', 'present', ['compose_config'])],
         supports_check_mode=True,
     )
+    tracing.attach(module)
     name = module.params['name']
     compose_config = module.params.get('compose_config')
     state = module.params['state']
+    if module.params['wait_for_state'] and not module.params['wait']:
+        module.fail_json(msg="wait_for_state requires wait=true")
+
+    def compose_result(before, services=None):
+        diff, changes = build_diff(before, compose_config, module.params['diff_mode'])
+        if services is None:
+            services = changed_services(before, compose_config)
+        result = dict(diff=diff, changed_services=services)
+        if changes is not None:
+            result['compose_changes'] = changes
+        return result
 
     with TruenasClient() as client:
         application = client.find_application(name)
@@ -141,13 +336,22 @@ def main():
                     application=application,
                 )
 
-            client.delete_app(application["name"])
-            module.exit_json(
+            _, job = _run_job(
+                module,
+                client,
+                'delete',
+                application["name"],
+                blocking=lambda: client.delete_app(application["name"]),
+            )
+            result = dict(
                 changed=True,
                 state='absent',
-                message="Application '{}' was removed".format(name),
+                message=_running("Application '{}' was removed".format(name), job),
                 application=application,
             )
+            if job:
+                result['job'] = job
+            module.exit_json(**result)
 
         if state == 'restarted':
             if not application:
@@ -163,14 +367,28 @@ def main():
                     application=application,
                 )
 
-            client.stop_app(application["name"])
-            client.start_app(application["name"])
-            module.exit_json(
+            outcome = client.restart_app(
+                application["name"],
+                wait=module.params['wait'],
+                timeout=module.params['wait_timeout'],
+            )
+            if outcome.state not in ('SUCCESS', 'RUNNING'):
+                module.fail_json(
+                    msg="Failed to restart application '{}': {}".format(name, outcome.error),
+                    job=outcome.to_dict(),
+                )
+            if outcome.ok:
+                message = "Application '{}' was restarted".format(name)
+            else:
+                message = "Application '{}' restart job {} is running".format(name, outcome.job_id)
+            result = dict(
                 changed=True,
                 state='restarted',
-                message="Application '{}' was restarted".format(name),
+                message=message,
                 application=application,
+                job=outcome.to_dict(),
             )
+            module.exit_json(**_await_state(module, client, application["name"], result))
 
         if not application:
             if module.check_mode:
@@ -178,69 +396,78 @@ def main():
                     changed=True,
                     state='present',
                     message="Application '{}' would be created".format(name),
-                    diff={'before': None, 'after': compose_config},
+                    **compose_result(None)
                 )
 
-            app = client.create_app(name, compose_config)
+            app, job = _run_job(
+                module,
+                client,
+                'create',
+                name,
+                compose_config,
+                blocking=lambda: client.create_app(name, compose_config),
+            )
             app_name = getattr(app, 'name', None)
             app_state = getattr(app, 'state', None)
-            module.exit_json(
+            if isinstance(app, dict):
+                app_name, app_state = app.get('name'), app.get('state')
+            result = dict(
                 changed=True,
-                message='Application with name {} was created with state: {}'.format(
-                    app_name or name,
-                    app_state or 'unknown',
+                message=_running(
+                    'Application with name {} was created with state: {}'.format(
+                        app_name or name,
+                        app_state or 'unknown',
+                    ),
+                    job,
                 ),
                 state='present',
                 application=app,
-                diff={'before': None, 'after': compose_config},
-            )
-
-        app_config_root = os.environ.get(
-            "TRUENAS_APP_CONFIG_ROOT", "/mnt/.ix-apps/app_configs"
-        )
-        user_config = (
-            Path(app_config_root)
-            / application["name"]
-            / "versions"
-            / application["version"]
-            / "user_config.yaml"
-        )
-        try:
-            user_config_text = user_config.read_text()
-        except OSError as exc:
-            module.fail_json(
-                msg="Unable to read {}: {}".format(user_config, exc)
+                **compose_result(None)
             )
-
-        if yaml is None:
-            module.fail_json(msg="The PyYAML python package is required to parse compose configuration.")
+            if job:
+                result['job'] = job
+            module.exit_json(**_await_state(module, client, app_name or name, result))
 
         try:
-            current_compose = yaml.safe_load(user_config_text) or {}
-        except yaml.YAMLError as exc:
-            module.fail_json(
-                msg="Invalid YAML in {}: {}".format(user_config, exc)
-            )
+            matches, current_compose = compare_compose(application, compose_config)
+        except ComposeReadError as exc:
+            module.fail_json(msg=str(exc))
 
-        changed = current_compose != compose_config
+        services = changed_services(current_compose, compose_config)
+        changed = not matches
+        job = None
         if changed:
+            affected = affected_services(services)
             if module.check_mode:
                 message = "Application {} would be updated".format(name)
             else:
-                client.update_app(application["name"], compose_config)
+                _, job = _run_job(
+                    module,
+                    client,
+                    'update',
+                    application["name"],
+                    compose_config,
+                    blocking=lambda: client.update_app(application["name"], compose_config),
+                )
                 message = "Application '{}' compose config differs from desired state".format(
                     application["name"]
                 )
+            if affected:
+                message += " (services: {})".format(", ".join(affected))
+            message = _running(message, job)
         else:
             message = "Application {} is up to date".format(name)
 
-        module.exit_json(
+        result = dict(
             changed=changed,
             message=message,
-            diff={'before': current_compose, 'after': compose_config},
             application=application,
-            state='present'
+            state='present',
+            **compose_result(current_compose, services)
         )
+        if job:
+            result['job'] = job
+        module.exit_json(**_await_state(module, client, application["name"], result))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,119 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: app_info
+short_description: Gather information about TrueNAS SCALE applications
+description:
+  - Return the applications installed on a TrueNAS SCALE node with a single C(app.query) call.
+  - Results can be cached on the managed host for a number of seconds. The cache is invalidated
+    whenever a module of this collection changes an application on that host.
+options:
+  name:
+    description:
+      - Only return applications whose name matches one of these shell-style patterns, for example C(redis) or C(media-*).
+      - All applications are returned when omitted.
+    type: list
+    elements: str
+    aliases:
+      - names
+  cache_ttl:
+    description:
+      - Number of seconds a host-local copy of the application list may be reused.
+      - The cache is stored under C(~/.cache/truenas_scale) (override with C(TRUENAS_SCALE_CACHE_DIR)).
+      - C(0) always queries the middleware.
+    type: int
+    default: 0
+  compose_digest:
+    description:
+      - Add a C(compose_digest) key to every custom application with the SHA-256 digest of its deployed compose
+        configuration (sorted-key JSON), or C(null) when it cannot be read.
+      - Digests are cached per application and only recomputed when C(user_config.yaml) changes.
+    type: bool
+    default: false
+author:
+  - Marek Marecki (@mareckii)
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: none
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: List every application on the node
+  mareckii.truenas_scale.app_info:
+  register: apps
+
+- name: Pre-flight check that reuses a recent inventory
+  mareckii.truenas_scale.app_info:
+    name:
+      - media-*
+      - redis
+    cache_ttl: 300
+  register: media_apps
+"""
+
+RETURN = r"""
+apps:
+  description:
+    - Application records as returned by C(app.query).
+    - With C(compose_digest=true), custom applications also carry C(compose_digest).
+  returned: always
+  type: list
+  elements: dict
+cached:
+  description: Whether the records were served from the host-local cache.
+  returned: always
+  type: bool
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import (
+    ComposeReadError,
+    deployed_compose_digest,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            name=dict(type="list", elements="str", aliases=["names"]),
+            cache_ttl=dict(type="int", default=0),
+            compose_digest=dict(type="bool", default=False),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+
+    with TruenasClient() as client:
+        apps, cached = client.query_apps(module.params["name"], module.params["cache_ttl"])
+
+    if module.params["compose_digest"]:
+        for app in apps:
+            if not app.get("custom_app"):
+                continue
+            try:
+                app["compose_digest"] = deployed_compose_digest(app)
+            except ComposeReadError:
+                app["compose_digest"] = None
+
+    module.exit_json(changed=False, apps=apps, cached=cached)
+
+
+if __name__ == "__main__":
+    main()
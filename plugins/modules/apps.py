@@ -0,0 +1,435 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: apps
+short_description: Reconcile many TrueNAS SCALE custom applications at once
+description:
+  - Create, update, restart, or remove a list of TrueNAS SCALE custom compose applications in a single task.
+  - All applications are looked up with one C(app.query) call and every diff is computed locally before any
+    change is applied, so large stacks only pay for one module run and one middleware session.
+  - Each entry behaves like the M(mareckii.truenas_scale.app) module with the same C(name), C(compose_config)
+    and C(state) options.
+  - Entries can name the applications they C(depends_on). The list is then rolled out in waves. Every wave holds
+    the applications whose dependencies are all in earlier waves, and its jobs run in parallel. A wave starts
+    only after the previous one succeeded (and, with C(wait_for_running=true), is running). An application
+    whose dependency failed is skipped.
+options:
+  apps:
+    description:
+      - Applications to reconcile.
+      - Application names must be unique within the list.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description:
+          - Name of the TrueNAS application instance to manage.
+        type: str
+        required: true
+      compose_config:
+        description:
+          - Desired docker compose configuration for the custom application.
+          - Required when C(state=present).
+        type: dict
+      state:
+        description:
+          - Whether the custom application should exist.
+        type: str
+        choices:
+          - present
+          - absent
+          - restarted
+        default: present
+      depends_on:
+        description:
+          - Names of applications in this list that must be rolled out before this one.
+          - The order applies whatever the state, so list removals in the order they should happen.
+        type: list
+        elements: str
+        default: []
+  concurrency:
+    description:
+      - Maximum number of application jobs the middleware runs at the same time.
+      - Jobs are submitted without blocking and awaited together; a restart counts as one slot
+        and runs its stop and start jobs in order.
+    type: int
+    default: 4
+  timeout:
+    description:
+      - Overall number of seconds to wait for all application jobs.
+      - Jobs still running when the timeout expires are reported as failed with state C(TIMEOUT);
+        the middleware keeps running them.
+      - With C(wait_for_running=true) the timeout also covers waiting for applications to run.
+      - By default the module waits until every job has finished.
+    type: int
+  wait_for_running:
+    description:
+      - After the jobs of a wave have finished, wait until the applications it created, updated or restarted
+        report C(RUNNING) before the next wave starts. Unchanged and removed applications are not awaited.
+      - Applications that crash or stop, or are not running when C(wait_for_running_timeout) or C(timeout)
+        expires, are reported as failed.
+    type: bool
+    default: false
+  wait_for_running_timeout:
+    description:
+      - Maximum number of seconds each wave waits for its applications to run with C(wait_for_running=true).
+    type: int
+    default: 300
+  diff_mode:
+    description:
+      - How compose diffs are reported, as in M(mareckii.truenas_scale.app).
+      - C(minimal) reports only the changed paths of each application and adds C(compose_changes) to its result.
+    type: str
+    choices:
+      - full
+      - minimal
+    default: full
+author:
+  - Marek Marecki (@mareckii)
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: full
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: Deploy a stack of custom applications
+  mareckii.truenas_scale.apps:
+    apps:
+      - name: redis
+        compose_config:
+          services:
+            redis:
+              image: redis:7
+      - name: nginx
+        compose_config:
+          services:
+            nginx:
+              image: nginx:stable
+      - name: legacy
+        state: absent
+
+- name: Roll out a stack in dependency order, db first and proxy last
+  mareckii.truenas_scale.apps:
+    wait_for_running: true
+    timeout: 900
+    apps:
+      - name: db
+        compose_config: "{{ db_compose }}"
+      - name: cache
+        compose_config: "{{ cache_compose }}"
+      - name: api
+        compose_config: "{{ api_compose }}"
+        depends_on: [db, cache]
+      - name: proxy
+        compose_config: "{{ proxy_compose }}"
+        depends_on: [api]
+"""
+
+RETURN = r"""
+changed:
+  description: Whether any application was created, updated, restarted, or removed.
+  returned: always
+  type: bool
+diff:
+  description:
+    - One entry per application with C(state=present), in the same C(before)/C(after) format as
+      M(mareckii.truenas_scale.app), or only C(prepared) with C(diff_mode=minimal).
+  returned: always
+  type: list
+  elements: dict
+waves:
+  description: Application names grouped into the waves they were (or would be) rolled out in.
+  returned: always
+  type: list
+  elements: list
+  sample:
+    - [db, cache]
+    - [api]
+    - [proxy]
+results:
+  description: Per-application outcome, in the order the applications were given.
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: Application name.
+      type: str
+    state:
+      description: State that was ensured.
+      type: str
+    action:
+      description: Operation that was (or would be) performed, one of C(create), C(update), C(delete), C(restart), or C(none).
+      type: str
+    changed:
+      description: Whether this application was changed.
+      type: bool
+    message:
+      description: Human readable summary of the action taken.
+      type: str
+    diff:
+      description: Compose C(before)/C(after) diff for this application.
+      type: dict
+      returned: when state=present
+    changed_services:
+      description: Compose changes grouped by service, in the format of M(mareckii.truenas_scale.app).
+      type: dict
+      returned: when state=present
+    compose_changes:
+      description: Path-level compose changes, in the format of M(mareckii.truenas_scale.app).
+      type: list
+      elements: dict
+      returned: when state=present and diff_mode=minimal
+    application:
+      description: Application metadata returned by the TrueNAS API.
+      type: dict
+      returned: when the application exists or was created
+    job:
+      description:
+        - Middleware job outcome with C(state), C(job_id), C(job_ids), C(progress), C(result) and C(error).
+      type: dict
+      returned: when a job was submitted
+    app_state:
+      description: State the application reported after its wave, such as C(RUNNING) or C(CRASHED).
+      type: str
+      returned: when wait_for_running=true and the application was created, updated or restarted
+"""
+
+import time
+from collections import Counter
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import (
+    APP_STATES,
+    AppSpec,
+    ComposeReadError,
+    compare_compose,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import rollout, tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.compose_diff import (
+    DIFF_MODES,
+    affected_services,
+    build_diff,
+    changed_services,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    APP_READY_STATE,
+    TruenasClient,
+)
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            apps=dict(
+                type="list",
+                elements="dict",
+                required=True,
+                options=dict(
+                    name=dict(type="str", required=True),
+                    compose_config=dict(type="dict"),
+                    state=dict(type="str", default="present", choices=list(APP_STATES)),
+                    depends_on=dict(type="list", elements="str", default=[]),
+                ),
+                required_if=[("state", "present", ["compose_config"])],
+            ),
+            concurrency=dict(type="int", default=4),
+            timeout=dict(type="int"),
+            diff_mode=dict(type="str", default="full", choices=list(DIFF_MODES)),
+            wait_for_running=dict(type="bool", default=False),
+            wait_for_running_timeout=dict(type="int", default=300),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def _add_diff(result, spec, current_compose, diff_mode):
+    result["diff"], changes = build_diff(current_compose, spec.compose_config, diff_mode)
+    result["changed_services"] = changed_services(current_compose, spec.compose_config)
+    if changes is not None:
+        result["compose_changes"] = changes
+
+
+def _plan(spec, application, check_mode, diff_mode="full"):
+    """Work out what has to happen to one application without touching it."""
+    name = spec.name
+    result = {"name": name, "state": spec.state, "action": "none", "changed": False}
+    if application:
+        result["application"] = application
+
+    if spec.state == "absent":
+        if not application:
+            result["message"] = "Application '{}' is already absent".format(name)
+            return result
+        result.update(action="delete", changed=True)
+        result["message"] = "Application '{}' {} removed".format(
+            name, "would be" if check_mode else "was"
+        )
+        return result
+
+    if spec.state == "restarted":
+        if not application:
+            raise ValueError("Application '{}' is absent; cannot restart".format(name))
+        result.update(action="restart", changed=True)
+        result["message"] = "Application '{}' {} restarted".format(
+            name, "would be" if check_mode else "was"
+        )
+        return result
+
+    if not application:
+        result.update(action="create", changed=True)
+        _add_diff(result, spec, None, diff_mode)
+        result["message"] = "Application '{}' {} created".format(
+            name, "would be" if check_mode else "was"
+        )
+        return result
+
+    matches, current_compose = compare_compose(application, spec.compose_config)
+    _add_diff(result, spec, current_compose, diff_mode)
+    if matches:
+        result["message"] = "Application {} is up to date".format(name)
+        return result
+
+    result.update(action="update", changed=True)
+    result["message"] = "Application '{}' {} updated".format(
+        name, "would be" if check_mode else "was"
+    )
+    affected = affected_services(result["changed_services"])
+    if affected:
+        result["message"] += " (services: {})".format(", ".join(affected))
+    return result
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+    if module.params["concurrency"] < 1:
+        module.fail_json(msg="concurrency must be at least 1")
+    specs = [AppSpec.from_module_params(item) for item in module.params["apps"]]
+
+    names = [spec.name for spec in specs]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        module.fail_json(
+            msg="Application names must be unique: {}".format(", ".join(duplicates))
+        )
+
+    dependencies = {
+        item["name"]: item.get("depends_on") or [] for item in module.params["apps"]
+    }
+    try:
+        waves = rollout.plan_waves(dependencies)
+    except rollout.DependencyError as exc:
+        module.fail_json(msg=str(exc))
+
+    with TruenasClient() as client:
+        existing = {app["name"]: app for app in client.list_applications(names)}
+
+        not_custom = [
+            name for name in names if name in existing and not existing[name].get("custom_app")
+        ]
+        if not_custom:
+            module.fail_json(
+                msg="Applications are not custom applications: {}".format(", ".join(not_custom))
+            )
+
+        results = []
+        for spec in specs:
+            try:
+                results.append(
+                    _plan(
+                        spec, existing.get(spec.name), module.check_mode, module.params["diff_mode"]
+                    )
+                )
+            except (ComposeReadError, ValueError) as exc:
+                module.fail_json(msg=str(exc))
+
+        failed = []
+        if not module.check_mode:
+            by_name = {result["name"]: result for result in results}
+            specs_by_name = {spec.name: spec for spec in specs}
+
+            def run_wave(wave, seconds_left):
+                deadline = None if seconds_left is None else time.monotonic() + seconds_left
+                requests = [
+                    client.app_job_request(
+                        by_name[name]["action"], name, specs_by_name[name].compose_config
+                    )
+                    for name in wave
+                    if by_name[name]["action"] != "none"
+                ]
+                outcomes = client.run_jobs(
+                    requests, concurrency=module.params["concurrency"], timeout=seconds_left
+                )
+                errors = {}
+                for outcome in outcomes:
+                    result = by_name[outcome.key]
+                    result["job"] = outcome.to_dict()
+                    if not outcome.ok:
+                        result.update(changed=False, failed=True, message=outcome.error)
+                        errors[outcome.key] = outcome.error
+                    elif result["action"] == "create" and outcome.result:
+                        result["application"] = outcome.result
+                if not module.params["wait_for_running"]:
+                    return errors
+
+                awaited = [
+                    name
+                    for name in wave
+                    if name not in errors
+                    and by_name[name]["action"] in ("create", "update", "restart")
+                ]
+                if awaited:
+                    remaining = module.params["wait_for_running_timeout"]
+                    if deadline is not None:
+                        remaining = min(remaining, max(0.0, deadline - time.monotonic()))
+                    states = client.wait_for_apps(awaited, timeout=remaining)
+                    for name in awaited:
+                        result = by_name[name]
+                        result["app_state"] = states.get(name)
+                        if states.get(name) != APP_READY_STATE:
+                            error = "Application '{}' is {} instead of {}".format(
+                                name, states.get(name) or "missing", APP_READY_STATE
+                            )
+                            result.update(failed=True, message=error)
+                            errors[name] = error
+                return errors
+
+            errors, skipped = rollout.roll_out(
+                waves, dependencies, run_wave, timeout=module.params["timeout"]
+            )
+            for name, error in skipped.items():
+                by_name[name].update(
+                    action="none", changed=False, failed=True, skipped=True, message=error
+                )
+            failed = [name for name in names if name in errors or name in skipped]
+
+    diff = [
+        dict(result["diff"], before_header=result["name"], after_header=result["name"])
+        for result in results
+        if "diff" in result
+    ]
+    changed = any(result["changed"] for result in results)
+    if failed:
+        module.fail_json(
+            msg="Failed to reconcile applications: {}".format(", ".join(failed)),
+            changed=changed,
+            results=results,
+            diff=diff,
+            waves=waves,
+        )
+    module.exit_json(changed=changed, results=results, diff=diff, waves=waves)
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,27 @@ options:
         description:
           - Day of week component of the cron schedule.
         type: str
+  stagger:
+    description:
+      - Pick the minute and hour of the schedule automatically instead of setting C(schedule.minute) and
+        C(schedule.hour).
+      - The module looks at every enabled cron job on the node and chooses the minute of C(window) in which the
+        fewest of them fire. Each job counts as if it ran daily. Ties are broken by a hash of C(key), so reruns
+        choose the same time and jobs staggered into an idle window spread out.
+      - An existing job that already fires once a day inside C(window) keeps its time.
+      - C(schedule.dom), C(schedule.month) and C(schedule.dow) still apply.
+    type: dict
+    suboptions:
+      window:
+        description:
+          - Time range to choose from, as C(HH:MM-HH:MM) in the node's time zone. Both ends are included and
+            a range ending before it starts wraps past midnight.
+        type: str
+        default: "00:00-23:59"
+      key:
+        description:
+          - Value hashed to break ties between equally loaded minutes. Defaults to C(name).
+        type: str
   state:
     description:
       - Whether the cron job should exist.
@@ -86,6 +107,15 @@ EXAMPLES = r"""
       minute: "0"
       hour: "2"
 
+- name: Run the scrub at the quietest minute between 01:00 and 05:00
+  mareckii.truenas_scale.cronjob:
+    name: weekly scrub
+    command: /usr/local/bin/scrub.sh
+    schedule:
+      dow: sun
+    stagger:
+      window: "01:00-05:00"
+
 - name: Disable a cron job
   mareckii.truenas_scale.cronjob:
     name: nightly backup
@@ -99,7 +129,9 @@ EXAMPLES = r"""
 
 RETURN = r"""
 cronjob:
-  description: The cron job record returned by the TrueNAS API.
+  description:
+    - The cron job record returned by the TrueNAS API.
+    - Lookups only request the fields the module compares (C(id), C(description), C(command), C(user), C(enabled), C(schedule)).
   returned: always
   type: dict
 changed:
@@ -111,6 +143,16 @@ diff:
     - Structured diff showing the before and after state of the cron job metadata.
   returned: when state=present
   type: dict
+stagger:
+  description:
+    - Time picked by C(stagger), the window it was picked from, and how many other enabled cron jobs fire in
+      that minute.
+  returned: when stagger is set and state=present
+  type: dict
+  sample:
+    time: "03:17"
+    window: "01:00-05:00"
+    load: 0
 state:
   description: Final state that was ensured.
   returned: always
@@ -123,8 +165,12 @@ message:
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible_collections.mareckii.truenas_scale.plugins.module_utils.cronjobs import (
+    DEFAULT_STAGGER_WINDOW,
     CronJobSpec,
+    apply_stagger,
+    index_jobs,
 )
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
 from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
     TruenasClient,
 )
@@ -147,6 +193,13 @@ def _build_module():
                     dow=dict(type="str"),
                 ),
             ),
+            stagger=dict(
+                type="dict",
+                options=dict(
+                    window=dict(type="str", default=DEFAULT_STAGGER_WINDOW),
+                    key=dict(type="str", no_log=False),
+                ),
+            ),
             state=dict(type="str", default="present", choices=["present", "absent"]),
         ),
         required_if=[("state", "present", ["command"])],
@@ -156,11 +209,23 @@ def _build_module():
 
 def main():
     module = _build_module()
+    tracing.attach(module)
     name = module.params["name"]
     state = module.params["state"]
 
     with TruenasClient() as client:
-        job = client.find_cronjob(name)
+        if module.params["stagger"] and state == "present":
+            # The load of every other job is needed to place this one.
+            jobs = client.list_cronjobs()
+            job = index_jobs(jobs).get(name)
+            try:
+                params, stagger = apply_stagger(module.params, jobs)
+            except ValueError as exc:
+                module.fail_json(msg=str(exc))
+        else:
+            job = client.find_cronjob(name)
+            params, stagger = module.params, None
+        extra = {} if stagger is None else {"stagger": stagger}
 
         if state == "absent":
             if not job:
@@ -187,7 +252,7 @@ def main():
                 cronjob=job,
             )
 
-        spec = CronJobSpec.from_module_params(module.params)
+        spec = CronJobSpec.from_module_params(params)
         diff = spec.diff(job)
 
         if not job:
@@ -198,6 +263,7 @@ def main():
                     message="Cron job '{}' would be created".format(name),
                     cronjob=None,
                     diff=diff,
+                    **extra,
                 )
             created = client.create_cronjob(spec.to_payload())
             module.exit_json(
@@ -206,6 +272,7 @@ def main():
                 message="Cron job '{}' was created".format(name),
                 cronjob=created,
                 diff=diff,
+                **extra,
             )
 
         if spec.matches(job):
@@ -215,6 +282,7 @@ def main():
                 message="Cron job '{}' is up to date".format(name),
                 cronjob=job,
                 diff=diff,
+                **extra,
             )
 
         if module.check_mode:
@@ -224,6 +292,7 @@ def main():
                 message="Cron job '{}' would be updated".format(name),
                 cronjob=job,
                 diff=diff,
+                **extra,
             )
 
         updated = client.update_cronjob(job["id"], spec.to_payload())
@@ -233,6 +302,7 @@ def main():
             message="Cron job '{}' was updated".format(name),
             cronjob=updated,
             diff=diff,
+            **extra,
         )
 
 
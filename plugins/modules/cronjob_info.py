@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: cronjob_info
+short_description: Gather information about TrueNAS SCALE cron jobs
+description:
+  - Return the cron jobs configured on a TrueNAS SCALE node with a single C(cronjob.query) call.
+  - Results can be cached on the managed host for a number of seconds. The cache is invalidated
+    whenever a module of this collection changes a cron job on that host.
+options:
+  name:
+    description:
+      - Only return cron jobs whose description matches one of these shell-style patterns.
+      - All cron jobs are returned when omitted.
+    type: list
+    elements: str
+    aliases:
+      - names
+  cache_ttl:
+    description:
+      - Number of seconds a host-local copy of the cron job list may be reused.
+      - The cache is stored under C(~/.cache/truenas_scale) (override with C(TRUENAS_SCALE_CACHE_DIR)).
+      - C(0) always queries the middleware.
+    type: int
+    default: 0
+  load_top:
+    description:
+      - Also report this many busiest minutes of the day among the enabled cron jobs, as C(load).
+      - The report always covers every cron job on the node, including those left out by C(name).
+      - Use it to spot jobs that all fire at the same minute. C(0) skips the report.
+    type: int
+    default: 0
+author:
+  - Marek Marecki (@mareckii)
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: none
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: List every cron job on the node
+  mareckii.truenas_scale.cronjob_info:
+  register: cronjobs
+
+- name: Look up backup jobs, reusing a recent inventory
+  mareckii.truenas_scale.cronjob_info:
+    name: "*backup*"
+    cache_ttl: 300
+  register: backup_jobs
+
+- name: Show the five minutes of the day with the most cron jobs firing
+  mareckii.truenas_scale.cronjob_info:
+    load_top: 5
+  register: cron_load
+"""
+
+RETURN = r"""
+cronjobs:
+  description: Cron job records as returned by C(cronjob.query).
+  returned: always
+  type: list
+  elements: dict
+cached:
+  description: Whether the records were served from the host-local cache.
+  returned: always
+  type: bool
+load:
+  description:
+    - Busiest minutes of the day, busiest first, with the number and descriptions of the enabled cron jobs
+      firing in them. Every job on the node counts, whatever C(name) selects, as if it ran daily.
+    - Schedules are compared by the times they fire, so C(*/30) and C(0,30) count as the same minutes.
+  returned: when load_top is greater than 0
+  type: list
+  elements: dict
+  sample:
+    - time: "02:00"
+      jobs: 3
+      names:
+        - nightly backup
+        - scrub
+        - replication
+"""
+
+from fnmatch import fnmatchcase
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cronjobs as cron
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            name=dict(type="list", elements="str", aliases=["names"]),
+            cache_ttl=dict(type="int", default=0),
+            load_top=dict(type="int", default=0),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def _load(jobs, limit):
+    schedules = [
+        (job.get("description"), cron.CronSchedule.from_mapping(job.get("schedule")))
+        for job in jobs
+        if job.get("enabled", True)
+    ]
+    histogram = cron.minute_histogram(schedule for _, schedule in schedules)
+    load = []
+    for slot, count in cron.busiest_minutes(histogram, limit):
+        hour, minute = divmod(slot, 60)
+        load.append(
+            {
+                "time": "{:02d}:{:02d}".format(hour, minute),
+                "jobs": count,
+                "names": [
+                    name
+                    for name, schedule in schedules
+                    if schedule.parsed is not None
+                    and schedule.parsed[0] >> minute & 1
+                    and schedule.parsed[1] >> hour & 1
+                ],
+            }
+        )
+    return load
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+
+    patterns = module.params["name"]
+    load_top = module.params["load_top"]
+
+    with TruenasClient() as client:
+        if load_top > 0:
+            # The load report needs every job, so fetch them all and filter here.
+            all_jobs, cached = client.query_cronjobs(None, module.params["cache_ttl"])
+            cronjobs = [
+                job
+                for job in all_jobs
+                if not patterns
+                or any(fnmatchcase(str(job.get("description")), pattern) for pattern in patterns)
+            ]
+        else:
+            cronjobs, cached = client.query_cronjobs(patterns, module.params["cache_ttl"])
+
+    result = dict(changed=False, cronjobs=cronjobs, cached=cached)
+    if load_top > 0:
+        result["load"] = _load(all_jobs, load_top)
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
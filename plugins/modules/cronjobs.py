@@ -0,0 +1,260 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: cronjobs
+short_description: Declaratively manage the full set of TrueNAS SCALE cron jobs
+description:
+  - Reconcile a list of cron jobs on TrueNAS SCALE systems in a single task.
+  - Existing jobs are fetched with one C(cronjob.query) call and indexed by description; only the
+    create, update, and delete calls that are actually needed are sent to the middleware.
+  - Each entry accepts the same options as M(mareckii.truenas_scale.cronjob).
+options:
+  cronjobs:
+    description:
+      - Cron jobs to reconcile. Descriptions must be unique within the list.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description:
+          - Description of the cron job. This value must be unique on the TrueNAS node.
+        type: str
+        required: true
+      command:
+        description:
+          - Shell command executed by the cron job.
+          - Required when C(state=present).
+        type: str
+      user:
+        description:
+          - Account that should run the cron job.
+        type: str
+        default: root
+      enabled:
+        description:
+          - Whether the cron job should be enabled.
+        type: bool
+        default: true
+      schedule:
+        description:
+          - Cron schedule definition. Any omitted value defaults to C(*).
+        type: dict
+        suboptions:
+          minute:
+            description:
+              - Minute component of the cron schedule.
+            type: str
+          hour:
+            description:
+              - Hour component of the cron schedule.
+            type: str
+          dom:
+            description:
+              - Day of month component of the cron schedule.
+            type: str
+          month:
+            description:
+              - Month component of the cron schedule.
+            type: str
+          dow:
+            description:
+              - Day of week component of the cron schedule.
+            type: str
+      state:
+        description:
+          - Whether the cron job should exist.
+        type: str
+        choices:
+          - present
+          - absent
+        default: present
+  exclusive:
+    description:
+      - Remove every cron job on the node that is not listed in C(cronjobs).
+    type: bool
+    default: false
+author:
+  - Marek Marecki (@mareckii)
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: full
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: Ensure the node runs exactly these cron jobs
+  mareckii.truenas_scale.cronjobs:
+    exclusive: true
+    cronjobs:
+      - name: nightly backup
+        command: /usr/local/bin/backup.sh
+        schedule:
+          minute: "0"
+          hour: "2"
+      - name: weekly report
+        command: /usr/local/bin/report.sh
+        schedule:
+          minute: "30"
+          hour: "6"
+          dow: "1"
+
+- name: Remove obsolete cron jobs while leaving the rest alone
+  mareckii.truenas_scale.cronjobs:
+    cronjobs:
+      - name: old job
+        state: absent
+"""
+
+RETURN = r"""
+changed:
+  description: Indicates whether any cron job was created, updated, or removed.
+  returned: always
+  type: bool
+diff:
+  description:
+    - One C(before)/C(after) entry per created, updated, or removed cron job, in the same format as
+      M(mareckii.truenas_scale.cronjob).
+  returned: always
+  type: list
+  elements: dict
+created:
+  description: Cron job records created (or that would be created in check mode).
+  returned: always
+  type: list
+  elements: dict
+updated:
+  description: Cron job records after the update (or the current records in check mode).
+  returned: always
+  type: list
+  elements: dict
+deleted:
+  description: Cron job records that were (or would be) removed.
+  returned: always
+  type: list
+  elements: dict
+message:
+  description: Human readable summary of the action taken.
+  returned: always
+  type: str
+"""
+
+from collections import Counter
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.cronjobs import (
+    CronJobSpec,
+    extract_relevant_job_state,
+    plan_cronjobs,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            cronjobs=dict(
+                type="list",
+                elements="dict",
+                required=True,
+                options=dict(
+                    name=dict(type="str", required=True),
+                    command=dict(type="str"),
+                    user=dict(type="str", default="root"),
+                    enabled=dict(type="bool", default=True),
+                    schedule=dict(
+                        type="dict",
+                        options=dict(
+                            minute=dict(type="str"),
+                            hour=dict(type="str"),
+                            dom=dict(type="str"),
+                            month=dict(type="str"),
+                            dow=dict(type="str"),
+                        ),
+                    ),
+                    state=dict(type="str", default="present", choices=["present", "absent"]),
+                ),
+                required_if=[("state", "present", ["command"])],
+            ),
+            exclusive=dict(type="bool", default=False),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def _diff_entry(name, before, after):
+    return {"before": before, "after": after, "before_header": name, "after_header": name}
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+    items = module.params["cronjobs"]
+
+    names = [item["name"] for item in items]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        module.fail_json(
+            msg="Cron job names must be unique: {}".format(", ".join(duplicates))
+        )
+
+    specs = [
+        CronJobSpec.from_module_params(item) for item in items if item["state"] == "present"
+    ]
+    absent = [item["name"] for item in items if item["state"] == "absent"]
+
+    with TruenasClient() as client:
+        plan = plan_cronjobs(
+            specs, client.list_cronjobs(), absent=absent, exclusive=module.params["exclusive"]
+        )
+
+        diff = []
+        created, updated, deleted = [], [], []
+        for spec in plan.create:
+            diff.append(_diff_entry(spec.name, None, spec.desired_state()))
+            if module.check_mode:
+                created.append(spec.desired_state())
+            else:
+                created.append(client.create_cronjob(spec.to_payload()))
+        for job, spec in plan.update:
+            diff.append(_diff_entry(spec.name, extract_relevant_job_state(job), spec.desired_state()))
+            if module.check_mode:
+                updated.append(job)
+            else:
+                updated.append(client.update_cronjob(job["id"], spec.to_payload()))
+        for job in plan.delete:
+            diff.append(_diff_entry(job.get("description"), extract_relevant_job_state(job), None))
+            if not module.check_mode:
+                client.delete_cronjob(job["id"])
+            deleted.append(job)
+
+    message = "Cron jobs {}: {} created, {} updated, {} removed, {} unchanged".format(
+        "planned" if module.check_mode else "reconciled",
+        len(created),
+        len(updated),
+        len(deleted),
+        len(plan.unchanged),
+    )
+    module.exit_json(
+        changed=plan.changed,
+        message=message,
+        created=created,
+        updated=updated,
+        deleted=deleted,
+        diff=diff,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: fleet_app_info
+short_description: Gather applications from many TrueNAS SCALE nodes at once
+description:
+  - Connect to the middleware of every listed node in parallel and return their applications, and optionally
+    their cron jobs, from a single module run.
+  - Meant to run on the controller (for example with C(delegate_to=localhost) and C(run_once=true)), so a
+    fleet-wide audit costs one process instead of one task per node.
+  - Nodes that cannot be reached or exceed C(node_timeout) are reported in C(unreachable) instead of failing
+    the task.
+options:
+  nodes:
+    description:
+      - Nodes to query.
+      - Per-node C(api_key), C(username), C(password) and C(verify_ssl) override the module-wide values.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description: Name of the node in the results.
+        type: str
+        required: true
+      uri:
+        description: Middleware websocket URI. Defaults to C(wss://<name>/api/current).
+        type: str
+      api_key:
+        description: API key for this node.
+        type: str
+      username:
+        description: User name for this node when no API key is used.
+        type: str
+      password:
+        description: Password for C(username).
+        type: str
+      verify_ssl:
+        description: Whether to verify the node's TLS certificate.
+        type: bool
+  api_key:
+    description: API key used for every node without its own credentials. Defaults to C(TRUENAS_API_KEY).
+    type: str
+  username:
+    description: User name used for every node without its own credentials. Defaults to C(TRUENAS_USERNAME).
+    type: str
+  password:
+    description: Password for C(username). Defaults to C(TRUENAS_PASSWORD).
+    type: str
+  verify_ssl:
+    description: Whether to verify TLS certificates of the nodes.
+    type: bool
+    default: true
+  name:
+    description:
+      - Only return applications whose name matches one of these shell-style patterns.
+    type: list
+    elements: str
+    aliases:
+      - names
+  include_cronjobs:
+    description: Also return the cron jobs of every node.
+    type: bool
+    default: false
+  max_workers:
+    description: Number of nodes queried concurrently.
+    type: int
+    default: 8
+  node_timeout:
+    description:
+      - Seconds a single node may take to connect and answer before it is reported as unreachable.
+      - By default nodes are waited for as long as their calls take.
+    type: float
+author:
+  - Marek Marecki (@mareckii)
+requirements:
+  - truenas_api_client
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: none
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: Audit application versions across the fleet from the controller
+  mareckii.truenas_scale.fleet_app_info:
+    nodes:
+      - name: nas1.example.com
+      - name: nas2.example.com
+        uri: wss://10.0.0.12/api/current
+        verify_ssl: false
+    node_timeout: 30
+  delegate_to: localhost
+  run_once: true
+  register: fleet
+
+- name: Report nodes that did not answer
+  ansible.builtin.debug:
+    var: fleet.unreachable
+  run_once: true
+"""
+
+RETURN = r"""
+nodes:
+  description:
+    - One entry per node, in the order given, with C(node), C(ok), C(seconds), C(error), C(apps) and, with
+      C(include_cronjobs=true), C(cronjobs).
+  returned: always
+  type: list
+  elements: dict
+apps:
+  description: Application records of every reachable node, each with an added C(node) key.
+  returned: always
+  type: list
+  elements: dict
+unreachable:
+  description: Names of the nodes that failed or timed out.
+  returned: always
+  type: list
+  elements: str
+"""
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import fleet, tracing
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            nodes=dict(
+                type="list",
+                elements="dict",
+                required=True,
+                options=dict(
+                    name=dict(type="str", required=True),
+                    uri=dict(type="str"),
+                    api_key=dict(type="str", no_log=True),
+                    username=dict(type="str"),
+                    password=dict(type="str", no_log=True),
+                    verify_ssl=dict(type="bool"),
+                ),
+            ),
+            api_key=dict(type="str", no_log=True, fallback=(env_fallback, ["TRUENAS_API_KEY"])),
+            username=dict(type="str", fallback=(env_fallback, ["TRUENAS_USERNAME"])),
+            password=dict(type="str", no_log=True, fallback=(env_fallback, ["TRUENAS_PASSWORD"])),
+            verify_ssl=dict(type="bool", default=True),
+            name=dict(type="list", elements="str", aliases=["names"]),
+            include_cronjobs=dict(type="bool", default=False),
+            max_workers=dict(type="int", default=fleet.DEFAULT_MAX_WORKERS),
+            node_timeout=dict(type="float"),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+    if module.params["max_workers"] < 1:
+        module.fail_json(msg="max_workers must be at least 1")
+
+    defaults = {key: module.params[key] for key in fleet.CREDENTIALS}
+    try:
+        nodes = [fleet.Node.from_dict(node, defaults) for node in module.params["nodes"]]
+        patterns = module.params["name"]
+
+        def query(client):
+            result = {"apps": client.query_apps(patterns)[0]}
+            if module.params["include_cronjobs"]:
+                result["cronjobs"] = client.list_cronjobs()
+            return result
+
+        outcomes = fleet.run_on_nodes(
+            nodes,
+            query,
+            max_workers=module.params["max_workers"],
+            timeout=module.params["node_timeout"],
+        )
+    except ValueError as exc:
+        module.fail_json(msg=str(exc))
+
+    results = []
+    apps = []
+    for outcome in outcomes:
+        entry = {
+            "node": outcome.node,
+            "ok": outcome.ok,
+            "seconds": outcome.seconds,
+            "error": outcome.error,
+        }
+        if outcome.ok:
+            entry.update(outcome.result)
+            apps.extend(dict(app, node=outcome.node) for app in outcome.result["apps"])
+        results.append(entry)
+
+    module.exit_json(
+        changed=False,
+        nodes=results,
+        apps=apps,
+        unreachable=[outcome.node for outcome in outcomes if not outcome.ok],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/python
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+DOCUMENTATION = r"""
+module: job_status
+short_description: Check or wait for TrueNAS SCALE middleware jobs
+description:
+  - Look up one or many middleware jobs, for example those started by M(mareckii.truenas_scale.app) with
+    C(wait=false), with a single C(core.get_jobs) call.
+  - With C(wait=true) the jobs that are still running are polled together until all of them have finished.
+options:
+  job_ids:
+    description:
+      - Ids of the jobs to check.
+    type: list
+    elements: int
+    required: true
+    aliases:
+      - job_id
+  wait:
+    description:
+      - Whether to wait until every job has finished.
+    type: bool
+    default: false
+  wait_timeout:
+    description:
+      - Maximum number of seconds to wait when C(wait=true).
+      - The module fails if a job has not finished in time; the middleware keeps running it.
+      - By default the module waits until every job finishes.
+    type: int
+  poll_interval:
+    description:
+      - Seconds between two polls when C(wait=true).
+    type: float
+    default: 1.0
+  fail_on_error:
+    description:
+      - Whether to fail when a job ended in C(FAILED) or C(ABORTED), or is unknown to the middleware.
+    type: bool
+    default: true
+author:
+  - Marek Marecki (@mareckii)
+extends_documentation_fragment:
+  - ansible.builtin.action_common_attributes
+attributes:
+  check_mode:
+    support: full
+  diff_mode:
+    support: none
+  platform:
+    platforms:
+      - Linux
+"""
+
+EXAMPLES = r"""
+- name: Start deployments without waiting
+  mareckii.truenas_scale.app:
+    name: "{{ item.name }}"
+    compose_config: "{{ item.compose }}"
+    wait: false
+  loop: "{{ stack }}"
+  register: deploys
+
+- name: Wait for all of them
+  mareckii.truenas_scale.job_status:
+    job_ids: "{{ deploys.results | selectattr('job', 'defined') | map(attribute='job.job_id') | list }}"
+    wait: true
+    wait_timeout: 900
+
+- name: Poll without blocking the play, async style
+  mareckii.truenas_scale.job_status:
+    job_ids: "{{ deploys.results | selectattr('job', 'defined') | map(attribute='job.job_id') | list }}"
+  register: status
+  until: status.finished
+  retries: 60
+  delay: 10
+"""
+
+RETURN = r"""
+jobs:
+  description:
+    - One entry per requested job id, in the order given, with C(id), C(method), C(state), C(progress),
+      C(result) and C(error).
+    - Ids the middleware does not know have C(state=UNKNOWN).
+  returned: always
+  type: list
+  elements: dict
+finished:
+  description: Whether every job has finished (successfully or not).
+  returned: always
+  type: bool
+failed_jobs:
+  description: Ids of the jobs that ended in C(FAILED) or C(ABORTED), or are unknown.
+  returned: always
+  type: list
+  elements: int
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import tracing
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.jobs import (
+    JOB_FINISHED_STATES,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+
+UNKNOWN = "UNKNOWN"
+# Unknown jobs will never finish, so they count as settled (and failed).
+_SETTLED_STATES = JOB_FINISHED_STATES + (UNKNOWN,)
+
+
+def _build_module():
+    return AnsibleModule(
+        argument_spec=dict(
+            job_ids=dict(type="list", elements="int", required=True, aliases=["job_id"]),
+            wait=dict(type="bool", default=False),
+            wait_timeout=dict(type="int"),
+            poll_interval=dict(type="float", default=1.0),
+            fail_on_error=dict(type="bool", default=True),
+        ),
+        supports_check_mode=True,
+    )
+
+
+def main():
+    module = _build_module()
+    tracing.attach(module)
+    job_ids = module.params["job_ids"]
+
+    with TruenasClient() as client:
+        records = client.poll_jobs(
+            job_ids,
+            wait=module.params["wait"],
+            timeout=module.params["wait_timeout"],
+            poll_interval=module.params["poll_interval"],
+        )
+
+    jobs = [records.get(job_id) or {"id": job_id, "state": UNKNOWN} for job_id in job_ids]
+    pending = [job["id"] for job in jobs if job["state"] not in _SETTLED_STATES]
+    failed_jobs = [
+        job["id"] for job in jobs if job["state"] in _SETTLED_STATES and job["state"] != "SUCCESS"
+    ]
+    result = dict(changed=False, jobs=jobs, finished=not pending, failed_jobs=failed_jobs)
+
+    if module.params["wait"] and pending:
+        module.fail_json(
+            msg="Timed out waiting for jobs: {}".format(", ".join(str(job_id) for job_id in pending)),
+            **result
+        )
+    if module.params["fail_on_error"] and failed_jobs:
+        module.fail_json(
+            msg="Jobs did not succeed: {}".format(", ".join(str(job_id) for job_id in failed_jobs)),
+            **result
+        )
+    module.exit_json(**result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# Copyright: (c) 2024, Marek Marecki (@mareckii)
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+"""Controller-side snapshots that let action plugins skip no-op module runs.
+
+The first task for a host fetches the whole collection with one info module
+call; later tasks of the same ``ansible-playbook`` run compare their desired
+state with that snapshot on the controller and only execute the real module
+when something has to change. A changed module run patches the record it
+returned into the snapshot; a failed run, or one whose record cannot be
+patched, drops the snapshot so the next task sees fresh data.
+
+Snapshots are opt-in: only this collection's ``app`` and ``cronjob`` tasks
+keep them current, so changes made by other modules or outside Ansible stay
+invisible until the snapshot expires.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import quote
+
+from ansible.plugins.action import ActionBase
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cache
+
+DEFAULT_SNAPSHOT_TTL = 0
+
+
+def snapshot_ttl(task_vars: Mapping[str, Any]) -> float:
+    """Seconds a snapshot may be reused; ``0`` (the default) always runs the module."""
+    value = task_vars.get("truenas_scale_snapshot_ttl")
+    if value is None:
+        value = os.environ.get("TRUENAS_SCALE_SNAPSHOT_TTL")
+    if value is None or value == "":
+        return DEFAULT_SNAPSHOT_TTL
+    return float(value)
+
+
+def _snapshot_path(host: str, collection: str) -> str:
+    return cache.cache_path("snapshots", quote(host, safe=""), "{}.json".format(collection))
+
+
+def _run_id() -> int:
+    # Task workers are forked from the ansible-playbook process, so its pid
+    # scopes a snapshot to a single run; later runs always start fresh.
+    return os.getppid()
+
+
+def _load_entry(host: str, collection: str, ttl: float) -> Optional[Dict[str, Any]]:
+    entry = cache.read_json(_snapshot_path(host, collection))
+    if not isinstance(entry, dict) or entry.get("run") != _run_id():
+        return None
+    if entry.get("fetched_at", 0) + ttl < time.time():
+        return None
+    if not isinstance(entry.get("records"), list):
+        return None
+    return entry
+
+
+def load_snapshot(host: str, collection: str, ttl: float) -> Optional[List[Dict[str, Any]]]:
+    entry = _load_entry(host, collection, ttl)
+    return None if entry is None else entry["records"]
+
+
+def store_snapshot(
+    host: str,
+    collection: str,
+    records: List[Dict[str, Any]],
+    fetched_at: Optional[float] = None,
+) -> None:
+    cache.write_json(
+        _snapshot_path(host, collection),
+        {
+            "run": _run_id(),
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "records": records,
+        },
+    )
+
+
+def invalidate_snapshot(host: str, collection: str) -> None:
+    try:
+        os.unlink(_snapshot_path(host, collection))
+    except OSError:
+        pass
+
+
+class SnapshotAction(ActionBase):
+    """Run the task's module only when the host snapshot says it would change something."""
+
+    _supports_check_mode = True
+    _supports_async = True
+
+    # Set by subclasses: the info module, its arguments and the result key
+    # holding the records.
+    collection = ""
+    info_module = ""
+    info_args: Dict[str, Any] = {}
+
+    def noop_result(
+        self, args: Mapping[str, Any], records: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Return the module's result for an unchanged resource, or ``None`` to run it."""
+        raise NotImplementedError
+
+    def patched_records(
+        self,
+        args: Mapping[str, Any],
+        records: List[Dict[str, Any]],
+        module_result: Mapping[str, Any],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return ``records`` with a changed module run applied, or ``None`` to drop them."""
+        return None
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or {}
+        result = super().run(tmp, task_vars)
+        wrap_async = self._wrap_async()
+        try:
+            result.update(self._run(task_vars, wrap_async))
+        finally:
+            if not wrap_async:
+                # As in ansible.builtin.normal: the async wrapper cleans up after itself.
+                self._remove_tmp_path(self._connection._shell.tmpdir)
+        return result
+
+    def _run(self, task_vars, wrap_async: bool) -> Dict[str, Any]:
+        host = task_vars.get("inventory_hostname")
+        ttl = snapshot_ttl(task_vars)
+
+        if host and ttl > 0 and not self._task.async_val and not self._task.delegate_to:
+            records = self._snapshot(host, ttl, task_vars, wrap_async)
+            if records is not None:
+                noop = self.noop_result(self._task.args, records)
+                if noop is not None:
+                    return noop
+
+        module_result = self._execute_module(task_vars=task_vars, wrap_async=wrap_async)
+        if host and (module_result.get("failed") or self._task.async_val):
+            # An async job reports its outcome later; assume it changes something.
+            invalidate_snapshot(host, self.collection)
+        elif host and module_result.get("changed") and not self._play_context.check_mode:
+            self._patch_snapshot(host, ttl, module_result)
+        return module_result
+
+    def _wrap_async(self) -> bool:
+        # Wrap the module in async_wrapper unless the connection runs it async itself.
+        return bool(self._task.async_val) and not self._connection.has_native_async
+
+    def _patch_snapshot(self, host: str, ttl: float, module_result) -> None:
+        entry = None
+        if not self._task.delegate_to:
+            entry = _load_entry(host, self.collection, ttl)
+        records = None
+        if entry is not None:
+            records = self.patched_records(self._task.args, entry["records"], module_result)
+        if records is None:
+            invalidate_snapshot(host, self.collection)
+        else:
+            # Keep the original fetch time: the other records are no fresher.
+            store_snapshot(host, self.collection, records, entry["fetched_at"])
+
+    def _snapshot(
+        self, host: str, ttl: float, task_vars, wrap_async: bool
+    ) -> Optional[List[Dict[str, Any]]]:
+        records = load_snapshot(host, self.collection, ttl)
+        if records is not None:
+            return records
+        info = self._execute_module(
+            module_name=self.info_module,
+            module_args=dict(self.info_args),
+            task_vars=task_vars,
+            wrap_async=wrap_async,
+        )
+        if info.get("failed") or not isinstance(info.get(self.collection), list):
+            return None
+        store_snapshot(host, self.collection, info[self.collection])
+        return info[self.collection]
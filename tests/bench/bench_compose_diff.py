@@ -0,0 +1,79 @@
+"""Micro-benchmark: full vs minimal compose diffs on a large generated compose file.
+
+Changes a handful of services in a generated compose document and reports how
+long the path-level delta takes and how large the module's ``diff`` payload is
+in each ``diff_mode``.
+
+Usage::
+
+    python tests/bench/bench_compose_diff.py --services 500 --changed 5
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_yaml import generate_compose  # noqa: E402
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import compose_diff  # noqa: E402
+
+
+def _best(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def mutate(compose: dict, changed: int) -> dict:
+    """Return a copy with ``changed`` services re-tagged and one environment variable added."""
+    desired = copy.deepcopy(compose)
+    for name in list(desired["services"])[:changed]:
+        service = desired["services"][name]
+        service["image"] = service["image"].rsplit(":", 1)[0] + ":next"
+        service["environment"]["BENCH"] = "1"
+    return desired
+
+
+def run(services: int = 500, changed: int = 5, repeat: int = 3) -> dict:
+    before = generate_compose(services)
+    after = mutate(before, changed)
+    full, _ = compose_diff.build_diff(before, after, "full")
+    minimal, changes = compose_diff.build_diff(before, after, "minimal")
+    results = {
+        "services": services,
+        "changed_services": changed,
+        "changes": len(changes),
+        "full_bytes": len(json.dumps({"diff": full})),
+        "minimal_bytes": len(json.dumps({"diff": minimal, "compose_changes": changes})),
+        "delta": _best(lambda: compose_diff.compose_delta(before, after), repeat),
+        "minimal_diff": _best(lambda: compose_diff.build_diff(before, after, "minimal"), repeat),
+        "serialize_full": _best(lambda: json.dumps({"diff": full}), repeat),
+        "serialize_minimal": _best(
+            lambda: json.dumps({"diff": minimal, "compose_changes": changes}), repeat
+        ),
+    }
+    results["size_ratio"] = results["full_bytes"] / results["minimal_bytes"]
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--changed", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    json.dump(run(args.services, args.changed, args.repeat), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
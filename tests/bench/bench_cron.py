@@ -0,0 +1,86 @@
+"""Micro-benchmark: cron schedule parsing, comparison and per-minute load.
+
+Generates ``--jobs`` cron jobs spread over a small set of schedules (most of
+them at 02:00, like a typical backup/scrub/replication setup) and reports how
+long canonical comparison, next-run computation and the per-minute histogram
+take, and how long placing one more job with the stagger planner takes.
+
+Usage::
+
+    python tests/bench/bench_cron.py --jobs 5000
+"""
+
+import argparse
+import datetime
+import json
+import random
+import sys
+import time
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cronjobs
+
+SCHEDULES = (
+    {"minute": "0", "hour": "2"},
+    {"minute": "00", "hour": "02"},
+    {"minute": "*/15"},
+    {"minute": "0,30", "hour": "*/6"},
+    {"minute": "5", "hour": "3", "dow": "sun"},
+    {"minute": "0", "hour": "4", "dom": "1"},
+)
+
+
+def _best(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def generate_jobs(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(count):
+        schedule = dict(rng.choice(SCHEDULES))
+        if index % 10 == 0:
+            schedule["minute"] = str(rng.randrange(60))
+        jobs.append({"description": "job {}".format(index), "schedule": schedule})
+    return jobs
+
+
+def run(jobs: int = 5000, repeat: int = 3) -> dict:
+    records = generate_jobs(jobs)
+    schedules = [cronjobs.CronSchedule.from_mapping(job["schedule"]) for job in records]
+    after = datetime.datetime(2026, 1, 1)
+    histogram = cronjobs.minute_histogram(schedules)
+    return {
+        "jobs": jobs,
+        "busiest": cronjobs.busiest_minutes(histogram, 3),
+        "matches": _best(
+            lambda: [schedule.matches(job["schedule"]) for schedule, job in zip(schedules, records)],
+            repeat,
+        ),
+        "next_run": _best(lambda: [schedule.next_run(after) for schedule in schedules], repeat),
+        "histogram": _best(lambda: cronjobs.minute_histogram(schedules), repeat),
+        "stagger": _best(
+            lambda: cronjobs.stagger_schedule(
+                cronjobs.CronSchedule(), "new job", records, "01:00-05:00", name="new job"
+            ),
+            repeat,
+        ),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    json.dump(run(args.jobs, args.repeat), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
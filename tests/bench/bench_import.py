@@ -0,0 +1,73 @@
+"""Benchmark: module import cost measured with ``python -X importtime``.
+
+Each module is imported in a fresh interpreter ``--repeat`` times; the best
+cumulative time of the module itself and of the collection code it pulls in
+is reported in microseconds.
+
+Usage::
+
+    python tests/bench/bench_import.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+COLLECTION = "ansible_collections.mareckii.truenas_scale.plugins"
+MODULES_DIR = Path(__file__).resolve().parents[2] / "plugins" / "modules"
+
+
+def import_profile(module_name: str) -> dict:
+    """Return ``{imported_module: (self_us, cumulative_us)}`` for one cold import."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module_name],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            profile[name.strip()] = (int(own), int(cumulative))
+    return profile
+
+
+def run(repeat: int = 5) -> dict:
+    results = {}
+    for path in sorted(MODULES_DIR.glob("*.py")):
+        module_name = "{}.modules.{}".format(COLLECTION, path.stem)
+        best = None
+        for _ in range(repeat):
+            profile = import_profile(module_name)
+            sample = {
+                "total_us": profile[module_name][1],
+                "collection_us": sum(
+                    own for name, (own, _) in profile.items() if name.startswith(COLLECTION)
+                ),
+                "modules": len(profile),
+            }
+            if best is None or sample["total_us"] < best["total_us"]:
+                best = sample
+        results[path.stem] = best
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    json.dump(run(args.repeat), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
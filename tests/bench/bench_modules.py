@@ -0,0 +1,247 @@
+"""Benchmark: module and client hot paths against the stub backend.
+
+Seeds a throw-away stub workspace with N apps and M cron jobs, times the
+lookups, the idempotent ``main()`` paths, compose comparison and the stub
+store, and prints the results as JSON. With ``--baseline`` the run fails when
+any timing regressed by more than ``--max-regression``.
+
+Usage::
+
+    python tests/bench/bench_modules.py --apps 10000 --cronjobs 2000
+    python tests/bench/bench_modules.py --output current.json --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from ansible.module_utils import basic
+from ansible.module_utils.common.text.converters import to_bytes
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    apps as app_utils,
+    stub_state,
+    truenas_client,
+    yamlutils,
+)
+from ansible_collections.mareckii.truenas_scale.plugins.modules import app, apps, cronjob
+
+DEFAULT_MAX_REGRESSION = 1.25
+# Timings this short are dominated by noise and never count as regressions.
+MIN_COMPARED_SECONDS = 0.001
+SCHEDULE = {"minute": "*", "hour": "*", "dom": "*", "month": "*", "dow": "*"}
+
+
+def app_name(index: int) -> str:
+    return "bench-app-{:05d}".format(index)
+
+
+def cronjob_name(index: int) -> str:
+    return "bench-cron-{:05d}".format(index)
+
+
+def compose_for(name: str) -> dict:
+    return {
+        "services": {
+            name: {
+                "image": "registry.example.com/{}:latest".format(name),
+                "environment": {"VAR_{}".format(key): str(key) for key in range(10)},
+                "ports": ["8080:8080"],
+            }
+        }
+    }
+
+
+def seed(workspace: str, config_root: str, app_count: int, cronjob_count: int, composed: int):
+    """Write the inventory in one transaction and compose files for the first ``composed`` apps."""
+    store = stub_state.open_store(workspace)
+    with store.transaction() as state:
+        state["apps"] = [
+            {"name": app_name(index), "custom_app": True, "version": "1", "state": "RUNNING"}
+            for index in range(app_count)
+        ]
+        state["cronjobs"] = [
+            {
+                "id": index + 1,
+                "description": cronjob_name(index),
+                "command": "/bin/true",
+                "user": "root",
+                "enabled": True,
+                "schedule": dict(SCHEDULE),
+            }
+            for index in range(cronjob_count)
+        ]
+        state["next_cronjob_id"] = cronjob_count + 1
+    store.close()
+
+    for index in range(min(composed, app_count)):
+        name = app_name(index)
+        target = os.path.join(config_root, name, "versions", "1", "user_config.yaml")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as handle:
+            yamlutils.safe_dump(compose_for(name), handle)
+
+
+def run_module(module, params: dict) -> dict:
+    """Run ``module.main()`` in-process the way Ansible would and return its result."""
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({"ANSIBLE_MODULE_ARGS": params}))
+    if hasattr(basic, "_ANSIBLE_PROFILE"):
+        basic._ANSIBLE_PROFILE = "legacy"
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            module.main()
+        except SystemExit:
+            pass
+    result = json.loads(output.getvalue())
+    if result.get("failed") or result.get("changed"):
+        raise RuntimeError("Idempotent run of {} reported {}".format(module.__name__, result))
+    return result
+
+
+def _median(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _clear_cache() -> None:
+    shutil.rmtree(os.environ["TRUENAS_SCALE_CACHE_DIR"], ignore_errors=True)
+
+
+def run(apps_count: int = 1000, cronjobs_count: int = 1000, reconcile: int = 100,
+        repeat: int = 5, store: str = "json") -> dict:
+    workspace = tempfile.mkdtemp(prefix="truenas-bench-")
+    environ = dict(os.environ)
+    os.environ.update(
+        TRUENAS_CLIENT_BACKEND="stub",
+        TRUENAS_STUB_STORE=store,
+        TRUENAS_STUB_WORKSPACE=os.path.join(workspace, "stub"),
+        TRUENAS_APP_CONFIG_ROOT=os.path.join(workspace, "app_configs"),
+        TRUENAS_SCALE_CACHE_DIR=os.path.join(workspace, "cache"),
+    )
+    os.environ.pop("TRUENAS_CLIENT_BROKER", None)
+    try:
+        reconcile = min(reconcile, apps_count)
+        seed(
+            os.environ["TRUENAS_STUB_WORKSPACE"],
+            os.environ["TRUENAS_APP_CONFIG_ROOT"],
+            apps_count,
+            cronjobs_count,
+            reconcile,
+        )
+        last_app = app_name(reconcile - 1)
+        last_cronjob = cronjob_name(cronjobs_count - 1)
+        application = {"name": last_app, "version": "1"}
+        timings = {}
+
+        with truenas_client.TruenasClient() as client:
+            timings["find_application"] = _median(lambda: client.find_application(last_app), repeat)
+            timings["find_cronjob"] = _median(lambda: client.find_cronjob(last_cronjob), repeat)
+            timings["store_write"] = _median(
+                lambda: client.update_cronjob(1, {"enabled": True}), repeat
+            )
+
+        def cold_read():
+            with truenas_client.TruenasClient() as client:
+                client.list_applications([last_app])
+
+        timings["store_read_cold"] = _median(cold_read, repeat)
+
+        def compare_cold():
+            _clear_cache()
+            app_utils.compare_compose(application, compose_for(last_app))
+
+        timings["compose_compare_cold"] = _median(compare_cold, repeat)
+        timings["compose_compare_warm"] = _median(
+            lambda: app_utils.compare_compose(application, compose_for(last_app)), repeat
+        )
+
+        timings["app_main_idempotent"] = _median(
+            lambda: run_module(app, {"name": last_app, "compose_config": compose_for(last_app)}),
+            repeat,
+        )
+        os.environ["TRUENAS_CLIENT_SNAPSHOT_TTL"] = "300"
+        timings["app_main_idempotent_snapshot"] = _median(
+            lambda: run_module(app, {"name": last_app, "compose_config": compose_for(last_app)}),
+            repeat,
+        )
+        del os.environ["TRUENAS_CLIENT_SNAPSHOT_TTL"]
+        timings["cronjob_main_idempotent"] = _median(
+            lambda: run_module(
+                cronjob, {"name": last_cronjob, "command": "/bin/true", "schedule": SCHEDULE}
+            ),
+            repeat,
+        )
+        stack = [
+            {"name": app_name(index), "compose_config": compose_for(app_name(index))}
+            for index in range(reconcile)
+        ]
+        timings["apps_main_idempotent"] = _median(lambda: run_module(apps, {"apps": stack}), repeat)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    return {
+        "apps": apps_count,
+        "cronjobs": cronjobs_count,
+        "reconcile": reconcile,
+        "repeat": repeat,
+        "store": store,
+        "timings": timings,
+    }
+
+
+def regressions(results: dict, baseline: dict, max_regression: float) -> dict:
+    """Return ``{metric: ratio}`` for timings slower than ``max_regression`` x baseline."""
+    slower = {}
+    for metric, seconds in results["timings"].items():
+        previous = baseline.get("timings", {}).get(metric)
+        if previous and previous >= MIN_COMPARED_SECONDS and seconds / previous > max_regression:
+            slower[metric] = seconds / previous
+    return slower
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=1000)
+    parser.add_argument("--cronjobs", type=int, default=1000)
+    parser.add_argument("--reconcile", type=int, default=100,
+                        help="number of apps passed to the bulk apps module")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--store", choices=stub_state.STORE_BACKENDS, default="json")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    results = run(args.apps, args.cronjobs, args.reconcile, args.repeat, args.store)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            slower = regressions(results, json.load(handle), args.max_regression)
+        for metric, ratio in sorted(slower.items()):
+            sys.stderr.write("REGRESSION {}: {:.2f}x baseline\n".format(metric, ratio))
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
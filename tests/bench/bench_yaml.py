@@ -0,0 +1,85 @@
+"""Micro-benchmark: libyaml vs pure-Python YAML on a large generated compose file.
+
+Usage::
+
+    python tests/bench/bench_yaml.py --services 500 --repeat 3
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import yaml
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import yamlutils
+
+
+def generate_compose(services: int) -> dict:
+    """Build a compose document shaped like real multi-service stacks."""
+    compose = {"services": {}, "volumes": {}, "networks": {"backend": {"driver": "bridge"}}}
+    for index in range(services):
+        name = "service-{:04d}".format(index)
+        compose["services"][name] = {
+            "image": "registry.example.com/team/{}:{}".format(name, index % 7),
+            "restart": "unless-stopped",
+            "environment": {"VAR_{}".format(key): "value-{}-{}".format(index, key) for key in range(20)},
+            "ports": ["{}:{}".format(10000 + index, 8080)],
+            "volumes": ["{}-data:/data".format(name), "/mnt/tank/{}:/config:ro".format(name)],
+            "labels": {"com.example.tier": "backend", "com.example.index": str(index)},
+            "healthcheck": {
+                "test": ["CMD", "curl", "-f", "http://localhost:8080/health"],
+                "interval": "30s",
+                "retries": 3,
+            },
+            "configs": [
+                {
+                    "source": "{}-config".format(name),
+                    "target": "/etc/app.conf",
+                    "content": "\n".join("option_{} = {}".format(key, key * index) for key in range(30)),
+                }
+            ],
+            "networks": ["backend"],
+        }
+        compose["volumes"]["{}-data".format(name)] = {}
+    return compose
+
+
+def _best(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(services: int = 500, repeat: int = 3) -> dict:
+    compose = generate_compose(services)
+    text = yaml.dump(compose, Dumper=yaml.SafeDumper)
+    results = {
+        "services": services,
+        "bytes": len(text.encode("utf-8")),
+        "libyaml": yamlutils.HAS_LIBYAML,
+        "load_pure": _best(lambda: yaml.load(text, Loader=yaml.SafeLoader), repeat),
+        "load_helper": _best(lambda: yamlutils.safe_load(text), repeat),
+        "dump_pure": _best(lambda: yaml.dump(compose, Dumper=yaml.SafeDumper), repeat),
+        "dump_helper": _best(lambda: yamlutils.safe_dump(compose), repeat),
+    }
+    results["load_speedup"] = results["load_pure"] / results["load_helper"]
+    results["dump_speedup"] = results["dump_pure"] / results["dump_helper"]
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    json.dump(run(args.services, args.repeat), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    """Keep the host-local caches of every test inside its own tmp_path."""
+    monkeypatch.setenv("TRUENAS_SCALE_CACHE_DIR", str(tmp_path / "cache"))
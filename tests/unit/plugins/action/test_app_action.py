@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+
+import pytest
+from ansible.plugins.action import ActionBase
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import compose_digest
+from plugins.action import app as app_action
+
+COMPOSE = {"services": {"redis": {"image": "redis:7"}}}
+
+
+def _record(name="redis", compose=COMPOSE, custom_app=True):
+    return {
+        "id": name,
+        "name": name,
+        "state": "RUNNING",
+        "version": "1",
+        "custom_app": custom_app,
+        "notes": "not part of the module result",
+        "compose_digest": compose_digest(compose),
+    }
+
+
+def test_noop_when_compose_digest_matches():
+    result = app_action._noop_result({"name": "redis", "compose_config": COMPOSE}, [_record()])
+
+    assert result["changed"] is False
+    assert result["message"] == "Application redis is up to date"
+    assert "notes" not in result["application"]
+
+
+@pytest.mark.parametrize(
+    "args, apps",
+    [
+        ({"name": "redis", "compose_config": {"services": {}}}, [_record()]),
+        ({"name": "redis", "compose_config": COMPOSE}, []),
+        ({"name": "redis", "compose_config": COMPOSE}, [_record(custom_app=False)]),
+        ({"name": "redis", "state": "restarted"}, [_record()]),
+        ({"name": "redis", "state": "absent"}, [_record()]),
+        ({"name": "redis", "compose_config": COMPOSE, "unknown": 1}, [_record()]),
+    ],
+)
+def test_module_runs_when_anything_may_change(args, apps):
+    assert app_action._noop_result(args, apps) is None
+
+
+def test_absent_app_is_a_noop():
+    result = app_action._noop_result({"name": "redis", "state": "absent"}, [])
+
+    assert result == {
+        "changed": False,
+        "state": "absent",
+        "message": "Application 'redis' is already absent",
+    }
+
+
+@pytest.fixture
+def action(monkeypatch):
+    monkeypatch.setattr(ActionBase, "run", lambda self, tmp=None, task_vars=None: {})
+    plugin = app_action.ActionModule.__new__(app_action.ActionModule)
+    plugin._task = SimpleNamespace(args={}, async_val=0, delegate_to=None)
+    plugin._play_context = SimpleNamespace(check_mode=False)
+    plugin._connection = SimpleNamespace(
+        has_native_async=False, _shell=SimpleNamespace(tmpdir="/tmp/ansible-tmp")
+    )
+    plugin._remove_tmp_path = lambda path: plugin.removed.append(path)
+    plugin.removed = []
+    plugin.calls = []
+    plugin.wrapped = []
+    plugin.module_result = {"changed": True, "state": "present"}
+
+    def execute_module(module_name=None, module_args=None, task_vars=None, wrap_async=False):
+        plugin.calls.append(module_name)
+        plugin.wrapped.append(wrap_async)
+        if module_name == "mareckii.truenas_scale.app_info":
+            return {"apps": [_record()]}
+        return dict(plugin.module_result)
+
+    plugin._execute_module = execute_module
+    return plugin
+
+
+TASK_VARS = {"inventory_hostname": "nas", "truenas_scale_snapshot_ttl": 300}
+
+
+def test_snapshot_is_shared_between_tasks_and_patched_by_changes(action):
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+
+    assert action.run(task_vars=TASK_VARS)["changed"] is False
+    assert action.run(task_vars=TASK_VARS)["changed"] is False
+    assert action.calls == ["mareckii.truenas_scale.app_info"]
+
+    action._task.args = {"name": "nginx", "compose_config": COMPOSE}
+    assert action.run(task_vars=TASK_VARS)["changed"] is True
+    assert action.run(task_vars=TASK_VARS)["changed"] is False
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    assert action.run(task_vars=TASK_VARS)["changed"] is False
+    assert action.calls == ["mareckii.truenas_scale.app_info", None]
+
+
+def test_removed_app_is_dropped_from_the_snapshot(action):
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    action.run(task_vars=TASK_VARS)
+
+    action._task.args = {"name": "redis", "state": "absent"}
+    action.module_result = {"changed": True, "state": "absent"}
+    action.run(task_vars=TASK_VARS)
+
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    action.module_result = {"changed": True, "state": "present"}
+    assert action.run(task_vars=TASK_VARS)["changed"] is True
+    assert action.calls == ["mareckii.truenas_scale.app_info", None, None]
+
+
+@pytest.mark.parametrize(
+    "module_result",
+    [
+        {"failed": True},
+        {"changed": True, "state": "present", "job": {"state": "RUNNING"}},
+    ],
+)
+def test_unknown_outcome_drops_the_snapshot(action, module_result):
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    action.run(task_vars=TASK_VARS)
+
+    action._task.args = {"name": "nginx", "compose_config": COMPOSE}
+    action.module_result = module_result
+    action.run(task_vars=TASK_VARS)
+
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    action.run(task_vars=TASK_VARS)
+    assert action.calls[-1] == "mareckii.truenas_scale.app_info"
+
+
+@pytest.mark.parametrize(
+    "task_vars", [{"inventory_hostname": "nas"}, dict(TASK_VARS, truenas_scale_snapshot_ttl=0)]
+)
+def test_snapshot_is_opt_in(action, task_vars):
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+
+    action.run(task_vars=task_vars)
+
+    assert action.calls == [None]
+
+
+def test_async_task_runs_the_wrapped_module_and_drops_the_snapshot(action):
+    action._task.args = {"name": "redis", "compose_config": COMPOSE}
+    action.run(task_vars=TASK_VARS)
+
+    action._task.async_val = 60
+    action.module_result = {"started": 1, "finished": 0, "ansible_job_id": "j1"}
+    result = action.run(task_vars=TASK_VARS)
+
+    assert app_action.ActionModule._supports_async is True
+    assert result["ansible_job_id"] == "j1"
+    assert action.calls == ["mareckii.truenas_scale.app_info", None]
+    assert action.wrapped == [False, True]
+    # The async wrapper removes its own temporary directory.
+    assert action.removed == ["/tmp/ansible-tmp"]
+
+    # The job may still change the app, so the next task fetches a fresh snapshot.
+    action._task.async_val = 0
+    assert action.run(task_vars=TASK_VARS)["changed"] is False
+    assert action.calls == [
+        "mareckii.truenas_scale.app_info",
+        None,
+        "mareckii.truenas_scale.app_info",
+    ]
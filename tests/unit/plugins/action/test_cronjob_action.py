@@ -0,0 +1,78 @@
+import pytest
+
+from plugins.action import cronjob as cronjob_action
+
+JOB = {
+    "id": 4,
+    "description": "nightly",
+    "command": "/usr/local/bin/backup",
+    "user": "root",
+    "enabled": True,
+    "schedule": {"minute": "0", "hour": "2", "dom": "*", "month": "*", "dow": "*"},
+}
+
+
+def test_noop_when_job_matches():
+    args = {
+        "name": "nightly",
+        "command": "/usr/local/bin/backup",
+        "enabled": "yes",
+        "schedule": {"minute": 0, "hour": "2"},
+    }
+
+    result = cronjob_action._noop_result(args, [JOB])
+
+    assert result["changed"] is False
+    assert result["message"] == "Cron job 'nightly' is up to date"
+    assert result["cronjob"] == JOB
+    assert result["diff"]["before"] == result["diff"]["after"]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"name": "nightly", "command": "/bin/false", "schedule": {"minute": "0", "hour": "2"}},
+        {"name": "nightly", "command": "/usr/local/bin/backup", "schedule": {"hour": "2"}},
+        {"name": "nightly", "command": "/usr/local/bin/backup", "schedule": {"secs": "1"}},
+        {"name": "nightly", "command": "/usr/local/bin/backup", "enabled": "maybe"},
+        {"name": "nightly", "state": "absent"},
+        {"name": "weekly", "command": "/usr/local/bin/backup"},
+    ],
+)
+def test_module_runs_when_anything_may_change(args):
+    assert cronjob_action._noop_result(args, [JOB]) is None
+
+
+def test_absent_job_is_a_noop():
+    result = cronjob_action._noop_result({"name": "weekly", "state": "absent"}, [JOB])
+
+    assert result["changed"] is False
+    assert result["cronjob"] is None
+
+
+def test_staggered_job_inside_its_window_is_a_noop():
+    args = {
+        "name": "nightly",
+        "command": "/usr/local/bin/backup",
+        "stagger": {"window": "01:00-03:00"},
+    }
+    result = cronjob_action._noop_result(args, [JOB])
+
+    assert result["changed"] is False
+    assert result["stagger"] == {"time": "02:00", "window": "01:00-03:00", "load": 0}
+    assert cronjob_action._noop_result(dict(args, stagger={"window": "03:00-04:00"}), [JOB]) is None
+
+
+def test_changed_job_is_patched_into_the_snapshot():
+    other = dict(JOB, id=5, description="weekly")
+    updated = dict(JOB, command="/bin/true")
+
+    jobs = cronjob_action._patched_jobs(
+        {"name": "nightly"}, [JOB, other], {"state": "present", "cronjob": updated}
+    )
+
+    assert jobs == [other, updated]
+    assert cronjob_action._patched_jobs(
+        {"name": "nightly"}, jobs, {"state": "absent", "cronjob": updated}
+    ) == [other]
+    assert cronjob_action._patched_jobs({"name": "nightly"}, jobs, {"state": "present"}) is None
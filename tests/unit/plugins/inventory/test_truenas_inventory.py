@@ -0,0 +1,79 @@
+import pytest
+from ansible.inventory.data import InventoryData
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+from plugins.inventory import truenas
+
+
+@pytest.fixture
+def fleet(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    with TruenasClient(uri="wss://nas1/api/current", api_key="key") as client:
+        client.create_app("redis", {"services": {}})
+        client.create_app("plex", {"services": {}})
+        client.stop_app("plex")
+        client.create_cronjob({"description": "nightly", "command": "/bin/true"})
+    with TruenasClient(uri="wss://nas2/api/current", api_key="key") as client:
+        client.create_app("redis", {"services": {}})
+
+
+def _plugin(**options):
+    plugin = truenas.InventoryModule()
+    plugin.inventory = InventoryData()
+    plugin._options = {
+        "nodes": [{"name": "nas1"}, {"name": "nas2", "ansible_host": "10.0.0.2"}],
+        "api_key": "key",
+        "username": None,
+        "password": None,
+        "verify_ssl": True,
+        "include_cronjobs": True,
+        "max_workers": 8,
+        "node_timeout": None,
+        "app_hostname": "{node}_{app}",
+        "strict": False,
+        "compose": {},
+        "groups": {},
+        "keyed_groups": [],
+    }
+    plugin._options.update(options)
+    return plugin
+
+
+def test_apps_become_hosts_grouped_by_node_and_state(fleet):
+    plugin = _plugin()
+    plugin._populate(plugin._query_nodes())
+    inventory = plugin.inventory
+
+    assert sorted(host.name for host in inventory.groups["truenas_apps"].get_hosts()) == [
+        "nas1_plex",
+        "nas1_redis",
+        "nas2_redis",
+    ]
+    assert [host.name for host in inventory.groups["truenas_app_state_stopped"].get_hosts()] == [
+        "nas1_plex"
+    ]
+    assert len(inventory.groups["truenas_node_nas1"].get_hosts()) == 2
+
+    redis = inventory.get_host("nas2_redis").vars
+    assert redis["ansible_host"] == "10.0.0.2"
+    assert redis["truenas_node"] == "nas2"
+    assert redis["truenas_app"]["name"] == "redis"
+    assert inventory.get_host("nas1").vars["truenas_cronjobs"][0]["description"] == "nightly"
+
+
+def test_unreachable_node_is_reported_without_failing(fleet):
+    plugin = _plugin(api_key=None)
+    plugin._options["nodes"][1]["api_key"] = "key"
+
+    results = plugin._query_nodes()
+    plugin._populate(results)
+
+    assert "error" in results["nas1"]
+    assert [host.name for host in plugin.inventory.groups["truenas_unreachable"].get_hosts()] == [
+        "nas1"
+    ]
+    assert "nas2_redis" in plugin.inventory.hosts
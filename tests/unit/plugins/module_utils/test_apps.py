@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import apps
+
+
+@pytest.fixture
+def deployed(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    application = {"name": "redis", "version": "1"}
+    path = apps.user_config_path(application)
+    path.parent.mkdir(parents=True)
+    path.write_text("services:\n  redis:\n    image: redis:alpine\n")
+    return application, path
+
+
+def test_compose_digest_is_key_order_independent():
+    first = {"services": {"a": {"image": "x", "ports": [1, 2]}}, "volumes": {}}
+    second = {"volumes": {}, "services": {"a": {"ports": [1, 2], "image": "x"}}}
+    assert apps.compose_digest(first) == apps.compose_digest(second)
+    assert apps.compose_digest(first) != apps.compose_digest({"services": {}})
+
+
+def test_compare_compose_skips_parse_when_digest_matches(monkeypatch, deployed):
+    application, _ = deployed
+    desired = {"services": {"redis": {"image": "redis:alpine"}}}
+
+    assert apps.compare_compose(application, desired) == (True, desired)
+
+    def fail_parse(_):
+        raise AssertionError("user_config.yaml should not be parsed")
+
+    monkeypatch.setattr(apps, "load_current_compose", fail_parse)
+    assert apps.compare_compose(application, desired) == (True, desired)
+
+
+def test_compare_compose_reparses_on_mismatch_or_file_change(deployed):
+    application, path = deployed
+    desired = {"services": {"redis": {"image": "redis:7"}}}
+
+    matches, current = apps.compare_compose(application, desired)
+    assert not matches
+    assert current["services"]["redis"]["image"] == "redis:alpine"
+
+    path.write_text("services:\n  redis:\n    image: redis:7\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert apps.compare_compose(application, desired) == (True, desired)
+
+
+def test_compare_compose_reports_missing_file(deployed):
+    application, path = deployed
+    path.unlink()
+    with pytest.raises(apps.ComposeReadError, match="Unable to read"):
+        apps.compare_compose(application, {})
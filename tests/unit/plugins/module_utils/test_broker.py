@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    broker,
+    stub,
+    truenas_client,
+)
+
+
+class EchoBackend:
+    def __init__(self):
+        self.closed = False
+
+    def call(self, method, *args, **kwargs):
+        if method == "fail":
+            raise ValueError("boom")
+        return {"method": method, "args": list(args), "job": kwargs.get("job", False)}
+
+    def close(self):
+        self.closed = True
+
+
+def _start_server(path, backend, idle=30.0):
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=broker.serve, args=(path, backend, idle), kwargs={"ready": ready.set}, daemon=True
+    )
+    thread.start()
+    assert ready.wait(5)
+    return thread
+
+
+@pytest.fixture
+def socket_dir(tmp_path):
+    directory = tmp_path / "broker"
+    directory.mkdir(mode=0o700)
+    return directory
+
+
+def test_socket_path_is_opt_in(monkeypatch):
+    monkeypatch.delenv("TRUENAS_CLIENT_BROKER", raising=False)
+    assert broker.broker_socket_path() is None
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER", "false")
+    assert broker.broker_socket_path() is None
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER", "true")
+    assert broker.broker_socket_path().endswith("broker.sock")
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER", "/run/custom.sock")
+    assert broker.broker_socket_path() == "/run/custom.sock"
+
+
+def test_broker_relays_calls_and_errors(socket_dir):
+    path = str(socket_dir / "broker.sock")
+    backend = EchoBackend()
+    _start_server(path, backend)
+
+    client = broker.BrokerClient(path)
+    try:
+        assert client.call("app.delete", "redis", job=True, callback=print) == {
+            "method": "app.delete",
+            "args": ["redis"],
+            "job": True,
+        }
+        with pytest.raises(broker.BrokerError) as captured:
+            client.call("fail")
+        assert str(captured.value) == "boom"
+        assert captured.value.error_type == "ValueError"
+    finally:
+        client.close()
+
+
+def test_broker_exits_when_idle(socket_dir):
+    path = str(socket_dir / "broker.sock")
+    backend = EchoBackend()
+    thread = _start_server(path, backend, idle=0.2)
+
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert backend.closed
+    assert not os.path.exists(path)
+
+
+def test_build_backend_falls_back_to_direct_connection(monkeypatch, tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER", str(shared / "broker.sock"))
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+
+    backend = truenas_client._build_backend()
+
+    assert isinstance(backend, stub.StubApiClient)
+
+
+def test_build_backend_spawns_and_reuses_broker(monkeypatch, tmp_path, socket_dir):
+    path = str(socket_dir / "broker.sock")
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER", path)
+    monkeypatch.setenv("TRUENAS_CLIENT_BROKER_IDLE", "2")
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+
+    with truenas_client.TruenasClient() as client:
+        assert isinstance(client._client._backend, broker.BrokerClient)
+        client.create_cronjob({"description": "nightly", "command": "/bin/true"})
+
+    with truenas_client.TruenasClient() as client:
+        assert isinstance(client._client._backend, broker.BrokerClient)
+        assert client.find_cronjob("nightly")["command"] == "/bin/true"
+
+    deadline = time.monotonic() + 10
+    while os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.2)
+    assert not os.path.exists(path)
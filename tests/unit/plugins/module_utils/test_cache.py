@@ -0,0 +1,35 @@
+import os
+import time
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cache
+
+
+def test_ttl_cache_round_trip_and_expiry(monkeypatch):
+    entry = cache.TTLCache("apps", 60)
+    assert entry.get() is None
+
+    assert entry.set([{"name": "redis"}], time.time())
+    assert entry.get() == [{"name": "redis"}]
+
+    assert entry.set([{"name": "redis"}], time.time() - 120)
+    assert entry.get() is None
+
+
+def test_ttl_cache_disabled_with_zero_ttl():
+    entry = cache.TTLCache("apps", 0)
+    assert entry.set([1], time.time()) is False
+    assert entry.get() is None
+
+
+def test_invalidate_discards_entries_fetched_before_mutation():
+    entry = cache.TTLCache("cronjobs", 60)
+    fetched_at = time.time()
+    entry.set([{"description": "nightly"}], fetched_at)
+
+    cache.invalidate("cronjobs")
+    os.utime(cache.cache_path("inventory", "cronjobs.invalidated"), (fetched_at, fetched_at))
+    assert entry.get() is None
+
+    entry.set([{"description": "nightly"}], fetched_at + 1)
+    assert entry.get() == [{"description": "nightly"}]
+    assert cache.TTLCache("apps", 60).get() is None
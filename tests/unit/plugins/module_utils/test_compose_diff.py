@@ -0,0 +1,100 @@
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import compose_diff
+
+
+def test_identical_documents_have_no_changes():
+    compose = {"services": {"web": {"image": "nginx", "ports": ["80:80"]}}}
+
+    assert compose_diff.compose_delta(compose, dict(compose)) == []
+
+
+def test_mapping_keys_are_added_removed_and_changed():
+    before = {"services": {"web": {"image": "nginx:1", "user": "root"}}}
+    after = {"services": {"web": {"image": "nginx:2"}, "cache": {"image": "redis"}}}
+
+    changes = compose_diff.compose_delta(before, after)
+
+    assert changes == [
+        {"path": ["services", "web", "user"], "op": "removed", "before": "root"},
+        {
+            "path": ["services", "web", "image"],
+            "op": "changed",
+            "before": "nginx:1",
+            "after": "nginx:2",
+        },
+        {"path": ["services", "cache"], "op": "added", "after": {"image": "redis"}},
+    ]
+
+
+def test_named_list_items_are_matched_by_identity():
+    before = {"volumes": [{"name": "data", "size": 1}, {"name": "logs", "size": 1}]}
+    after = {"volumes": [{"name": "logs", "size": 1}, {"name": "data", "size": 2}]}
+
+    changes = compose_diff.compose_delta(before, after)
+
+    assert changes == [
+        {"path": ["volumes", {"name": "data"}, "size"], "op": "changed", "before": 1, "after": 2},
+        {
+            "path": ["volumes"],
+            "op": "reordered",
+            "before": ["data", "logs"],
+            "after": ["logs", "data"],
+        },
+    ]
+
+
+def test_scalar_lists_are_reported_whole():
+    before = {"services": {"web": {"command": ["serve", "--port", "80"]}}}
+    after = {"services": {"web": {"command": ["serve", "--port", "8080"]}}}
+
+    changes = compose_diff.compose_delta(before, after)
+
+    assert [change["path"] for change in changes] == [["services", "web", "command"]]
+
+
+def test_missing_document_is_a_single_change():
+    changes = compose_diff.compose_delta(None, {"services": {}})
+
+    assert changes == [{"path": [], "op": "changed", "before": None, "after": {"services": {}}}]
+
+
+def test_build_diff_modes():
+    before = {"services": {"web": {"image": "nginx:1"}}, "x-old": True}
+    after = {"services": {"web": {"image": "nginx:2"}}}
+
+    full, changes = compose_diff.build_diff(before, after)
+    assert full == {"before": before, "after": after}
+    assert changes is None
+
+    minimal, changes = compose_diff.build_diff(before, after, "minimal")
+    assert minimal == {
+        "prepared": '- x-old: true\n~ services.web.image: "nginx:1" -> "nginx:2"\n'
+    }
+    assert len(changes) == 2
+
+
+def test_changed_services_groups_changes_by_service():
+    before = {
+        "services": {"db": {"image": "postgres:15"}, "api": {"image": "api:1"}, "old": {}},
+        "networks": {"backend": {}},
+    }
+    after = {
+        "services": {"db": {"image": "postgres:15"}, "api": {"image": "api:2"}, "proxy": {}},
+        "networks": {"backend": {"internal": True}},
+        "x-labels": {"team": "web"},
+    }
+
+    summary = compose_diff.changed_services(before, after)
+
+    assert summary == {
+        "added": ["proxy"],
+        "removed": ["old"],
+        "changed": ["api"],
+        "other": ["networks", "x-labels"],
+    }
+    assert compose_diff.affected_services(summary) == ["proxy", "api", "old"]
+
+
+def test_changed_services_of_a_new_application():
+    summary = compose_diff.changed_services(None, {"services": {"web": {}}})
+
+    assert summary == {"added": ["web"], "removed": [], "changed": [], "other": []}
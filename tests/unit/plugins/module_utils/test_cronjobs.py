@@ -1,3 +1,7 @@
+import datetime
+
+import pytest
+
 from ansible_collections.mareckii.truenas_scale.plugins.module_utils import cronjobs
 
 
@@ -47,3 +51,148 @@ def test_spec_diff_includes_before_and_after():
     assert diff["before"] is None
     assert diff["after"]["description"] == "nightly"
     assert diff["after"]["schedule"]["minute"] == "*"
+
+
+def _job(job_id, description, command="/bin/true", **schedule):
+    return {
+        "id": job_id,
+        "description": description,
+        "command": command,
+        "user": "root",
+        "enabled": True,
+        "schedule": dict({"minute": "*", "hour": "*", "dom": "*", "month": "*", "dow": "*"}, **schedule),
+    }
+
+
+def test_plan_cronjobs_only_writes_what_changed():
+    specs = [
+        cronjobs.CronJobSpec.from_module_params({"name": "same", "command": "/bin/true"}),
+        cronjobs.CronJobSpec.from_module_params({"name": "changed", "command": "/bin/false"}),
+        cronjobs.CronJobSpec.from_module_params({"name": "new", "command": "/bin/true"}),
+    ]
+    jobs = [_job(1, "same"), _job(2, "changed"), _job(3, "stale"), _job(4, "unlisted")]
+
+    plan = cronjobs.plan_cronjobs(specs, jobs, absent=["stale", "missing"])
+
+    assert [spec.name for spec in plan.create] == ["new"]
+    assert [(job["id"], spec.name) for job, spec in plan.update] == [(2, "changed")]
+    assert [job["id"] for job in plan.delete] == [3]
+    assert [job["id"] for job, _ in plan.unchanged] == [1]
+    assert plan.changed
+
+
+def test_plan_cronjobs_exclusive_prunes_unlisted_and_duplicates():
+    specs = [cronjobs.CronJobSpec.from_module_params({"name": "same", "command": "/bin/true"})]
+    jobs = [_job(1, "same"), _job(2, "same"), _job(3, "unlisted")]
+
+    plan = cronjobs.plan_cronjobs(specs, jobs, exclusive=True)
+
+    assert plan.create == [] and plan.update == []
+    assert [job["id"] for job in plan.delete] == [2, 3]
+
+
+def test_plan_cronjobs_noop_is_unchanged():
+    specs = [cronjobs.CronJobSpec.from_module_params({"name": "same", "command": "/bin/true"})]
+    plan = cronjobs.plan_cronjobs(specs, [_job(1, "same")], exclusive=True)
+    assert not plan.changed
+
+
+def test_parse_field_bitsets():
+    half_hours = cronjobs.parse_field("minute", "*/30")
+    assert cronjobs.parse_field("minute", "0,30") == half_hours == 1 | 1 << 30
+    assert cronjobs.parse_field("hour", "00") == 1
+    assert cronjobs.parse_field("dow", "5-7") == cronjobs.parse_field("dow", "fri,sat,sun")
+    assert cronjobs.parse_field("month", "*") == 0b1111111111110
+    assert cronjobs.parse_field("dom", "0") is None
+    assert cronjobs.parse_field("minute", "*/0") is None
+    assert cronjobs.parse_field("hour", "bogus") is None
+
+
+def test_schedule_matches_equivalent_spellings():
+    schedule = cronjobs.CronSchedule.from_mapping({"minute": "0,30", "hour": "02", "dow": "1-5"})
+    assert schedule.matches({"minute": "*/30", "hour": "2", "dow": "mon-fri"})
+    assert not schedule.matches({"minute": "*/15", "hour": "2", "dow": "mon-fri"})
+    # Restricting both day fields means "either", so dom=* is not the same as dom=1-31.
+    assert not cronjobs.CronSchedule(dom="1-31", dow="1").matches({"dow": "1"})
+    # Unparseable values still compare as strings.
+    assert cronjobs.CronSchedule(minute="@daily").matches({"minute": "@daily"})
+
+
+def test_next_run():
+    after = datetime.datetime(2026, 10, 17, 2, 0, 30)
+    nightly = cronjobs.CronSchedule(minute="0", hour="2")
+    assert nightly.next_run(after) == datetime.datetime(2026, 10, 18, 2, 0)
+    quarterly = cronjobs.CronSchedule(minute="*/15")
+    assert quarterly.next_run(after) == datetime.datetime(2026, 10, 17, 2, 15)
+    # The 13th or any Friday.
+    either = cronjobs.CronSchedule(minute="0", hour="0", dom="13", dow="fri")
+    assert either.next_run(after) == datetime.datetime(2026, 10, 23, 0, 0)
+    leap = cronjobs.CronSchedule(minute="0", hour="0", dom="29", month="feb")
+    assert leap.next_run(after) == datetime.datetime(2028, 2, 29, 0, 0)
+    assert cronjobs.CronSchedule(dom="30", month="2").next_run(after) is None
+
+
+def test_minute_histogram_and_busiest_minutes():
+    schedules = [cronjobs.CronSchedule(minute="0", hour="2")] * 3 + [
+        cronjobs.CronSchedule(minute="*/30", hour="1-2"),
+        cronjobs.CronSchedule(minute="0", hour="3", dow="sun"),
+        cronjobs.CronSchedule(minute="bogus"),
+    ]
+    histogram = cronjobs.minute_histogram(schedules)
+    assert len(histogram) == 24 * 60 and sum(histogram) == 3 + 4 + 1
+    assert cronjobs.busiest_minutes(histogram, 3) == [(120, 4), (60, 1), (90, 1)]
+
+    saturday = cronjobs.minute_histogram(schedules, day=datetime.date(2026, 10, 17))
+    assert saturday[180] == 0 and saturday[120] == 4
+
+
+def test_parse_window():
+    assert cronjobs.parse_window("02:00-02:02") == [120, 121, 122]
+    assert cronjobs.parse_window("23:59-00:01") == [1439, 0, 1]
+    for window in ("2-3", "24:00-01:00", "01:60-02:00"):
+        with pytest.raises(ValueError):
+            cronjobs.parse_window(window)
+
+
+def test_stagger_slot_prefers_idle_minutes_and_spreads_keys():
+    histogram = [0] * (24 * 60)
+    histogram[120] = 3
+    assert cronjobs.stagger_slot("backup", histogram, "02:00-02:00") == 120
+    assert cronjobs.stagger_slot("backup", histogram, "02:00-02:01") == 121
+    picks = {
+        cronjobs.stagger_slot("job {}".format(index), histogram, "01:00-05:00") for index in range(20)
+    }
+    assert len(picks) > 10 and 120 not in picks
+    assert cronjobs.stagger_slot("backup", histogram, "01:00-05:00") == cronjobs.stagger_slot(
+        "backup", list(histogram), "01:00-05:00"
+    )
+
+
+def test_stagger_schedule_keeps_existing_time_and_handles_many_jobs():
+    jobs = [_job(index, "job {}".format(index), minute="0", hour="2") for index in range(5000)]
+    jobs.append(_job(9999, "scrub", minute="30", hour="3", dow="sun"))
+    schedule = cronjobs.CronSchedule(dow="0")
+
+    kept, load = cronjobs.stagger_schedule(schedule, "scrub", jobs, "01:00-05:00", name="scrub")
+    assert (kept.minute, kept.hour, kept.dow, load) == ("30", "3", "0", 0)
+
+    moved, load = cronjobs.stagger_schedule(schedule, "scrub", jobs, "02:00-02:00", name="scrub")
+    assert (moved.minute, moved.hour, load) == ("0", "2", 5000)
+
+    # A different day schedule is a new placement, never the busy 02:00.
+    placed, _ = cronjobs.stagger_schedule(
+        cronjobs.CronSchedule(dow="6"), "scrub", jobs, "01:00-05:00", name="scrub"
+    )
+    assert (placed.hour, placed.minute) != ("2", "0")
+
+
+def test_apply_stagger():
+    params = {"name": "scrub", "schedule": {"dow": "sun"}, "stagger": {"window": "01:00-01:00"}}
+    resolved, summary = cronjobs.apply_stagger(params, [])
+    assert resolved["schedule"] == dict(
+        {"minute": "0", "hour": "1", "dom": "*", "month": "*"}, dow="sun"
+    )
+    assert summary == {"time": "01:00", "window": "01:00-01:00", "load": 0}
+    assert cronjobs.apply_stagger({"name": "scrub"}, []) == ({"name": "scrub"}, None)
+    with pytest.raises(ValueError):
+        cronjobs.apply_stagger(dict(params, schedule={"hour": "4"}), [])
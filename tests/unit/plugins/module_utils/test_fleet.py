@@ -0,0 +1,90 @@
+import threading
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import fleet
+
+
+class FakeClient:
+    def __init__(self, node):
+        self.node = node
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@dataclass(frozen=True)
+class FakeNode(fleet.Node):
+    """Node whose connection takes ``delay`` seconds and tracks concurrency."""
+
+    delay: float = 0.0
+    broken: bool = False
+    tracker = None
+
+    def connect(self):
+        tracker = type(self).tracker
+        with tracker["lock"]:
+            tracker["active"] += 1
+            tracker["peak"] = max(tracker["peak"], tracker["active"])
+        try:
+            time.sleep(self.delay)
+            if self.broken:
+                raise ConnectionRefusedError("refused")
+        finally:
+            with tracker["lock"]:
+                tracker["active"] -= 1
+        return FakeClient(self.name)
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    state = {"lock": threading.Lock(), "active": 0, "peak": 0}
+    monkeypatch.setattr(FakeNode, "tracker", state)
+    return state
+
+
+def _node(name, delay=0.0, broken=False):
+    return FakeNode(name=name, uri="wss://{}".format(name), delay=delay, broken=broken)
+
+
+def test_results_are_aggregated_in_node_order(tracker):
+    nodes = [_node("nas{}".format(index), delay=0.02) for index in range(6)] + [
+        _node("down", broken=True)
+    ]
+
+    results = fleet.run_on_nodes(nodes, lambda client: client.node.upper(), max_workers=3)
+
+    assert [result.node for result in results] == [node.name for node in nodes]
+    assert [result.result for result in results[:6]] == ["NAS{}".format(i) for i in range(6)]
+    assert results[-1].ok is False
+    assert results[-1].error == "ConnectionRefusedError: refused"
+    assert tracker["peak"] <= 3
+
+
+def test_slow_node_times_out_without_holding_the_others(tracker):
+    nodes = [_node("slow", delay=5), _node("a"), _node("b")]
+
+    started = time.monotonic()
+    results = fleet.run_on_nodes(nodes, lambda client: "ok", max_workers=1, timeout=0.2)
+
+    assert time.monotonic() - started < 2
+    assert results[0].ok is False
+    assert results[0].error == "Timed out after 0.2s"
+    assert [result.result for result in results[1:]] == ["ok", "ok"]
+
+
+def test_node_defaults_and_validation():
+    node = fleet.Node.from_dict({"name": "nas1", "api_key": "own"}, {"api_key": "shared"})
+    assert node.uri == "wss://nas1/api/current"
+    assert node.api_key == "own"
+    assert node.verify_ssl is True
+
+    with pytest.raises(ValueError):
+        fleet.Node.from_dict({"uri": "wss://nas1"})
+    with pytest.raises(ValueError):
+        fleet.run_on_nodes([node, node], lambda client: None)
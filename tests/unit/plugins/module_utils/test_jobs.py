@@ -0,0 +1,170 @@
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import jobs
+
+
+class FakeMiddleware:
+    """Jobs finish after ``rounds`` polls; ``fail`` names keys whose job fails."""
+
+    def __init__(self, rounds=1, fail=()):
+        self.rounds = rounds
+        self.fail = set(fail)
+        self.jobs = {}
+        self.submitted = []
+        self.max_in_flight = 0
+
+    def submit(self, key):
+        job_id = len(self.submitted) + 1
+        self.submitted.append(key)
+        self.jobs[job_id] = {"key": key, "polls": 0}
+        return job_id
+
+    def fetch(self, job_ids):
+        self.max_in_flight = max(self.max_in_flight, len(job_ids))
+        records = []
+        for job_id in job_ids:
+            job = self.jobs[job_id]
+            job["polls"] += 1
+            if job["polls"] < self.rounds:
+                records.append({"id": job_id, "state": "RUNNING", "progress": {"percent": 50}})
+            elif job["key"] in self.fail:
+                records.append({"id": job_id, "state": "FAILED", "error": "boom"})
+            else:
+                records.append({"id": job_id, "state": "SUCCESS", "result": job["key"]})
+        return records
+
+
+def _request(middleware, key, *steps):
+    steps = steps or (key,)
+    return jobs.JobRequest(key=key, steps=[lambda step=step: middleware.submit(step) for step in steps])
+
+
+def test_run_jobs_respects_concurrency_limit():
+    middleware = FakeMiddleware(rounds=2)
+    requests = [_request(middleware, "app{}".format(index)) for index in range(7)]
+
+    outcomes = jobs.run_jobs(requests, middleware.fetch, concurrency=3, sleep=lambda _: None)
+
+    assert [outcome.state for outcome in outcomes] == ["SUCCESS"] * 7
+    assert [outcome.result for outcome in outcomes] == ["app{}".format(index) for index in range(7)]
+    assert middleware.max_in_flight == 3
+
+
+def test_run_jobs_runs_steps_in_order_and_reports_failures():
+    middleware = FakeMiddleware(fail=["broken"])
+    requests = [_request(middleware, "restart", "stop", "start"), _request(middleware, "broken")]
+
+    outcomes = jobs.run_jobs(requests, middleware.fetch, sleep=lambda _: None)
+
+    assert middleware.submitted.index("stop") < middleware.submitted.index("start")
+    assert outcomes[0].ok and len(outcomes[0].job_ids) == 2
+    assert outcomes[1].state == "FAILED"
+    assert outcomes[1].error == "boom"
+
+
+def test_run_jobs_submission_errors_do_not_stop_other_jobs():
+    middleware = FakeMiddleware()
+
+    def broken():
+        raise ValueError("Application 'ghost' not found")
+
+    requests = [jobs.JobRequest(key="ghost", steps=[broken]), _request(middleware, "ok")]
+    outcomes = jobs.run_jobs(requests, middleware.fetch, sleep=lambda _: None)
+
+    assert outcomes[0].state == "FAILED" and "not found" in outcomes[0].error
+    assert outcomes[1].ok
+
+
+def test_run_jobs_times_out_and_reports_progress():
+    middleware = FakeMiddleware(rounds=100)
+    now = [0.0]
+    progress = []
+    requests = [_request(middleware, "slow"), _request(middleware, "queued")]
+
+    outcomes = jobs.run_jobs(
+        requests,
+        middleware.fetch,
+        concurrency=1,
+        timeout=5,
+        poll_interval=1,
+        on_progress=lambda outcome: progress.append((outcome.key, outcome.progress)),
+        clock=lambda: now[0],
+        sleep=lambda seconds: now.__setitem__(0, now[0] + seconds),
+    )
+
+    assert outcomes[0].state == jobs.TIMEOUT
+    assert outcomes[1].state == jobs.NOT_STARTED
+    assert progress == [("slow", {"percent": 50})]
+
+
+def test_poll_jobs_fetches_only_unfinished_jobs_until_done():
+    middleware = FakeMiddleware(rounds=3)
+    job_ids = [middleware.submit("a"), middleware.submit("b")]
+    middleware.jobs[job_ids[1]]["polls"] = 2
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(list(ids))
+        return middleware.fetch(ids)
+
+    records = jobs.poll_jobs(job_ids, fetch, wait=True, sleep=lambda seconds: None)
+
+    assert fetched == [[1, 2], [1], [1]]
+    assert {job_id: record["state"] for job_id, record in records.items()} == {
+        1: "SUCCESS",
+        2: "SUCCESS",
+    }
+
+
+def test_poll_jobs_without_wait_is_a_single_query():
+    middleware = FakeMiddleware(rounds=3)
+    job_id = middleware.submit("a")
+
+    records = jobs.poll_jobs([job_id], middleware.fetch, sleep=lambda seconds: None)
+
+    assert records[job_id]["state"] == "RUNNING"
+
+
+def test_run_jobs_never_sleeps_past_the_deadline():
+    middleware = FakeMiddleware(rounds=3)
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    outcomes = jobs.run_jobs(
+        [_request(middleware, "slow")],
+        middleware.fetch,
+        timeout=1.5,
+        poll_interval=1,
+        clock=lambda: now[0],
+        sleep=sleep,
+    )
+
+    # The job would be seen finished on the third poll, at 2s.
+    assert sleeps == [1, 0.5]
+    assert outcomes[0].state == jobs.TIMEOUT
+
+
+def test_poll_jobs_never_sleeps_past_the_deadline():
+    middleware = FakeMiddleware(rounds=3)
+    job_id = middleware.submit("a")
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    records = jobs.poll_jobs(
+        [job_id],
+        middleware.fetch,
+        wait=True,
+        timeout=1.5,
+        poll_interval=1,
+        clock=lambda: now[0],
+        sleep=sleep,
+    )
+
+    assert sleeps == [1, 0.5]
+    assert records[job_id]["state"] == "RUNNING"
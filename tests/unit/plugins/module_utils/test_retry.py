@@ -0,0 +1,82 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    retry,
+    stub,
+    truenas_client,
+)
+
+
+@pytest.fixture(autouse=True)
+def stub_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    monkeypatch.setenv("TRUENAS_CLIENT_RETRY_BACKOFF", "0")
+    monkeypatch.setattr(stub, "_injected", {})
+
+
+def test_idempotent_calls_are_retried_after_a_dropped_connection(monkeypatch):
+    monkeypatch.setenv("TRUENAS_STUB_FAILURES", "connect=1,app.query=2:busy")
+
+    with truenas_client.TruenasClient() as client:
+        assert client.list_applications() == []
+
+
+def test_retries_stop_after_max_attempts(monkeypatch):
+    monkeypatch.setenv("TRUENAS_STUB_FAILURES", "cronjob.query=3:timeout")
+    monkeypatch.setenv("TRUENAS_CLIENT_RETRIES", "3")
+
+    with truenas_client.TruenasClient() as client:
+        with pytest.raises(TimeoutError):
+            client.list_cronjobs()
+        assert client.list_cronjobs() == []
+
+
+def test_mutations_are_not_retried(monkeypatch):
+    monkeypatch.setenv("TRUENAS_STUB_FAILURES", "cronjob.create=1")
+
+    with truenas_client.TruenasClient() as client:
+        with pytest.raises(ConnectionResetError):
+            client.create_cronjob({"description": "nightly", "command": "/bin/true"})
+        assert client.list_cronjobs() == []
+
+
+def test_breaker_fails_fast_across_clients_until_reset(monkeypatch):
+    monkeypatch.setenv("TRUENAS_STUB_FAILURES", "app.query=2")
+    monkeypatch.setenv("TRUENAS_CLIENT_RETRIES", "1")
+    monkeypatch.setenv("TRUENAS_CLIENT_BREAKER_THRESHOLD", "2")
+
+    with truenas_client.TruenasClient() as client:
+        for _ in range(2):
+            with pytest.raises(ConnectionResetError):
+                client.list_applications()
+        with pytest.raises(retry.CircuitOpenError):
+            client.list_applications()
+    with pytest.raises(retry.CircuitOpenError):
+        truenas_client.TruenasClient()
+
+    monkeypatch.setenv("TRUENAS_CLIENT_BREAKER_RESET", "0")
+    with truenas_client.TruenasClient() as client:
+        assert client.list_applications() == []
+    assert retry.CircuitBreaker("local").failures == 0
+
+
+def test_application_errors_are_not_transient():
+    busy = stub.StubBusyError("busy")
+
+    assert retry.is_transient(busy)
+    assert retry.is_transient(ConnectionRefusedError())
+    assert not retry.is_transient(ValueError("bad filter"))
+    assert not retry.is_transient(PermissionError("Authentication failed"))
+    assert not retry.is_transient(retry.CircuitOpenError("open"))
+
+
+def test_backoff_is_bounded_and_method_allowlist_is_extendable(monkeypatch):
+    monkeypatch.setenv("TRUENAS_CLIENT_RETRY_METHODS", "pool.scrub.run")
+    policy = retry.RetryPolicy.from_env()
+
+    assert policy.allows("app.query")
+    assert policy.allows("pool.scrub.run")
+    assert not policy.allows("app.update")
+    assert all(0 <= policy.delay(attempt) <= policy.max_backoff for attempt in range(1, 10))
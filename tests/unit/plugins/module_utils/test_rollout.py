@@ -0,0 +1,56 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import rollout
+
+
+def test_plan_waves_layers_by_dependency_depth():
+    dependencies = {
+        "proxy": ["api"],
+        "api": ["db", "cache"],
+        "cache": [],
+        "db": [],
+        "metrics": [],
+    }
+    assert rollout.plan_waves(dependencies) == [["cache", "db", "metrics"], ["api"], ["proxy"]]
+    assert rollout.plan_waves({}) == []
+
+
+def test_plan_waves_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(rollout.DependencyError, match="Unknown dependencies: ghost"):
+        rollout.plan_waves({"api": ["ghost"]})
+    with pytest.raises(rollout.DependencyError, match="cycle between: a, b$"):
+        rollout.plan_waves({"a": ["b"], "b": ["a"], "c": ["a"], "d": []})
+    with pytest.raises(rollout.DependencyError, match="cycle between: a$"):
+        rollout.plan_waves({"a": ["a"]})
+
+
+def test_roll_out_skips_dependents_of_failed_apps():
+    dependencies = {"db": [], "cache": [], "api": ["db"], "proxy": ["api"], "worker": ["cache"]}
+    calls = []
+
+    def run_wave(names, seconds_left):
+        calls.append(list(names))
+        return {"db": "boom"} if "db" in names else {}
+
+    failed, skipped = rollout.roll_out(rollout.plan_waves(dependencies), dependencies, run_wave)
+
+    assert calls == [["db", "cache"], ["worker"]]
+    assert failed == {"db": "boom"}
+    assert skipped == {"api": "Skipped because db failed", "proxy": "Skipped because api failed"}
+
+
+def test_roll_out_passes_remaining_time_and_stops_at_the_timeout():
+    now = [0.0]
+    seen = []
+
+    def run_wave(names, seconds_left):
+        seen.append(seconds_left)
+        now[0] += 6
+        return {}
+
+    waves = [["a"], ["b"], ["c"]]
+    failed, skipped = rollout.roll_out(waves, {}, run_wave, timeout=10, clock=lambda: now[0])
+
+    assert seen == [10, 4]
+    assert failed == {}
+    assert skipped == {"c": "Not started before the timeout expired"}
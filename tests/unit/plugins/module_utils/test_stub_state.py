@@ -0,0 +1,89 @@
+import multiprocessing
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    stub_state,
+    truenas_client,
+)
+
+
+@pytest.fixture(params=stub_state.STORE_BACKENDS)
+def stub_env(request, monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_STORE", request.param)
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    return request.param
+
+
+def _create_cronjobs(worker, count):
+    with truenas_client.TruenasClient() as client:
+        for index in range(count):
+            client.create_cronjob(
+                {"description": "job-{}-{}".format(worker, index), "command": "/bin/true"}
+            )
+
+
+def test_concurrent_writers_do_not_lose_updates(stub_env):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_create_cronjobs, args=(worker, 10)) for worker in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    with truenas_client.TruenasClient() as client:
+        jobs = client.list_cronjobs()
+    assert len(jobs) == 60
+    assert sorted(job["id"] for job in jobs) == list(range(1, 61))
+
+
+def test_cached_state_is_revalidated_after_foreign_writes(stub_env, tmp_path):
+    reader = stub_state.open_store(str(tmp_path / "stub"))
+    writer = stub_state.open_store(str(tmp_path / "stub"))
+    assert reader.load()["apps"] == []
+
+    with writer.transaction() as state:
+        state["apps"].append({"name": "redis"})
+
+    assert reader.load()["apps"] == [{"name": "redis"}]
+    assert reader.load() is reader.load()
+    reader.close()
+    writer.close()
+
+
+def test_failed_transaction_is_not_persisted(stub_env, tmp_path):
+    store = stub_state.open_store(str(tmp_path / "stub"))
+    with pytest.raises(ValueError):
+        with store.transaction() as state:
+            state["apps"].append({"name": "half-created"})
+            raise ValueError("boom")
+
+    assert store.load()["apps"] == []
+    store.close()
+
+
+def test_query_results_do_not_alias_cached_state(stub_env):
+    with truenas_client.TruenasClient() as client:
+        client.create_cronjob({"description": "nightly", "schedule": {"hour": "2"}})
+        client.list_cronjobs()[0]["schedule"]["hour"] = "5"
+
+        assert client.find_cronjob("nightly")["schedule"] == {"hour": "2"}
+
+
+def test_sqlite_store_does_not_open_the_json_state_file(monkeypatch, tmp_path):
+    state_path = tmp_path / "truenas_stub_state.json"
+    state_path.write_text('{"apps": []}')
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_STORE", "sqlite")
+    monkeypatch.setenv("TRUENAS_STUB_STATE", str(state_path))
+    monkeypatch.delenv("TRUENAS_STUB_WORKSPACE", raising=False)
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+
+    with truenas_client.TruenasClient() as client:
+        client.create_cronjob({"description": "nightly", "command": "/bin/true"})
+
+    assert (tmp_path / "truenas_stub_state.sqlite").exists()
+    assert state_path.read_text() == '{"apps": []}'
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import (
+    tracing,
+    truenas_client,
+)
+
+
+@pytest.fixture
+def traced_stub(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    monkeypatch.setenv("TRUENAS_CLIENT_TRACE", "1")
+    monkeypatch.setenv("TRUENAS_CLIENT_TRACE_FILE", str(tmp_path / "trace.jsonl"))
+    return tmp_path / "trace.jsonl"
+
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("TRUENAS_CLIENT_TRACE", raising=False)
+    backend = object()
+
+    assert tracing.wrap_backend(backend) is backend
+
+
+def test_tracer_records_calls_jobs_and_phases(traced_stub):
+    with truenas_client.TruenasClient() as client:
+        client.create_app("redis", {"services": {}})
+        client.find_application("redis")
+        client.run_jobs([client.app_job_request("stop", "redis")], poll_interval=0)
+
+    summary = tracing.get_tracer().summary()
+    assert summary["methods"]["app.create"]["count"] == 1
+    assert summary["methods"]["app.query"]["bytes"] > 0
+    assert summary["phases"]["job_wait"]["count"] == 1
+    assert summary["job_wait"] >= summary["methods"]["app.create"]["seconds"]
+    assert summary["calls"] == sum(stats["count"] for stats in summary["methods"].values())
+
+    events = [json.loads(line) for line in traced_stub.read_text().splitlines()]
+    assert events[0]["method"] == "app.create"
+    assert events[0]["job"] is True
+    assert {"phase": "job_wait"}.items() <= events[-1].items()
+
+
+def test_attach_adds_timings_to_module_results(traced_stub):
+    class Module:
+        def exit_json(self, **kwargs):
+            return kwargs
+
+        def fail_json(self, **kwargs):
+            return kwargs
+
+    module = Module()
+    tracing.attach(module)
+
+    assert "_timings" in module.exit_json(changed=False)
+    assert module.fail_json(msg="boom")["_timings"]["calls"] == 0
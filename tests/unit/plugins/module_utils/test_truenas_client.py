@@ -0,0 +1,265 @@
+import time
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import stub, truenas_client
+
+
+@pytest.fixture
+def stub_client(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
+    with truenas_client.TruenasClient() as client:
+        yield client
+
+
+class RecordingBackend:
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def call(self, method, *args, **kwargs):
+        self.calls.append((method, args, kwargs))
+        return self.response
+
+    def close(self):
+        return None
+
+
+def test_find_application_sends_server_side_filter(monkeypatch):
+    backend = RecordingBackend([{"name": "redis", "custom_app": True}])
+    monkeypatch.setattr(truenas_client, "_build_backend", lambda: backend)
+
+    with truenas_client.TruenasClient() as client:
+        app = client.find_application("redis")
+
+    assert app == {"name": "redis", "custom_app": True}
+    method, args, _ = backend.calls[0]
+    assert method == "app.query"
+    assert args[0] == [["name", "=", "redis"]]
+    assert args[1]["select"] == truenas_client.APP_QUERY_FIELDS
+
+
+def test_find_cronjob_sends_server_side_filter(monkeypatch):
+    backend = RecordingBackend([])
+    monkeypatch.setattr(truenas_client, "_build_backend", lambda: backend)
+
+    with truenas_client.TruenasClient() as client:
+        assert client.find_cronjob("nightly") is None
+
+    method, args, _ = backend.calls[0]
+    assert method == "cronjob.query"
+    assert args[0] == [["description", "=", "nightly"]]
+    assert args[1] == {"select": truenas_client.CRONJOB_QUERY_FIELDS, "limit": 1}
+
+
+def test_stub_lookups_filter_by_name(stub_client):
+    stub_client.create_app("redis", {"services": {"redis": {"image": "redis:alpine"}}})
+    stub_client.create_app("nginx", {"services": {"nginx": {"image": "nginx"}}})
+
+    app = stub_client.find_application("nginx")
+    assert app["name"] == "nginx"
+    assert set(app) <= set(truenas_client.APP_QUERY_FIELDS)
+    assert stub_client.find_application("missing") is None
+
+    stub_client.create_cronjob({"description": "nightly", "command": "/bin/true"})
+    assert stub_client.find_cronjob("nightly")["command"] == "/bin/true"
+    assert stub_client.find_cronjob("weekly") is None
+
+
+def test_filter_records_supports_query_options():
+    records = [
+        {"id": 1, "name": "alpha", "schedule": {"hour": "2"}},
+        {"id": 2, "name": "beta", "schedule": {"hour": "3"}},
+        {"id": 3, "name": "gamma", "schedule": {"hour": "2"}},
+    ]
+    filter_records = stub._filter_records
+
+    assert [r["id"] for r in filter_records(records, [["schedule.hour", "=", "2"]])] == [1, 3]
+    assert [r["id"] for r in filter_records(records, [["id", "in", [2, 3]]])] == [2, 3]
+    assert [r["id"] for r in filter_records(records, [["name", "^", "g"]])] == [3]
+    assert [
+        r["id"] for r in filter_records(records, [["OR", [["id", "=", 1], ["name", "=", "beta"]]]])
+    ] == [1, 2]
+    assert filter_records(records, [], {"select": ["name"], "limit": 1}) == [{"name": "alpha"}]
+    assert filter_records(records, [], {"order_by": ["-id"], "offset": 1})[0]["id"] == 2
+    assert filter_records(records, [["id", ">", 1]], {"count": True}) == 2
+    assert filter_records(records, [["id", "=", 2]], {"get": True})["name"] == "beta"
+    with pytest.raises(ValueError):
+        filter_records(records, [["id", "=", 9]], {"get": True})
+
+
+def test_stub_jobs_run_concurrently_with_latency(monkeypatch, stub_client):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "0.2")
+    requests = [
+        stub_client.app_job_request("create", "app{}".format(index), {"services": {}})
+        for index in range(4)
+    ]
+
+    outcomes = stub_client.run_jobs(requests, concurrency=4, poll_interval=0.05)
+
+    assert [outcome.state for outcome in outcomes] == ["SUCCESS"] * 4
+    assert outcomes[0].result["name"] == "app0"
+    assert len(stub_client.list_applications()) == 4
+
+
+def test_stub_submit_returns_job_id_and_tracks_progress(monkeypatch, stub_client):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "60")
+    job_id = stub_client.submit_app_job("create", "redis", {"services": {}})
+
+    (job,) = stub_client.get_jobs([job_id])
+    assert job["state"] == "RUNNING"
+    assert 0 <= job["progress"]["percent"] < 100
+
+    failed_id = stub_client.submit_app_job("delete", "missing")
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "0")
+    outcomes = stub_client.run_jobs([stub_client.app_job_request("stop", "missing")])
+    assert outcomes[0].state == "FAILED"
+    assert stub_client.get_jobs([failed_id])[0]["method"] == "app.delete"
+
+
+def test_restart_app_uses_native_redeploy(stub_client):
+    stub_client.create_app("redis", {"services": {}})
+
+    outcome = stub_client.restart_app("redis")
+
+    assert outcome.ok
+    (job,) = stub_client.get_jobs(outcome.job_ids)
+    assert job["method"] == "app.redeploy"
+
+
+def test_restart_app_falls_back_to_stop_start(monkeypatch, stub_client):
+    monkeypatch.setenv("TRUENAS_STUB_DISABLED_METHODS", "app.redeploy")
+    stub_client.create_app("redis", {"services": {}})
+
+    outcome = stub_client.restart_app("redis")
+
+    assert outcome.ok
+    assert [job["method"] for job in stub_client.get_jobs(outcome.job_ids)] == [
+        "app.stop",
+        "app.start",
+    ]
+
+
+def test_restart_app_without_waiting_returns_running_job(monkeypatch, stub_client):
+    stub_client.create_app("redis", {"services": {}})
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "60")
+
+    outcome = stub_client.restart_app("redis", wait=False)
+
+    assert outcome.state == "RUNNING"
+    assert stub_client.get_jobs([outcome.job_id])[0]["state"] == "RUNNING"
+
+
+def test_snapshot_serves_lookups_until_a_mutation(monkeypatch, stub_client):
+    stub_client.create_app("redis", {"services": {"redis": {"image": "redis:7"}}})
+    stub_client.create_cronjob({"description": "nightly", "schedule": {"hour": "2"}})
+    stub_client.create_cronjob({"description": "weekly", "command": "/bin/true"})
+    monkeypatch.setenv("TRUENAS_CLIENT_SNAPSHOT_TTL", "300")
+    calls = []
+
+    def counting_backend():
+        backend = stub.StubApiClient()
+        original = backend.call
+
+        def call(method, *args, **kwargs):
+            calls.append(method)
+            return original(method, *args, **kwargs)
+
+        backend.call = call
+        return backend
+
+    monkeypatch.setattr(truenas_client, "_build_backend", counting_backend)
+
+    for _ in range(2):
+        with truenas_client.TruenasClient() as client:
+            assert client.find_application("redis")["name"] == "redis"
+            assert client.find_application("nginx") is None
+            assert client.find_cronjob("nightly")["schedule"] == {"hour": "2"}
+            assert len(client.list_cronjobs()) == 2
+    assert calls == ["app.query", "cronjob.query"]
+
+    with truenas_client.TruenasClient() as client:
+        client.create_app("nginx", {"services": {"nginx": {"image": "nginx"}}})
+        assert client.find_application("nginx")["name"] == "nginx"
+        assert [app["name"] for app in client.list_applications(["nginx"])] == ["nginx"]
+    assert calls.count("app.query") == 2
+
+
+@pytest.mark.parametrize("value", ["5m", "", "0"])
+def test_snapshot_is_disabled_by_an_unusable_ttl(monkeypatch, stub_client, value):
+    monkeypatch.setenv("TRUENAS_CLIENT_SNAPSHOT_TTL", value)
+
+    with truenas_client.TruenasClient() as client:
+        assert client._snapshot_ttl == 0
+        assert client.find_application("redis") is None
+
+
+def test_wait_for_apps_reports_last_state(stub_client):
+    stub_client.create_app("redis", {"services": {}})
+    stub_client.stop_app("redis")
+
+    assert stub_client.wait_for_apps(["redis", "ghost"], state="STOPPED") == {
+        "redis": "STOPPED",
+        "ghost": None,
+    }
+    assert stub_client.wait_for_apps(["redis"], timeout=0) == {"redis": "STOPPED"}
+    # A stopped app does not start on its own, so it ends the wait.
+    assert stub_client.wait_for_apps(["redis"]) == {"redis": "STOPPED"}
+
+
+@pytest.mark.parametrize("events", [True, False])
+def test_wait_for_apps_follows_state_transitions(monkeypatch, stub_client, events):
+    if not events:
+        monkeypatch.setenv("TRUENAS_STUB_DISABLED_METHODS", "core.subscribe")
+    monkeypatch.setenv("TRUENAS_STUB_APP_LATENCY", "0.3")
+    stub_client.create_app("redis", {"services": {}})
+    looks = []
+    app_states = stub_client.app_states
+    monkeypatch.setattr(
+        stub_client, "app_states", lambda names: looks.append(names) or app_states(names)
+    )
+
+    states = stub_client.wait_for_apps(
+        ["redis"], timeout=10, poll_interval=0.01, max_poll_interval=5
+    )
+
+    assert states == {"redis": "RUNNING"}
+    if events:
+        # One look before the transition and one after its event.
+        assert len(looks) == 2
+    else:
+        # Backing off 0.01, 0.02, 0.04, ... reaches 0.3s within a handful of polls.
+        assert 3 <= len(looks) <= 8
+
+
+def test_stub_emits_app_events(monkeypatch, stub_client):
+    monkeypatch.setenv("TRUENAS_STUB_APP_LATENCY", "0.1")
+    events = []
+    backend = stub.StubApiClient()
+    ident = backend.subscribe(
+        "app.query", lambda kind, **message: events.append((kind, message["id"]))
+    )
+    try:
+        stub_client.create_app("redis", {"services": {}})
+        stub_client.delete_app("redis")
+        stub_client.create_app("web", {"services": {}})
+        deadline = time.monotonic() + 5
+        while ("CHANGED", "web") not in events and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        backend.unsubscribe(ident)
+        backend.close()
+    assert ("ADDED", "web") in events and ("CHANGED", "web") in events
+
+
+def test_app_job_slower_than_its_timeout_times_out(monkeypatch, stub_client):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "0.2")
+    stub_client.create_app("redis", {"services": {}})
+
+    started = time.monotonic()
+    outcome = stub_client.run_app_job("update", "redis", {"services": {}}, wait=True, timeout=0.05)
+
+    assert outcome.state == "TIMEOUT"
+    assert time.monotonic() - started < 0.2
@@ -0,0 +1,53 @@
+import textwrap
+
+import pytest
+import yaml
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import yamlutils
+
+DOCUMENT = textwrap.dedent(
+    """
+    services:
+      web:
+        image: nginx:1.25
+        ports: ["8080:80", 443]
+        environment:
+          ENABLED: yes
+          EMPTY: ~
+          RATIO: 0.5
+          OCTAL: 0o17
+          DATE: 2024-01-02
+        command: >
+          sh -c 'echo folded
+          text'
+        configs:
+          - content: |
+              line one
+              line two
+    volumes: {}
+    """
+)
+
+
+def test_safe_load_matches_pure_python_loader():
+    assert yamlutils.safe_load(DOCUMENT) == yaml.load(DOCUMENT, Loader=yaml.SafeLoader)
+
+
+def test_safe_dump_round_trips_like_pure_python_dumper():
+    data = yaml.load(DOCUMENT, Loader=yaml.SafeLoader)
+    dumped = yamlutils.safe_dump(data)
+    assert yaml.load(dumped, Loader=yaml.SafeLoader) == data
+    assert dumped == yaml.dump(data, Dumper=yaml.SafeDumper)
+
+
+def test_safe_load_rejects_python_tags():
+    with pytest.raises(yamlutils.YAMLError):
+        yamlutils.safe_load("!!python/object/apply:os.system ['true']")
+
+
+def test_prefers_libyaml_when_available():
+    if hasattr(yaml, "CSafeLoader"):
+        assert yamlutils.SafeLoader is yaml.CSafeLoader
+        assert yamlutils.SafeDumper is yaml.CSafeDumper
+    else:
+        assert yamlutils.SafeLoader is yaml.SafeLoader
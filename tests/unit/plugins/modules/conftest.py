@@ -0,0 +1,33 @@
+import pytest
+
+
+class ModuleExit(Exception):
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+
+
+class ModuleFail(Exception):
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+
+
+class DummyModule:
+    """Stand-in for ``AnsibleModule`` that turns exits and failures into exceptions."""
+
+    def __init__(self, params, check_mode=False):
+        self.params = params
+        self.check_mode = check_mode
+
+    def exit_json(self, **kwargs):
+        raise ModuleExit(kwargs)
+
+    def fail_json(self, **kwargs):
+        raise ModuleFail(kwargs)
+
+
+@pytest.fixture
+def stub_backend(monkeypatch, tmp_path):
+    """Point every ``TruenasClient`` of the test at an empty stub middleware."""
+    monkeypatch.setenv("TRUENAS_CLIENT_BACKEND", "stub")
+    monkeypatch.setenv("TRUENAS_STUB_WORKSPACE", str(tmp_path / "stub"))
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path / "app_configs"))
@@ -3,34 +3,23 @@ from types import SimpleNamespace
 
 import pytest
 
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import jobs
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+    ModuleFail,
+)
 from plugins.modules import app
 
 
-class ModuleExit(Exception):
-    def __init__(self, kwargs):
-        self.kwargs = kwargs
-
-
-class ModuleFail(Exception):
-    def __init__(self, kwargs):
-        self.kwargs = kwargs
-
-
-class DummyModule:
-    def __init__(self, params, check_mode=False):
-        self.params = params
-        self.check_mode = check_mode
-
-    def exit_json(self, **kwargs):
-        raise ModuleExit(kwargs)
-
-    def fail_json(self, **kwargs):
-        raise ModuleFail(kwargs)
-
-
 def _patch_module(monkeypatch, params, check_mode=False):
     module_params = dict(params)
     module_params.setdefault("state", "present")
+    module_params.setdefault("wait", True)
+    module_params.setdefault("wait_timeout", None)
+    module_params.setdefault("diff_mode", "full")
+    module_params.setdefault("wait_for_state", None)
+    module_params.setdefault("wait_for_state_timeout", 300)
 
     monkeypatch.setattr(
         app,
@@ -178,6 +167,82 @@ def test_app_detects_different_config(monkeypatch, tmp_path):
     assert result["state"] == "present"
 
 
+def test_app_minimal_diff_reports_only_changed_paths(monkeypatch, tmp_path):
+    current_yaml = textwrap.dedent(
+        """
+        services:
+          redis:
+            image: redis:alpine
+            environment:
+              TZ: UTC
+        """
+    )
+    desired = {"services": {"redis": {"image": "redis:7", "environment": {"TZ": "UTC"}}}}
+    _patch_module(monkeypatch, {"name": "redis", "compose_config": desired, "diff_mode": "minimal"})
+    _write_user_config(tmp_path, "redis", "1.0", current_yaml)
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path))
+
+    class FakeClient:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def find_application(self, name):
+            return {"name": name, "version": "1.0", "custom_app": True}
+
+        def update_app(self, name, compose_config):
+            pass
+
+    monkeypatch.setattr(app, "TruenasClient", FakeClient)
+
+    with pytest.raises(ModuleExit) as captured:
+        app.main()
+
+    result = captured.value.kwargs
+    assert result["changed"] is True
+    assert result["message"].endswith("(services: redis)")
+    assert result["changed_services"] == {
+        "added": [],
+        "removed": [],
+        "changed": ["redis"],
+        "other": [],
+    }
+    assert result["diff"] == {
+        "prepared": '~ services.redis.image: "redis:alpine" -> "redis:7"\n'
+    }
+    assert result["compose_changes"] == [
+        {
+            "path": ["services", "redis", "image"],
+            "op": "changed",
+            "before": "redis:alpine",
+            "after": "redis:7",
+        }
+    ]
+
+
+def test_app_create_without_waiting_returns_job(monkeypatch, stub_backend):
+    params = {
+        "name": "redis",
+        "compose_config": {"services": {"redis": {"image": "redis:7"}}},
+        "wait": False,
+    }
+    _patch_module(monkeypatch, params)
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "60")
+
+    with pytest.raises(ModuleExit) as captured:
+        app.main()
+
+    result = captured.value.kwargs
+    assert result["changed"] is True
+    assert result["job"]["state"] == "RUNNING"
+    assert result["message"].endswith("(job {} is running)".format(result["job"]["job_id"]))
+    with app.TruenasClient() as client:
+        records = client.poll_jobs([result["job"]["job_id"]])
+    assert records[result["job"]["job_id"]]["state"] == "RUNNING"
+
+
 def test_app_absent_when_missing(monkeypatch):
     params = {"name": "redis", "state": "absent"}
     _patch_module(monkeypatch, params)
@@ -240,16 +305,11 @@ def test_app_absent_deletes_application(monkeypatch):
     assert instances[0].deleted == "redis"
 
 
-def test_app_restart_runs_stop_start(monkeypatch):
-    params = {"name": "redis", "state": "restarted"}
-    _patch_module(monkeypatch, params)
-    instances = []
-
+def _restart_client(instances, state="SUCCESS"):
     class FakeClient:
         def __init__(self):
             instances.append(self)
-            self.stopped = None
-            self.started = None
+            self.restarted = None
 
         def __enter__(self):
             return self
@@ -260,13 +320,18 @@ def test_app_restart_runs_stop_start(monkeypatch):
         def find_application(self, name):
             return {"name": name, "version": "1.0", "custom_app": True}
 
-        def stop_app(self, name):
-            self.stopped = name
+        def restart_app(self, name, wait=True, timeout=None):
+            self.restarted = (name, wait, timeout)
+            return jobs.JobOutcome(key=name, state=state, job_id=7, job_ids=[7], error="boom")
 
-        def start_app(self, name):
-            self.started = name
+    return FakeClient
 
-    monkeypatch.setattr(app, "TruenasClient", FakeClient)
+
+def test_app_restart_uses_single_restart_call(monkeypatch):
+    params = {"name": "redis", "state": "restarted"}
+    _patch_module(monkeypatch, params)
+    instances = []
+    monkeypatch.setattr(app, "TruenasClient", _restart_client(instances))
 
     with pytest.raises(ModuleExit) as captured:
         app.main()
@@ -275,8 +340,33 @@ def test_app_restart_runs_stop_start(monkeypatch):
     assert result["changed"] is True
     assert result["state"] == "restarted"
     assert result["message"] == "Application 'redis' was restarted"
-    assert instances[0].stopped == "redis"
-    assert instances[0].started == "redis"
+    assert result["job"]["job_id"] == 7
+    assert instances[0].restarted == ("redis", True, None)
+
+
+def test_app_restart_without_waiting(monkeypatch):
+    params = {"name": "redis", "state": "restarted", "wait": False, "wait_timeout": 30}
+    _patch_module(monkeypatch, params)
+    instances = []
+    monkeypatch.setattr(app, "TruenasClient", _restart_client(instances, state="RUNNING"))
+
+    with pytest.raises(ModuleExit) as captured:
+        app.main()
+
+    result = captured.value.kwargs
+    assert result["message"] == "Application 'redis' restart job 7 is running"
+    assert instances[0].restarted == ("redis", False, 30)
+
+
+def test_app_restart_reports_failed_job(monkeypatch):
+    params = {"name": "redis", "state": "restarted"}
+    _patch_module(monkeypatch, params)
+    monkeypatch.setattr(app, "TruenasClient", _restart_client([], state="TIMEOUT"))
+
+    with pytest.raises(ModuleFail) as captured:
+        app.main()
+
+    assert captured.value.kwargs["msg"] == "Failed to restart application 'redis': boom"
 
 
 def test_app_restart_check_mode(monkeypatch):
@@ -324,3 +414,46 @@ def test_app_restart_requires_existing_app(monkeypatch):
         app.main()
 
     assert "cannot restart" in captured.value.kwargs["msg"]
+
+
+@pytest.fixture
+def stub_backend(stub_backend, monkeypatch):
+    monkeypatch.setenv("TRUENAS_STUB_APP_LATENCY", "0.2")
+
+
+def _run_app(monkeypatch, expect=ModuleExit, **params):
+    params = dict({"name": "redis", "compose_config": {"services": {}}}, **params)
+    _patch_module(monkeypatch, params)
+    with pytest.raises(expect) as captured:
+        app.main()
+    return captured.value.kwargs
+
+
+def test_app_waits_for_running_state(monkeypatch, stub_backend):
+    created = _run_app(monkeypatch, wait_for_state="RUNNING", wait_for_state_timeout=30)
+    assert created["changed"] and created["app_state"] == "RUNNING"
+
+    restarted = _run_app(monkeypatch, state="restarted", wait_for_state="RUNNING")
+    assert restarted["app_state"] == "RUNNING"
+
+
+def test_app_wait_for_state_reports_crash_and_timeout(monkeypatch, stub_backend):
+    monkeypatch.setenv("TRUENAS_STUB_CRASH_APPS", "red*")
+    crashed = _run_app(monkeypatch, expect=ModuleFail, wait_for_state="RUNNING")
+    assert crashed["msg"] == "Application 'redis' is CRASHED instead of RUNNING"
+    assert crashed["app_state"] == "CRASHED"
+
+    monkeypatch.setenv("TRUENAS_STUB_APP_LATENCY", "60")
+    slow = _run_app(
+        monkeypatch,
+        expect=ModuleFail,
+        compose_config={"services": {"redis": {"image": "redis:7"}}},
+        wait_for_state="RUNNING",
+        wait_for_state_timeout=0,
+    )
+    assert slow["msg"] == "Application 'redis' is still UPDATING after 0s waiting for RUNNING"
+
+
+def test_app_wait_for_state_requires_wait(monkeypatch):
+    result = _run_app(monkeypatch, expect=ModuleFail, wait=False, wait_for_state="RUNNING")
+    assert result["msg"] == "wait_for_state requires wait=true"
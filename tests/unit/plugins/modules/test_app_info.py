@@ -0,0 +1,54 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.apps import compose_digest
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+)
+from plugins.modules import app_info
+
+
+@pytest.fixture
+def stub_backend(stub_backend):
+    with app_info.TruenasClient() as client:
+        for name in ("media-plex", "media-sonarr", "redis"):
+            client.create_app(name, {"services": {name: {"image": name}}})
+
+
+def _run(monkeypatch, name=None, cache_ttl=0, compose_digest=False):
+    params = {"name": name, "cache_ttl": cache_ttl, "compose_digest": compose_digest}
+    monkeypatch.setattr(app_info, "_build_module", lambda: DummyModule(params))
+    with pytest.raises(ModuleExit) as captured:
+        app_info.main()
+    return captured.value.kwargs
+
+
+def test_app_info_filters_by_pattern(monkeypatch, stub_backend):
+    result = _run(monkeypatch, name=["media-*"])
+
+    assert result["changed"] is False
+    assert result["cached"] is False
+    assert [app["name"] for app in result["apps"]] == ["media-plex", "media-sonarr"]
+    assert len(_run(monkeypatch)["apps"]) == 3
+
+
+def test_app_info_cache_is_invalidated_by_changes(monkeypatch, stub_backend):
+    assert _run(monkeypatch, cache_ttl=300)["cached"] is False
+
+    cached = _run(monkeypatch, name=["redis"], cache_ttl=300)
+    assert cached["cached"] is True
+    assert [app["name"] for app in cached["apps"]] == ["redis"]
+
+    with app_info.TruenasClient() as client:
+        client.delete_app("redis")
+
+    result = _run(monkeypatch, name=["redis"], cache_ttl=300)
+    assert result["cached"] is False
+    assert result["apps"] == []
+
+
+def test_app_info_reports_compose_digests(monkeypatch, stub_backend):
+    result = _run(monkeypatch, name=["redis"], compose_digest=True)
+
+    (app,) = result["apps"]
+    assert app["compose_digest"] == compose_digest({"services": {"redis": {"image": "redis"}}})
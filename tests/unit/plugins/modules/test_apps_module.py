@@ -0,0 +1,295 @@
+import textwrap
+
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils import jobs
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+    ModuleFail,
+)
+from plugins.modules import apps
+
+
+def _patch_module(monkeypatch, items, check_mode=False, **options):
+    params = {
+        "apps": [dict({"state": "present", "compose_config": None}, **item) for item in items],
+        "concurrency": 4,
+        "timeout": None,
+        "diff_mode": "full",
+        "wait_for_running": False,
+        "wait_for_running_timeout": 300,
+    }
+    params.update(options)
+    monkeypatch.setattr(apps, "_build_module", lambda: DummyModule(params, check_mode=check_mode))
+
+
+def _write_user_config(tmp_path, app_name, version, text):
+    config_dir = tmp_path / app_name / "versions" / version
+    config_dir.mkdir(parents=True)
+    (config_dir / "user_config.yaml").write_text(text)
+
+
+class FakeClient:
+    def __init__(self, existing, failing=(), states=None):
+        self.existing = existing
+        self.queries = []
+        self.calls = []
+        self.failing = set(failing)
+        self.states = states or {}
+        self.awaited = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def list_applications(self, names=None):
+        self.queries.append(list(names))
+        return [app for app in self.existing if app["name"] in names]
+
+    def app_job_request(self, action, name, compose_config=None):
+        actions = ("stop", "start") if action == "restart" else (action,)
+
+        def submit(step):
+            self.calls.append((step, name))
+            return len(self.calls)
+
+        return jobs.JobRequest(
+            key=name, steps=[lambda step=step: submit(step) for step in actions]
+        )
+
+    def run_jobs(self, requests, concurrency=4, timeout=None, **kwargs):
+        def fetch(job_ids):
+            return [
+                {
+                    "id": job_id,
+                    "state": "FAILED" if self.calls[job_id - 1][1] in self.failing else "SUCCESS",
+                    "result": None,
+                }
+                for job_id in job_ids
+            ]
+
+        return jobs.run_jobs(requests, fetch, concurrency=concurrency, timeout=timeout)
+
+    def wait_for_apps(self, names, timeout=None):
+        self.awaited.append(list(names))
+        self.wait_timeout = timeout
+        return {name: self.states.get(name, "RUNNING") for name in names}
+
+
+def test_apps_reconciles_with_single_query(monkeypatch, tmp_path):
+    redis = {"services": {"redis": {"image": "redis:alpine"}}}
+    _write_user_config(
+        tmp_path,
+        "redis",
+        "1",
+        textwrap.dedent(
+            """
+            services:
+              redis:
+                image: redis:alpine
+            """
+        ),
+    )
+    _write_user_config(tmp_path, "web", "1", "services: {web: {image: 'nginx:1'}}\n")
+    monkeypatch.setenv("TRUENAS_APP_CONFIG_ROOT", str(tmp_path))
+    _patch_module(
+        monkeypatch,
+        [
+            {"name": "redis", "compose_config": redis},
+            {"name": "web", "compose_config": {"services": {"web": {"image": "nginx:2"}}}},
+            {"name": "db", "compose_config": {"services": {"db": {"image": "postgres"}}}},
+            {"name": "old", "state": "absent"},
+            {"name": "gone", "state": "absent"},
+        ],
+    )
+    client = FakeClient(
+        [
+            {"name": "redis", "version": "1", "custom_app": True},
+            {"name": "web", "version": "1", "custom_app": True},
+            {"name": "old", "version": "1", "custom_app": True},
+        ]
+    )
+    monkeypatch.setattr(apps, "TruenasClient", lambda: client)
+
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert result["changed"] is True
+    assert client.queries == [["redis", "web", "db", "old", "gone"]]
+    assert client.calls == [("update", "web"), ("create", "db"), ("delete", "old")]
+    actions = {item["name"]: item["action"] for item in result["results"]}
+    assert actions == {
+        "redis": "none",
+        "web": "update",
+        "db": "create",
+        "old": "delete",
+        "gone": "none",
+    }
+    assert [entry["before_header"] for entry in result["diff"]] == ["redis", "web", "db"]
+    assert result["results"][0]["diff"] == {"before": redis, "after": redis}
+    assert result["results"][2]["diff"]["before"] is None
+
+
+def test_apps_check_mode_makes_no_calls(monkeypatch):
+    _patch_module(
+        monkeypatch,
+        [{"name": "db", "compose_config": {"services": {}}}, {"name": "old", "state": "restarted"}],
+        check_mode=True,
+    )
+    client = FakeClient([{"name": "old", "version": "1", "custom_app": True}])
+    monkeypatch.setattr(apps, "TruenasClient", lambda: client)
+
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert result["changed"] is True
+    assert client.calls == []
+    assert "would be restarted" in result["results"][1]["message"]
+
+
+def test_apps_rejects_duplicate_names(monkeypatch):
+    _patch_module(monkeypatch, [{"name": "db", "state": "absent"}, {"name": "db", "state": "absent"}])
+
+    with pytest.raises(ModuleFail) as captured:
+        apps.main()
+
+    assert "must be unique: db" in captured.value.kwargs["msg"]
+
+
+def test_apps_rejects_catalog_apps(monkeypatch):
+    _patch_module(monkeypatch, [{"name": "plex", "state": "absent"}])
+    client = FakeClient([{"name": "plex", "version": "1", "custom_app": False}])
+    monkeypatch.setattr(apps, "TruenasClient", lambda: client)
+
+    with pytest.raises(ModuleFail) as captured:
+        apps.main()
+
+    assert "not custom applications: plex" in captured.value.kwargs["msg"]
+    assert client.calls == []
+
+
+def test_apps_against_stub_backend(monkeypatch, stub_backend):
+    items = [
+        {"name": "app{}".format(index), "compose_config": {"services": {"s": {"image": str(index)}}}}
+        for index in range(5)
+    ]
+    _patch_module(monkeypatch, items)
+
+    with pytest.raises(ModuleExit) as created:
+        apps.main()
+    assert [item["action"] for item in created.value.kwargs["results"]] == ["create"] * 5
+
+    with pytest.raises(ModuleExit) as idempotent:
+        apps.main()
+    assert idempotent.value.kwargs["changed"] is False
+
+
+def test_apps_returns_job_outcomes(monkeypatch, stub_backend):
+    _patch_module(
+        monkeypatch,
+        [
+            {"name": "ok", "compose_config": {"services": {}}},
+            {"name": "ghost", "state": "absent"},
+        ],
+        concurrency=1,
+    )
+
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert result["results"][0]["job"]["state"] == "SUCCESS"
+    assert result["results"][0]["application"]["name"] == "ok"
+    assert "job" not in result["results"][1]
+
+
+def _stack(**depends_on):
+    return [
+        {"name": name, "compose_config": {"services": {}}, "depends_on": deps}
+        for name, deps in depends_on.items()
+    ]
+
+
+def test_apps_rolls_out_dependencies_in_waves(monkeypatch):
+    _patch_module(
+        monkeypatch,
+        _stack(proxy=["api"], api=["db", "cache"], db=[], cache=[]),
+        wait_for_running=True,
+    )
+    client = FakeClient([])
+    monkeypatch.setattr(apps, "TruenasClient", lambda: client)
+
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert result["waves"] == [["db", "cache"], ["api"], ["proxy"]]
+    assert client.calls == [("create", name) for name in ("db", "cache", "api", "proxy")]
+    assert client.awaited == result["waves"]
+    assert client.wait_timeout == 300
+    assert {item["app_state"] for item in result["results"]} == {"RUNNING"}
+
+
+def test_apps_skips_dependents_of_failed_or_crashed_apps(monkeypatch):
+    _patch_module(
+        monkeypatch,
+        _stack(db=[], cache=[], api=["db"], worker=["cache"], proxy=["api"]),
+        wait_for_running=True,
+    )
+    client = FakeClient([], failing=["db"], states={"cache": "CRASHED"})
+    monkeypatch.setattr(apps, "TruenasClient", lambda: client)
+
+    with pytest.raises(ModuleFail) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert client.calls == [("create", "db"), ("create", "cache")]
+    assert result["msg"] == "Failed to reconcile applications: db, cache, api, worker, proxy"
+    by_name = {item["name"]: item for item in result["results"]}
+    assert by_name["cache"]["message"] == "Application 'cache' is CRASHED instead of RUNNING"
+    assert by_name["proxy"]["skipped"]
+    assert by_name["proxy"]["message"] == "Skipped because api failed"
+
+
+def test_apps_rejects_dependency_cycles(monkeypatch):
+    _patch_module(monkeypatch, _stack(a=["b"], b=["a"]))
+
+    with pytest.raises(ModuleFail) as captured:
+        apps.main()
+
+    assert captured.value.kwargs["msg"] == "Dependency cycle between: a, b"
+
+
+def test_apps_waits_for_each_wave_against_stub_backend(monkeypatch, stub_backend):
+    monkeypatch.setenv("TRUENAS_STUB_APP_LATENCY", "0.1")
+    _patch_module(monkeypatch, _stack(api=["db"], db=[]), wait_for_running=True, timeout=30)
+
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    result = captured.value.kwargs
+    assert result["waves"] == [["db"], ["api"]]
+    assert [item["app_state"] for item in result["results"]] == ["RUNNING", "RUNNING"]
+
+
+def test_apps_only_awaits_apps_it_changed(monkeypatch, stub_backend):
+    _patch_module(monkeypatch, _stack(db=[]))
+    with pytest.raises(ModuleExit):
+        apps.main()
+    with apps.TruenasClient() as client:
+        client.stop_app("db")
+
+    # A stopped, up-to-date app must neither be awaited nor block the module.
+    _patch_module(monkeypatch, _stack(db=[], api=["db"]), wait_for_running=True)
+    with pytest.raises(ModuleExit) as captured:
+        apps.main()
+
+    by_name = {item["name"]: item for item in captured.value.kwargs["results"]}
+    assert by_name["db"]["action"] == "none"
+    assert "app_state" not in by_name["db"]
+    assert by_name["api"]["app_state"] == "RUNNING"
@@ -0,0 +1,73 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+)
+from plugins.modules import cronjob_info
+
+
+@pytest.fixture
+def stub_backend(stub_backend):
+    with cronjob_info.TruenasClient() as client:
+        for description in ("nightly backup", "weekly backup", "scrub"):
+            client.create_cronjob({"description": description, "command": "/bin/true"})
+
+
+def _run(monkeypatch, name=None, cache_ttl=0, load_top=0):
+    params = {"name": name, "cache_ttl": cache_ttl, "load_top": load_top}
+    monkeypatch.setattr(cronjob_info, "_build_module", lambda: DummyModule(params))
+    with pytest.raises(ModuleExit) as captured:
+        cronjob_info.main()
+    return captured.value.kwargs
+
+
+def test_cronjob_info_filters_and_caches(monkeypatch, stub_backend):
+    result = _run(monkeypatch, name=["*backup"], cache_ttl=300)
+    assert result["cached"] is False
+    assert [job["description"] for job in result["cronjobs"]] == [
+        "nightly backup",
+        "weekly backup",
+    ]
+
+    result = _run(monkeypatch, name=["scrub"], cache_ttl=300)
+    assert result["cached"] is True
+    assert len(result["cronjobs"]) == 1
+
+    with cronjob_info.TruenasClient() as client:
+        client.create_cronjob({"description": "monthly backup", "command": "/bin/true"})
+
+    result = _run(monkeypatch, name=["*backup"], cache_ttl=300)
+    assert result["cached"] is False
+    assert len(result["cronjobs"]) == 3
+
+
+def test_cronjob_info_reports_busiest_minutes(monkeypatch, stub_backend):
+    with cronjob_info.TruenasClient() as client:
+        for description, schedule in (
+            ("replication", {"minute": "00", "hour": "2"}),
+            ("snapshot", {"minute": "*/30", "hour": "2"}),
+            ("disabled", {"minute": "0", "hour": "2"}),
+        ):
+            client.create_cronjob(
+                {
+                    "description": description,
+                    "command": "/bin/true",
+                    "enabled": description != "disabled",
+                    "schedule": schedule,
+                }
+            )
+
+    result = _run(monkeypatch, load_top=2)
+
+    assert "load" not in _run(monkeypatch)
+    assert result["load"][0] == {
+        "time": "02:00",
+        "jobs": 5,
+        "names": ["nightly backup", "weekly backup", "scrub", "replication", "snapshot"],
+    }
+    assert (result["load"][1]["time"], result["load"][1]["jobs"]) == ("02:30", 4)
+
+    filtered = _run(monkeypatch, name=["snapshot"], load_top=2)
+    assert [job["description"] for job in filtered["cronjobs"]] == ["snapshot"]
+    assert filtered["load"] == result["load"]
@@ -0,0 +1,75 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+    ModuleFail,
+)
+from plugins.modules import cronjob
+
+
+@pytest.fixture
+def stub_backend(stub_backend):
+    with cronjob.TruenasClient() as client:
+        for description in ("backup", "replication"):
+            client.create_cronjob(
+                {
+                    "description": description,
+                    "command": "/bin/true",
+                    "schedule": {"minute": "0", "hour": "2"},
+                }
+            )
+
+
+def _run(monkeypatch, name, schedule=None, stagger=None, expect=ModuleExit, check_mode=False):
+    params = {
+        "name": name,
+        "command": "/usr/local/bin/job",
+        "user": "root",
+        "enabled": True,
+        "schedule": schedule,
+        "stagger": stagger,
+        "state": "present",
+    }
+    monkeypatch.setattr(cronjob, "_build_module", lambda: DummyModule(params, check_mode=check_mode))
+    with pytest.raises(expect) as captured:
+        cronjob.main()
+    return captured.value.kwargs
+
+
+def test_stagger_avoids_busy_minutes_and_is_stable(monkeypatch, stub_backend):
+    stagger = {"window": "02:00-02:02", "key": None}
+    first = _run(monkeypatch, "scrub", stagger=stagger)
+    second = _run(monkeypatch, "snapshot", stagger=stagger)
+
+    assert first["changed"] and second["changed"]
+    assert first["stagger"]["load"] == second["stagger"]["load"] == 0
+    times = {first["stagger"]["time"], second["stagger"]["time"]}
+    assert times == {"02:01", "02:02"}
+
+    rerun = _run(monkeypatch, "scrub", stagger=stagger)
+    assert rerun["changed"] is False
+    assert rerun["stagger"]["time"] == first["stagger"]["time"]
+
+
+def test_stagger_summary_in_check_mode_create(monkeypatch, stub_backend):
+    stagger = {"window": "02:00-02:01", "key": None}
+
+    result = _run(monkeypatch, "scrub", stagger=stagger, check_mode=True)
+
+    assert result["changed"] is True
+    assert result["message"] == "Cron job 'scrub' would be created"
+    assert result["stagger"]["time"] == "02:01"
+    with cronjob.TruenasClient() as client:
+        assert client.find_cronjob("scrub") is None
+
+
+def test_stagger_rejects_explicit_time(monkeypatch, stub_backend):
+    result = _run(
+        monkeypatch,
+        "scrub",
+        schedule={"minute": "5", "hour": None, "dom": None, "month": None, "dow": None},
+        stagger={"window": "01:00-05:00", "key": None},
+        expect=ModuleFail,
+    )
+    assert "cannot be combined with stagger" in result["msg"]
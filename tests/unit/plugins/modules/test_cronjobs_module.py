@@ -0,0 +1,69 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+    ModuleFail,
+)
+from plugins.modules import cronjobs
+
+
+def _item(name, command=None, state="present", **schedule):
+    return {
+        "name": name,
+        "command": command,
+        "user": "root",
+        "enabled": True,
+        "schedule": schedule or None,
+        "state": state,
+    }
+
+
+def _patch_module(monkeypatch, items, exclusive=False, check_mode=False):
+    params = {"cronjobs": items, "exclusive": exclusive}
+    monkeypatch.setattr(
+        cronjobs, "_build_module", lambda: DummyModule(params, check_mode=check_mode)
+    )
+
+
+def _run():
+    with pytest.raises(ModuleExit) as captured:
+        cronjobs.main()
+    return captured.value.kwargs
+
+
+def test_cronjobs_reconciles_full_set(monkeypatch, stub_backend):
+    _patch_module(
+        monkeypatch,
+        [_item("backup", "/bin/backup", minute="0", hour="2"), _item("report", "/bin/report")],
+    )
+    result = _run()
+    assert result["changed"] is True
+    assert [job["description"] for job in result["created"]] == ["backup", "report"]
+
+    assert _run()["changed"] is False
+
+    _patch_module(monkeypatch, [_item("backup", "/bin/backup", minute="0", hour="3")], exclusive=True)
+    result = _run()
+    assert [job["description"] for job in result["updated"]] == ["backup"]
+    assert [job["description"] for job in result["deleted"]] == ["report"]
+    assert result["diff"][0]["before"]["schedule"]["hour"] == "2"
+    assert result["diff"][0]["after"]["schedule"]["hour"] == "3"
+    assert result["diff"][1]["after"] is None
+
+    _patch_module(monkeypatch, [_item("backup", state="absent")])
+    result = _run()
+    assert [job["description"] for job in result["deleted"]] == ["backup"]
+
+
+def test_cronjobs_check_mode_does_not_write(monkeypatch, stub_backend):
+    _patch_module(monkeypatch, [_item("backup", "/bin/backup")], check_mode=True)
+    assert _run()["changed"] is True
+    assert _run()["created"][0]["description"] == "backup"
+
+
+def test_cronjobs_rejects_duplicate_names(monkeypatch):
+    _patch_module(monkeypatch, [_item("backup", "/bin/a"), _item("backup", "/bin/b")])
+    with pytest.raises(ModuleFail) as captured:
+        cronjobs.main()
+    assert "must be unique: backup" in captured.value.kwargs["msg"]
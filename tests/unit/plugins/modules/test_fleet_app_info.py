@@ -0,0 +1,65 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.plugins.module_utils.truenas_client import (
+    TruenasClient,
+)
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+)
+from plugins.modules import fleet_app_info
+
+
+@pytest.fixture
+def fleet_nodes(stub_backend):
+    for node, apps in (("nas1", ("redis", "plex")), ("nas2", ("redis",))):
+        with TruenasClient(uri="wss://{}/api/current".format(node), api_key="key") as client:
+            for app in apps:
+                client.create_app(app, {"services": {}})
+
+
+def _run(monkeypatch, **options):
+    params = {
+        "nodes": [
+            dict(dict.fromkeys(("uri", "api_key", "username", "password", "verify_ssl")), name=name)
+            for name in ("nas1", "nas2", "nas3")
+        ],
+        "api_key": "key",
+        "username": None,
+        "password": None,
+        "verify_ssl": True,
+        "name": None,
+        "include_cronjobs": False,
+        "max_workers": 8,
+        "node_timeout": None,
+    }
+    params.update(options)
+    monkeypatch.setattr(fleet_app_info, "_build_module", lambda: DummyModule(params))
+    with pytest.raises(ModuleExit) as captured:
+        fleet_app_info.main()
+    return captured.value.kwargs
+
+
+def test_fleet_app_info_aggregates_nodes(monkeypatch, fleet_nodes):
+    result = _run(monkeypatch, name=["red*"], include_cronjobs=True)
+
+    assert result["changed"] is False
+    assert sorted((app["node"], app["name"]) for app in result["apps"]) == [
+        ("nas1", "redis"),
+        ("nas2", "redis"),
+    ]
+    assert [node["node"] for node in result["nodes"]] == ["nas1", "nas2", "nas3"]
+    assert result["nodes"][0]["cronjobs"] == []
+    assert result["unreachable"] == []
+
+
+def test_fleet_app_info_reports_unreachable_nodes(monkeypatch, fleet_nodes):
+    monkeypatch.setenv("TRUENAS_STUB_FAILURES", "connect=100")
+    monkeypatch.setenv("TRUENAS_CLIENT_RETRIES", "1")
+    monkeypatch.setenv("TRUENAS_CLIENT_BREAKER_THRESHOLD", "0")
+
+    result = _run(monkeypatch)
+
+    assert result["apps"] == []
+    assert result["unreachable"] == ["nas1", "nas2", "nas3"]
+    assert result["nodes"][0]["error"].startswith("ConnectionResetError")
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+MODULES = sorted(
+    path.stem
+    for path in (Path(__file__).resolve().parents[4] / "plugins" / "modules").glob("*.py")
+    if not path.stem.startswith("_")
+)
+COLLECTION = "ansible_collections.mareckii.truenas_scale.plugins"
+
+# Dependencies that only some code paths need; importing any of them when a
+# module loads makes every task pay for it.
+LAZY_IMPORTS = {
+    "yaml",
+    "sqlite3",
+    "socketserver",
+    "truenas_api_client",
+    COLLECTION + ".module_utils.broker",
+    COLLECTION + ".module_utils.stub",
+    COLLECTION + ".module_utils.stub_state",
+}
+
+
+def import_times(module_name):
+    """Return ``{module: cumulative_us}`` from ``python -X importtime``."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module_name],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_import_defers_heavy_dependencies(module):
+    times = import_times("{}.modules.{}".format(COLLECTION, module))
+
+    assert "{}.modules.{}".format(COLLECTION, module) in times
+    assert LAZY_IMPORTS.isdisjoint(times), sorted(LAZY_IMPORTS.intersection(times))
@@ -0,0 +1,73 @@
+import pytest
+
+from ansible_collections.mareckii.truenas_scale.tests.unit.plugins.modules.conftest import (
+    DummyModule,
+    ModuleExit,
+    ModuleFail,
+)
+from plugins.modules import job_status
+
+
+def _submit(action, name, compose_config=None):
+    with job_status.TruenasClient() as client:
+        return client.submit_app_job(action, name, compose_config)
+
+
+def _run(monkeypatch, job_ids, **options):
+    params = dict(
+        {"wait": False, "wait_timeout": None, "poll_interval": 0.01, "fail_on_error": True},
+        job_ids=job_ids,
+        **options
+    )
+    monkeypatch.setattr(job_status, "_build_module", lambda: DummyModule(params))
+    with pytest.raises((ModuleExit, ModuleFail)) as captured:
+        job_status.main()
+    return captured.type, captured.value.kwargs
+
+
+def test_job_status_reports_running_jobs_without_waiting(monkeypatch, stub_backend):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "60")
+    job_id = _submit("create", "redis", {"services": {"redis": {"image": "redis:7"}}})
+
+    outcome, result = _run(monkeypatch, [job_id])
+
+    assert outcome is ModuleExit
+    assert result["finished"] is False
+    assert result["jobs"][0]["state"] == "RUNNING"
+    assert result["failed_jobs"] == []
+
+
+def test_job_status_waits_for_all_jobs(monkeypatch, stub_backend):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "0.05")
+    job_ids = [
+        _submit("create", name, {"services": {name: {"image": name}}}) for name in ("a", "b")
+    ]
+
+    outcome, result = _run(monkeypatch, job_ids, wait=True, wait_timeout=10)
+
+    assert outcome is ModuleExit
+    assert result["finished"] is True
+    assert [job["state"] for job in result["jobs"]] == ["SUCCESS", "SUCCESS"]
+
+
+def test_job_status_fails_on_failed_and_unknown_jobs(monkeypatch, stub_backend):
+    failed = _submit("stop", "missing")
+
+    outcome, result = _run(monkeypatch, [failed, 404])
+
+    assert outcome is ModuleFail
+    assert result["failed_jobs"] == [failed, 404]
+    assert result["jobs"][1] == {"id": 404, "state": "UNKNOWN"}
+
+    outcome, result = _run(monkeypatch, [failed], fail_on_error=False)
+    assert outcome is ModuleExit
+
+
+def test_job_status_times_out(monkeypatch, stub_backend):
+    monkeypatch.setenv("TRUENAS_STUB_JOB_LATENCY", "60")
+    job_id = _submit("create", "redis", {"services": {"redis": {"image": "redis:7"}}})
+
+    outcome, result = _run(monkeypatch, [job_id], wait=True, wait_timeout=0)
+
+    assert outcome is ModuleFail
+    assert "Timed out" in result["msg"]